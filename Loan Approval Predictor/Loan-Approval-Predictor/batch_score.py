@@ -0,0 +1,201 @@
+# Offline batch scoring for large application files.
+# Run with: python batch_score.py applications.csv scored.parquet [options]
+#
+# Input is streamed in chunks (CSV or Parquet), chunks are scored in
+# parallel by a pool of worker processes that each load the model once, and
+# results are written in input order as they complete. At most a few chunks
+# per worker are in memory at any time, whatever the file size.
+# With --monitor, each scored chunk is also counted into the drift monitor
+# (see drift_monitor.py) and drift alerts are reported as they are raised.
+import argparse
+import os
+import pickle
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from compiled_forest import compile_pipeline
+from drift_monitor import DriftMonitor
+from registry import ModelRegistry
+
+FEATURES = ['credit_score', 'annual_income', 'loan_amount', 'loan_term',
+            'employment_years', 'debt_to_income', 'education', 'employment_type']
+
+_model = None
+
+
+def _load_worker_model(model_path, model_jobs, compiled=False, registry_root=None):
+    global _model
+    if registry_root and compiled:
+        # Every worker maps the same file: one copy of the forest in memory
+        _model = ModelRegistry(registry_root).load_compiled()
+        return
+    if registry_root:
+        _model = ModelRegistry(registry_root).load_pipeline()
+    else:
+        with open(model_path, 'rb') as file:
+            _model = pickle.load(file)
+    # Each worker gets its share of the cores; the forest must not fan out
+    # over all of them again
+    _model.named_steps['classifier'].n_jobs = model_jobs
+    if compiled:
+        _model = compile_pipeline(_model)
+
+
+def _score_chunk(chunk, explain=False):
+    frame = chunk[FEATURES]
+    probabilities = _model.predict_proba(frame)[:, 1]
+    if not explain:
+        return probabilities, None
+    # Per-input contributions, which need the compiled forest
+    return probabilities, pd.DataFrame(_model.explain(frame), index=chunk.index,
+                                       columns=[f"contribution_{name}" for name in _model.inputs])
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def read_chunks(path, chunk_size):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+        self._first = True
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+# Workers and per-worker model threads. Together they use the available
+# cores once: by default one single-threaded forest per core.
+def plan_workers(workers=None, model_jobs=1):
+    cores = os.cpu_count() or 1
+    model_jobs = max(1, min(model_jobs, cores))
+    workers = workers or max(1, cores // model_jobs)
+    return workers, model_jobs
+
+
+def score_file(input_path, output_path, model_path="loan_approval_model.pkl", chunk_size=50000,
+               workers=None, model_jobs=1, threshold=0.5, progress=None, compiled=False, registry_root=None,
+               explain=False, monitor=None, alert=None):
+    workers, model_jobs = plan_workers(workers, model_jobs)
+    compiled = compiled or explain
+    writer = ChunkWriter(output_path)
+    in_flight = deque()
+    rows = 0
+    started = time.perf_counter()
+
+    def finish_oldest():
+        nonlocal rows
+        chunk, future = in_flight.popleft()
+        probabilities, contributions = future.result()
+        chunk = chunk.assign(approval_probability=probabilities,
+                             predicted_approval=pd.Series(probabilities >= threshold, index=chunk.index)
+                             .map({True: "Approved", False: "Denied"}))
+        if contributions is not None:
+            chunk = pd.concat([chunk, contributions], axis=1)
+        writer.write(chunk)
+        rows += len(chunk)
+        if monitor is not None:
+            for raised in monitor.observe(chunk[FEATURES], "batch"):
+                if alert:
+                    alert(raised)
+        if progress:
+            progress(rows, time.perf_counter() - started)
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=_load_worker_model,
+                                 initargs=(model_path, model_jobs, compiled, registry_root)) as pool:
+            for chunk in read_chunks(input_path, chunk_size):
+                missing = [column for column in FEATURES if column not in chunk.columns]
+                if missing:
+                    raise ValueError(f"{input_path} is missing columns: {', '.join(missing)}")
+                in_flight.append((chunk, pool.submit(_score_chunk, chunk, explain)))
+                # Bounded read-ahead: two chunks per worker keeps every worker
+                # busy without reading the whole file into memory
+                if len(in_flight) >= 2 * workers:
+                    finish_oldest()
+            while in_flight:
+                finish_oldest()
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a file of loan applications")
+    parser.add_argument("input", help="CSV or Parquet file with the applicant columns")
+    parser.add_argument("output", help="CSV or Parquet file to write, with approval_probability and predicted_approval added")
+    parser.add_argument("--model", default="loan_approval_model.pkl")
+    parser.add_argument("--registry", help="score with this registry's production model instead of --model")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: cores / model-jobs)")
+    parser.add_argument("--model-jobs", type=int, default=1, help="threads per worker for the forest")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--compiled", action="store_true",
+                        help="score with the compiled forest (faster only for small chunks)")
+    parser.add_argument("--explain", action="store_true",
+                        help="add each input's contribution to the probability (uses the compiled forest)")
+    parser.add_argument("--monitor", metavar="DIR",
+                        help="count the inputs into this drift monitor directory and report drift alerts")
+    args = parser.parse_args()
+
+    def progress(rows, elapsed):
+        print(f"\r{rows:,} rows, {rows / elapsed:,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+    def alert(raised):
+        # Categorical inputs have no KS statistic
+        ks = "" if raised['ks'] != raised['ks'] else f", KS {raised['ks']:.3f}"
+        print(f"\nDrift alert: {raised['feature']} PSI {raised['psi']:.3f}{ks} "
+              f"over the last {raised['window_days']} days ({raised['rows']:,} rows)", file=sys.stderr)
+
+    try:
+        monitor = None
+        if args.monitor:
+            reference = ModelRegistry(args.registry).load_reference() if args.registry else None
+            if reference is None:
+                # Models from before the registry were trained on the default data
+                from train import input_reference, load_data
+
+                reference = input_reference(load_data())
+            monitor = DriftMonitor(reference, args.monitor)
+        rows, elapsed = score_file(args.input, args.output, args.model, args.chunk_size, args.workers,
+                                   args.model_jobs, args.threshold, progress, args.compiled, args.registry,
+                                   args.explain, monitor, alert)
+    except (OSError, ValueError) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        sys.exit(1)
+    workers, model_jobs = plan_workers(args.workers, args.model_jobs)
+    print(f"\nScored {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s) "
+          f"with {workers} workers x {model_jobs} model threads", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,702 @@
+# Performance benchmarks for the loan approval predictor.
+# Run with: python benchmarks.py <benchmark> [options]
+import argparse
+import os
+import pickle
+import shutil
+import statistics
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(HERE, "loan_approval_model.pkl")
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+# Model loading as a rerun sees it: unpickling every time (the old
+# behaviour) against the process-wide cache, plus the cold start and the
+# reload after the model file is replaced
+def bench_model_load(args):
+    from model_cache import cached_model, file_digest, load_model
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "loan_approval_model.pkl")
+    shutil.copy(MODEL_PATH, path)
+
+    def unpickle():
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    started = time.perf_counter()
+    model = cached_model(path)
+    cold = time.perf_counter() - started
+    uncached = timed(unpickle, args.repeat)
+    cached = timed(lambda: cached_model(path), args.repeat)
+    print(f"cold start (hash + unpickle, first scikit-learn import included): {cold * 1000:.1f} ms")
+    print(f"per rerun, unpickling:        {uncached * 1000:.2f} ms")
+    print(f"per rerun, cached:            {cached * 1000:.3f} ms ({uncached / cached:,.0f}x faster)")
+
+    # Same content rewritten: re-hashed, not reloaded
+    os.utime(path)
+    started = time.perf_counter()
+    same = cached_model(path)
+    print(f"touched file: {(time.perf_counter() - started) * 1000:.1f} ms, reloaded={same is not model}")
+
+    # New content: hot reload on the next call
+    model.named_steps['classifier'].n_jobs = 1
+    with open(path, 'wb') as file:
+        pickle.dump(model, file)
+    started = time.perf_counter()
+    reloaded = cached_model(path)
+    print(f"replaced file: {(time.perf_counter() - started) * 1000:.1f} ms, reloaded={reloaded is not model}")
+
+    if args.app:
+        bench_app_reruns(args)
+    file_digest.clear()
+    load_model.clear()
+
+
+# The app and its model in a scratch directory, under Streamlit's test
+# harness
+def app_copy():
+    from streamlit.testing.v1 import AppTest
+
+    directory = tempfile.mkdtemp()
+    for name in os.listdir(HERE):
+        if name.endswith(".py") or name == "loan_approval_model.pkl":
+            shutil.copy(os.path.join(HERE, name), directory)
+    os.chdir(directory)
+    return AppTest.from_file(os.path.join(directory, "main.py"), default_timeout=300)
+
+
+# Full script reruns through Streamlit's test harness, as a slider move
+# triggers them
+def bench_app_reruns(args):
+    app = app_copy()
+    started = time.perf_counter()
+    app.run()
+    print(f"app first run: {time.perf_counter() - started:.2f}s")
+    times = []
+    for step in range(args.reruns):
+        started = time.perf_counter()
+        app.slider[0].set_value(600 + 5 * (step % 40)).run()
+        times.append(time.perf_counter() - started)
+    print(f"app rerun after a slider move: median {statistics.median(times) * 1000:.0f} ms over {args.reruns}")
+
+
+def read_model():
+    with open(MODEL_PATH, 'rb') as file:
+        return pickle.load(file)
+
+
+def applicant():
+    import pandas as pd
+
+    return pd.DataFrame({
+        'credit_score': [650], 'annual_income': [60000], 'loan_amount': [100000], 'loan_term': [60],
+        'employment_years': [5], 'debt_to_income': [0.3], 'education': ['Bachelor'], 'employment_type': ['Full-time']
+    })
+
+
+# Scenario analysis the old way, one predict_proba call per value, against
+# one batched call for all values of all factors, and the same for a 2-D grid
+def bench_scenarios(args):
+    import numpy as np
+    from scenarios import FACTOR_RANGES, score_grid, score_scenarios
+
+    model = read_model()
+    base = applicant()
+
+    def one_at_a_time(factor, values):
+        probabilities = []
+        for value in values:
+            temp_data = base.copy()
+            temp_data[factor] = value
+            probabilities.append(model.predict_proba(temp_data)[0][1])
+        return probabilities
+
+    values, _ = FACTOR_RANGES['credit_score']
+    looped = timed(lambda: one_at_a_time('credit_score', values), args.repeat)
+    batched = timed(lambda: score_scenarios(model, base, {'credit_score': values}), args.repeat)
+    print(f"one factor, {len(values)} values: loop {looped * 1000:.1f} ms, batch {batched * 1000:.1f} ms "
+          f"({looped / batched:.1f}x)")
+
+    looped = timed(lambda: [one_at_a_time(factor, values) for factor, (values, _) in FACTOR_RANGES.items()], 1)
+    batched = timed(lambda: score_scenarios(model, base), args.repeat)
+    rows = sum(len(values) for values, _ in FACTOR_RANGES.values())
+    print(f"all factors, {rows} rows: loop {looped * 1000:.1f} ms, batch {batched * 1000:.1f} ms "
+          f"({looped / batched:.1f}x)")
+
+    x_values = np.linspace(300, 850, args.grid)
+    y_values = np.linspace(0, 0.6, args.grid)
+
+    def grid_loop():
+        for y in y_values:
+            for x in x_values:
+                temp_data = base.copy()
+                temp_data['credit_score'] = x
+                temp_data['debt_to_income'] = y
+                model.predict_proba(temp_data)
+
+    looped = timed(grid_loop, 1)
+    batched = timed(lambda: score_grid(model, base, 'credit_score', x_values, 'debt_to_income', y_values),
+                    args.repeat)
+    print(f"{args.grid}x{args.grid} grid: loop {looped:.2f} s, batch {batched * 1000:.1f} ms "
+          f"({looped / batched:.0f}x)")
+
+
+def applicants(n, seed=0):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'credit_score': rng.integers(300, 851, n),
+        'annual_income': rng.uniform(20000, 200000, n),
+        'loan_amount': rng.integers(5000, 500001, n),
+        'loan_term': rng.choice([36, 60, 84, 120, 180, 240, 360], n),
+        'employment_years': rng.uniform(0, 30, n).round(1),
+        'debt_to_income': rng.uniform(0, 0.6, n).round(2),
+        'education': rng.choice(['High School', 'Bachelor', 'Master', 'PhD'], n),
+        'employment_type': rng.choice(['Full-time', 'Part-time', 'Self-employed', 'Unemployed'], n),
+    })
+
+
+# The compiled forest against the scikit-learn pipeline, both on one
+# thread, from a single row up to large batches. Every size is checked for
+# identical probabilities before it is timed.
+def bench_compiled(args):
+    import numpy as np
+    from compiled_forest import compile_pipeline
+
+    model = read_model()
+    model.named_steps['classifier'].n_jobs = 1
+    started = time.perf_counter()
+    compiled = compile_pipeline(model)
+    print(f"compile: {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{compiled.n_trees} trees, {compiled.n_nodes:,} nodes")
+
+    data = applicants(max(args.rows))
+    for rows in args.rows:
+        frame = data.iloc[:rows]
+        if not np.array_equal(model.predict_proba(frame), compiled.predict_proba(frame)):
+            raise SystemExit(f"{rows} rows: compiled probabilities differ from the pipeline")
+        repeat = max(1, min(args.repeat, args.repeat * 1000 // rows))
+        sklearn = timed(lambda: model.predict_proba(frame), repeat)
+        fast = timed(lambda: compiled.predict_proba(frame), repeat)
+        print(f"{rows:>9,} rows: pipeline {sklearn * 1000:9.2f} ms, compiled {fast * 1000:9.2f} ms "
+              f"({sklearn / fast:.1f}x), identical")
+
+
+# The generator get_model() used to inline: legacy global seeding and the
+# category adjustments built by boolean-mask assignment on Series
+def legacy_synthetic(n_samples):
+    import numpy as np
+    import pandas as pd
+
+    np.random.seed(42)
+    data = pd.DataFrame({
+        'credit_score': np.random.randint(300, 850, n_samples),
+        'annual_income': np.random.randint(20000, 200000, n_samples),
+        'loan_amount': np.random.randint(5000, 500000, n_samples),
+        'loan_term': np.random.choice([36, 60, 84, 120, 180, 240, 360], n_samples),
+        'employment_years': np.random.randint(0, 30, n_samples),
+        'debt_to_income': np.random.uniform(0, 0.6, n_samples),
+        'education': np.random.choice(['High School', 'Bachelor', 'Master', 'PhD'], n_samples),
+        'employment_type': np.random.choice(['Full-time', 'Part-time', 'Self-employed', 'Unemployed'], n_samples),
+    })
+    approval_score = (
+        (data['credit_score'] - 300) / 550 * 0.35 +
+        (np.log10(data['annual_income']) - 4) / 2 * 0.25 +
+        (1 - data['loan_amount'] / 500000) * 0.15 +
+        (data['employment_years'] / 30) * 0.15 +
+        (1 - data['debt_to_income'] / 0.6) * 0.1
+    )
+    edu_bonus = pd.Series(0.0, index=range(n_samples))
+    edu_bonus[data['education'] == 'Bachelor'] = 0.05
+    edu_bonus[data['education'] == 'Master'] = 0.08
+    edu_bonus[data['education'] == 'PhD'] = 0.1
+    emp_impact = pd.Series(0.0, index=range(n_samples))
+    emp_impact[data['employment_type'] == 'Part-time'] = -0.1
+    emp_impact[data['employment_type'] == 'Self-employed'] = -0.05
+    emp_impact[data['employment_type'] == 'Unemployed'] = -0.4
+    approval_score = approval_score + edu_bonus + emp_impact + np.random.normal(0, 0.1, n_samples)
+    data['loan_approved'] = (approval_score > 0.5).astype(int)
+    return data
+
+
+# Synthetic data in memory, old generator against the new one, then the
+# sharded Parquet output at full volume with the peak worker memory
+def bench_generate(args):
+    import resource
+    from synthetic_data import generate_frame, write_shards
+
+    legacy = timed(lambda: legacy_synthetic(args.rows), args.repeat)
+    vectorized = timed(lambda: generate_frame(args.rows), args.repeat)
+    print(f"{args.rows:,} rows in memory: legacy {legacy * 1000:.0f} ms, generator {vectorized * 1000:.0f} ms "
+          f"({legacy / vectorized:.1f}x)")
+    print(f"approval rate: legacy {legacy_synthetic(args.rows)['loan_approved'].mean():.3f}, "
+          f"generator {generate_frame(args.rows)['loan_approved'].mean():.3f}")
+
+    directory = tempfile.mkdtemp()
+    started = time.perf_counter()
+    paths = write_shards(directory, args.shard_rows, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(path) for path in paths)
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"{args.shard_rows:,} rows to {len(paths)} shards: {elapsed:.1f}s ({args.shard_rows / elapsed:,.0f} rows/s), "
+          f"{size / 2 ** 20:,.0f} MiB on disk, peak worker memory {peak:,.0f} MiB")
+    shutil.rmtree(directory)
+
+
+# The hyperparameter search from a cold cache, then again with the same
+# data and grid, which must come from the result cache
+def bench_train(args):
+    from sklearn.model_selection import ParameterGrid
+    from train import load_data, run_search
+
+    frame = load_data(rows=args.rows)
+    cache_dir = tempfile.mkdtemp()
+    started = time.perf_counter()
+    first = run_search(frame, folds=args.folds, cache_dir=cache_dir, log=lambda message: None)
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    second = run_search(frame, folds=args.folds, cache_dir=cache_dir, log=lambda message: None)
+    warm = time.perf_counter() - started
+    fits = sum("output.pkl" in files for _, _, files in os.walk(os.path.join(cache_dir, "transformers")))
+    candidates = len(ParameterGrid(first['metadata']['grid']))
+    print(f"{args.rows:,} rows, {args.folds} folds: search {cold:.1f}s, "
+          f"preprocessing fitted {fits} times for {candidates * args.folds + 1} pipeline fits")
+    print(f"unchanged rerun: {warm * 1000:.0f} ms, same version: {first['metadata']['version'] == second['metadata']['version']}")
+    print(f"best {first['metadata']['params']}, test ROC AUC {first['metadata']['metrics']['test_roc_auc']:.4f}")
+    shutil.rmtree(cache_dir)
+
+
+# Time to first interaction from a cold start with no model file: the
+# first run serves the fallback while the forest trains in the background.
+# For comparison, the same training run inline, as the first run used to.
+def bench_cold_start(args):
+    from streamlit.testing.v1 import AppTest
+    from training_job import train, training_job
+
+    directory = tempfile.mkdtemp()
+    for name in os.listdir(HERE):
+        if name.endswith(".py"):
+            shutil.copy(os.path.join(HERE, name), directory)
+    os.chdir(directory)
+
+    app = AppTest.from_file(os.path.join(directory, "main.py"), default_timeout=300)
+    started = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - started
+    interaction = time.perf_counter()
+    app.slider[0].set_value(700).run()
+    interaction = time.perf_counter() - interaction
+    # The job the app started, shared through st.cache_resource
+    job = training_job("models")
+    while not job.done:
+        time.sleep(0.1)
+    if job.error:
+        raise SystemExit(f"background training failed: {job.error}")
+    ready = time.perf_counter() - started
+    app.run()
+    serving = "fallback" if any("warming up" in info.value for info in app.info) else "trained forest"
+    print(f"first run (fallback served): {first:.2f}s, next interaction {interaction:.2f}s")
+    print(f"trained model in place after {ready:.1f}s, then serving the {serving}")
+
+    started = time.perf_counter()
+    train(os.path.join(directory, "inline"), os.path.join(directory, "status.json"))
+    print(f"the same training inline, as the first run used to block on it: {time.perf_counter() - started:.1f}s")
+
+
+def _worker_memory(root, mmap, rows):
+    from registry import ModelRegistry
+
+    started = time.perf_counter()
+    compiled = ModelRegistry(root).load_compiled(mmap=mmap)
+    loaded = time.perf_counter() - started
+    compiled.predict_proba(applicants(rows))
+    # Proportional set size splits shared pages between the processes
+    # mapping them, so the workers' Pss adds up to their real footprint
+    with open("/proc/self/smaps_rollup") as file:
+        fields = dict(line.split(":", 1) for line in file if ":" in line and not line[0].isdigit())
+    return loaded, int(fields['Pss'].split()[0]) / 1024
+
+
+# Registry loading against the plain pickle, and the memory of several
+# worker processes holding the same large forest, mapped or loaded
+def bench_registry(args):
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+    from registry import ModelRegistry
+    from train import build_pipeline, load_data
+
+    root = tempfile.mkdtemp()
+    data = load_data(rows=args.rows)
+    model = build_pipeline(n_jobs=-1).fit(data.drop(columns='loan_approved'), data['loan_approved'])
+    version = ModelRegistry(root).register(model, promote=True)
+    registry = ModelRegistry(root)
+    pickle_path = os.path.join(root, "model.pkl")
+    with open(pickle_path, 'wb') as file:
+        pickle.dump(model, file)
+    size = os.path.getsize(os.path.join(root, version, "compiled.joblib")) / 2 ** 20
+    print(f"{args.rows:,} training rows: {registry.metadata(version)['n_nodes']:,} nodes, "
+          f"compiled forest {size:,.0f} MiB")
+
+    def unpickle():
+        with open(pickle_path, 'rb') as file:
+            return pickle.load(file)
+
+    print(f"plain pickle:           {timed(unpickle, args.repeat) * 1000:8.1f} ms")
+    print(f"registry pipeline:      {timed(registry.load_pipeline, args.repeat) * 1000:8.1f} ms")
+    print(f"compiled, read:         {timed(lambda: registry.load_compiled(mmap=False), args.repeat) * 1000:8.1f} ms")
+    print(f"compiled, memory-mapped:{timed(registry.load_compiled, args.repeat) * 1000:8.1f} ms")
+
+    for mmap in (False, True):
+        with ProcessPoolExecutor(args.workers) as pool:
+            results = list(pool.map(_worker_memory, [root] * args.workers, [mmap] * args.workers,
+                                    [args.score_rows] * args.workers))
+        print(f"{args.workers} workers, {'memory-mapped' if mmap else 'read into each'}: "
+              f"load {max(loaded for loaded, _ in results) * 1000:.1f} ms, "
+              f"total Pss {sum(pss for _, pss in results):,.0f} MiB")
+    shutil.rmtree(root)
+
+
+# The scoring of one predictor tab rerun (main prediction, every scenario
+# factor and the what-if) as a slider sweeps up and back down, straight to
+# the compiled forest against through the prediction cache
+def bench_prediction_cache(args):
+    import numpy as np
+    from compiled_forest import compile_pipeline
+    from prediction_cache import PredictionCache
+    from scenarios import score_scenarios
+
+    compiled = compile_pipeline(read_model())
+    base = applicant()
+    scores = list(range(600, 600 + 5 * args.steps, 5))
+    sweep = scores + scores[::-1]
+
+    def rerun(model, credit_score):
+        frame = base.assign(credit_score=credit_score)
+        what_if = frame.assign(debt_to_income=0.2)
+        probabilities = model.predict_proba(frame)[0]
+        return (probabilities[1], model.classes_[np.argmax(probabilities)],
+                score_scenarios(model, frame), model.predict_proba(what_if)[0][1])
+
+    cache = PredictionCache()
+    scorer = cache.scorer("bench", compiled)
+    for credit_score in sweep:
+        direct, cached = rerun(compiled, credit_score), rerun(scorer, credit_score)
+        if direct[:2] != cached[:2] or direct[3] != cached[3] or \
+                any(not np.array_equal(direct[2][f], cached[2][f]) for f in direct[2]):
+            raise SystemExit(f"credit score {credit_score}: cached probabilities differ")
+    cache.clear()
+
+    def run(model):
+        times = []
+        for credit_score in sweep:
+            started = time.perf_counter()
+            rerun(model, credit_score)
+            times.append(time.perf_counter() - started)
+        return times
+
+    direct = run(compiled)
+    cached = run(scorer)
+    half = len(scores)
+    print(f"{len(sweep)} reruns, {half} slider positions each way, identical probabilities")
+    print(f"uncached: median {statistics.median(direct) * 1000:.2f} ms per rerun")
+    print(f"cached, first pass: median {statistics.median(cached[:half]) * 1000:.2f} ms, "
+          f"way back: median {statistics.median(cached[half:]) * 1000:.2f} ms")
+    print(f"{cache.hits:,} hits / {cache.misses:,} misses ({cache.hit_rate:.0%}), {len(cache):,} entries")
+    cache.scorer("other", compiled).predict_proba(base)
+    print(f"after a model change: {len(cache)} entries, {cache.invalidations} invalidation")
+
+
+# The history tab against a year of saved applications: the old CSV, read
+# whole and re-parsed on every rerun, against the day-partitioned store
+# reading a 30-day window plus its all-time totals
+def bench_history(args):
+    import numpy as np
+    import pandas as pd
+    from history_store import HistoryStore
+
+    directory = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    frame = applicants(args.rows).astype({'annual_income': int, 'employment_years': int})
+    now = pd.Timestamp.now().floor('s')
+    frame.insert(0, 'timestamp', (now - pd.to_timedelta(rng.uniform(0, args.days, args.rows), unit='D')).floor('s'))
+    frame['approval_probability'] = [f"{value:.2%}" for value in rng.random(args.rows)]
+    frame['predicted_approval'] = np.where(rng.random(args.rows) > 0.5, "Approved", "Denied")
+    frame = frame.sort_values('timestamp')
+    csv_path = os.path.join(directory, "saved_loan_applications.csv")
+    frame.to_csv(csv_path, index=False)
+
+    def legacy():
+        saved_df = pd.read_csv(csv_path)
+        saved_df['approval_numeric'] = saved_df['approval_probability'].str.rstrip('%').astype(float) / 100
+        return saved_df, saved_df['approval_numeric'].mean()
+
+    store = HistoryStore(os.path.join(directory, "history"))
+    started = time.perf_counter()
+    store.import_csv(csv_path)
+    store.compact_closed()
+    print(f"{args.rows:,} applications over {args.days} days; import and compaction "
+          f"{time.perf_counter() - started:.1f}s")
+
+    totals = store.summary()
+    expected = legacy()[1]
+    if totals['count'] != args.rows or abs(totals['mean_probability'] - expected) > 1e-9:
+        raise SystemExit("store totals differ from the CSV")
+    old = timed(legacy, args.repeat)
+    window = timed(lambda: (store.read_last(30), store.summary()), args.repeat)
+    print(f"history tab: CSV {old * 1000:.0f} ms, store {window * 1000:.0f} ms "
+          f"({len(store.read_last(30)):,} rows shown) ({old / window:.1f}x)")
+    record = dict(frame.iloc[-1].to_dict(), approval_probability=0.5)
+    print(f"save: {timed(lambda: store.append(record), args.repeat) * 1000:.2f} ms")
+    shutil.rmtree(directory)
+
+
+# App reruns after a slider move, split into the time spent drawing and
+# encoding figures and everything else
+def bench_render(args):
+    import matplotlib.pyplot as plt
+    import streamlit as st
+
+    import figures
+
+    figure_time = []
+    drawing = []
+
+    # A figure's time runs from making or fetching it to the end of the call
+    # that hands it to Streamlit
+    def start(function):
+        def timed_call(*args, **kwargs):
+            drawing.append(time.perf_counter())
+            return function(*args, **kwargs)
+        return timed_call
+
+    def finish(function):
+        def timed_call(*args, **kwargs):
+            started = drawing.pop() if drawing else time.perf_counter()
+            drawing.clear()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                figure_time[-1] += time.perf_counter() - started
+        return timed_call
+
+    plt.subplots = start(plt.subplots)
+    figures.session_figure = start(figures.session_figure)
+    figures.feature_importance_svg = start(figures.feature_importance_svg)
+    for name in ("pyplot", "image", "vega_lite_chart"):
+        setattr(st, name, finish(getattr(st, name)))
+
+    app = app_copy()
+    figure_time.append(0.0)
+    app.run()
+    totals = []
+    figure_time.clear()
+    for step in range(args.reruns):
+        figure_time.append(0.0)
+        started = time.perf_counter()
+        app.slider[0].set_value(600 + 5 * (step % 40)).run()
+        totals.append(time.perf_counter() - started)
+    if app.exception:
+        raise SystemExit(app.exception[0].value)
+    print(f"rerun after a slider move: median {statistics.median(totals) * 1000:.0f} ms, "
+          f"of which figures {statistics.median(figure_time) * 1000:.0f} ms, over {args.reruns} reruns")
+
+
+# Per-applicant explanations on the compiled forest: one applicant cold
+# and from the cache, and batches. Checked first against the same path
+# attribution computed tree by tree with scikit-learn's decision_path.
+def bench_explain(args):
+    import numpy as np
+    from compiled_forest import compile_pipeline
+    from prediction_cache import PredictionCache
+
+    model = read_model()
+    compiled = compile_pipeline(model)
+    print(f"{compiled.n_trees} trees, {compiled.n_nodes:,} nodes")
+
+    data = applicants(max(args.rows))
+    sample = data.iloc[:20]
+    X = model.named_steps['preprocessor'].transform(sample).astype(np.float32)
+    expected = np.zeros(X.shape)
+    for estimator in model.named_steps['classifier'].estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, -1] / tree.value[:, 0, :].sum(axis=1)
+        paths = estimator.decision_path(X)
+        for row in range(len(sample)):
+            nodes = paths.indices[paths.indptr[row]:paths.indptr[row + 1]]
+            np.add.at(expected[row], tree.feature[nodes[:-1]], value[nodes[1:]] - value[nodes[:-1]])
+    expected /= compiled.n_trees
+    # One-hot columns summed back into their input
+    offset = len(compiled.numeric)
+    owner = np.concatenate([np.arange(offset)] + [np.full(len(values), offset + index)
+                                                  for index, values in enumerate(compiled.categories)])
+    grouped = np.zeros((len(sample), len(compiled.inputs)))
+    np.add.at(grouped, (slice(None), owner), expected)
+    expected = grouped
+    if not np.allclose(compiled.explain(sample), expected, rtol=0, atol=1e-12):
+        raise SystemExit("explanations differ from the tree-by-tree reference")
+    error = np.abs(compiled.bias + compiled.explain(data).sum(axis=1) - compiled.predict_proba(data)[:, 1]).max()
+    print(f"matches the tree-by-tree reference; bias + contributions is the probability to within {error:.1e}")
+
+    cache = PredictionCache()
+    single = data.iloc[:1]
+    cold = timed(lambda: (cache.clear(), cache.lookup("bench", compiled.explain, single)), args.repeat)
+    cached = timed(lambda: cache.lookup("bench", compiled.explain, single), args.repeat)
+    print(f"one applicant: {cold * 1000:.2f} ms, from the cache {cached * 1000:.3f} ms")
+    for rows in args.rows:
+        frame = data.iloc[:rows]
+        repeat = max(1, min(args.repeat, args.repeat * 1000 // rows))
+        print(f"{rows:>9,} applicants: {timed(lambda: compiled.explain(frame), repeat) * 1000:9.2f} ms")
+
+
+# Approved-applicant statistics from the running sketch against a rescan
+# of every saved application, with the error of the sketch's percentiles
+def bench_cohort(args):
+    import numpy as np
+    from cohort_stats import CohortStats
+    from train import NUMERIC_FEATURES, approved_cohort, load_data
+
+    data = load_data(rows=args.rows)
+    approved = data[data['loan_approved'] == 1]
+    started = time.perf_counter()
+    training = approved_cohort(data)
+    print(f"{len(approved):,} approved of {args.rows:,}: sketch built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    saved = CohortStats(NUMERIC_FEATURES)
+    rows = [approved.iloc[[index]] for index in range(args.saves)]
+    per_save = timed(lambda: [saved.add(row) for row in rows], 1) / args.saves
+    columns = approved[NUMERIC_FEATURES]
+    rescan = timed(lambda: (columns.mean(), columns.quantile([0.25, 0.5, 0.75])), args.repeat)
+    merged = timed(lambda: training.merge(saved).summary(), args.repeat)
+    print(f"per save: {per_save * 1000:.2f} ms; comparison table: sketch {merged * 1000:.2f} ms, "
+          f"rescan {rescan * 1000:.2f} ms")
+
+    exact = np.percentile(approved[NUMERIC_FEATURES].to_numpy(dtype=np.float64), [25, 50, 75], axis=0)
+    error = np.abs(training.percentiles([25, 50, 75]) - exact) / (training.maximum - training.minimum)
+    print(f"means exact; percentiles within {error.max():.1%} of each input's range "
+          f"({training.size} sampled rows)")
+
+
+# Drift monitoring after each batch: counting only the new rows into the
+# per-day histograms against rebinning every row in the window
+def bench_drift(args):
+    import pandas as pd
+    from drift_monitor import ALERT_WINDOW_DAYS, DriftMonitor, drift_report
+    from train import input_reference, load_data
+
+    started = time.perf_counter()
+    monitor = DriftMonitor(input_reference(load_data()), tempfile.mkdtemp())
+    print(f"reference built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    batches = [load_data(rows=args.batch_rows, seed=seed) for seed in range(args.batches)]
+    window = []
+    incremental, rescan = [], []
+    for batch in batches:
+        started = time.perf_counter()
+        monitor.observe(batch, "batch")
+        incremental.append(time.perf_counter() - started)
+        window.append(batch)
+        # What a monitor without stored counts would redo after each batch
+        started = time.perf_counter()
+        drift_report(monitor.reference, monitor.reference.bin_counts(pd.concat(window, ignore_index=True)))
+        rescan.append(time.perf_counter() - started)
+    rows = args.batch_rows * args.batches
+    print(f"{args.batches} batches of {args.batch_rows:,} rows: incremental {incremental[0] * 1000:.1f} ms "
+          f"to {incremental[-1] * 1000:.1f} ms per batch; rescan {rescan[0] * 1000:.1f} ms to "
+          f"{rescan[-1] * 1000:.1f} ms ({rows:,} rows in the window)")
+    report = timed(lambda: monitor.report(ALERT_WINDOW_DAYS), args.repeat)
+    print(f"dashboard report from stored counts: {report * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loan approval predictor benchmarks")
+    commands = parser.add_subparsers(dest="benchmark", required=True)
+
+    model_load = commands.add_parser("model-load", help="model loading per rerun, cold start and reload")
+    model_load.add_argument("--repeat", type=int, default=20)
+    model_load.add_argument("--app", action="store_true", help="also time full app reruns")
+    model_load.add_argument("--reruns", type=int, default=10)
+    model_load.set_defaults(run=bench_model_load)
+
+    scenarios = commands.add_parser("scenarios", help="scenario analysis, looped against batched scoring")
+    scenarios.add_argument("--repeat", type=int, default=10)
+    scenarios.add_argument("--grid", type=int, default=30)
+    scenarios.set_defaults(run=bench_scenarios)
+
+    compiled = commands.add_parser("compiled", help="compiled forest against the scikit-learn pipeline")
+    compiled.add_argument("--repeat", type=int, default=20)
+    compiled.add_argument("--rows", type=int, nargs="+", default=[1, 10, 100, 1000, 10000, 100000])
+    compiled.set_defaults(run=bench_compiled)
+
+    generate = commands.add_parser("generate", help="synthetic data generation, legacy against vectorized")
+    generate.add_argument("--repeat", type=int, default=5)
+    generate.add_argument("--rows", type=int, default=1_000_000, help="rows for the in-memory comparison")
+    generate.add_argument("--shard-rows", type=int, default=10_000_000, help="rows written as Parquet shards")
+    generate.add_argument("--chunk-size", type=int, default=1_000_000)
+    generate.set_defaults(run=bench_generate)
+
+    train = commands.add_parser("train", help="hyperparameter search, cold and cached")
+    train.add_argument("--rows", type=int, default=20000)
+    train.add_argument("--folds", type=int, default=3)
+    train.set_defaults(run=bench_train)
+
+    cold_start = commands.add_parser("cold-start", help="time to first interaction without a model file")
+    cold_start.set_defaults(run=bench_cold_start)
+
+    registry = commands.add_parser("registry", help="registry loading and shared memory across workers")
+    registry.add_argument("--rows", type=int, default=100000, help="training rows; sets the forest size")
+    registry.add_argument("--repeat", type=int, default=5)
+    registry.add_argument("--workers", type=int, default=4)
+    registry.add_argument("--score-rows", type=int, default=20000, help="rows each worker scores")
+    registry.set_defaults(run=bench_registry)
+
+    prediction_cache = commands.add_parser("prediction-cache", help="predictor reruns with and without the cache")
+    prediction_cache.add_argument("--steps", type=int, default=20, help="slider positions in each direction")
+    prediction_cache.set_defaults(run=bench_prediction_cache)
+
+    history = commands.add_parser("history", help="application history, CSV against the partitioned store")
+    history.add_argument("--rows", type=int, default=200000)
+    history.add_argument("--days", type=int, default=365)
+    history.add_argument("--repeat", type=int, default=5)
+    history.set_defaults(run=bench_history)
+
+    render = commands.add_parser("render", help="app rerun time spent on figures")
+    render.add_argument("--reruns", type=int, default=10)
+    render.set_defaults(run=bench_render)
+
+    explain = commands.add_parser("explain", help="per-applicant explanations, single and batched")
+    explain.add_argument("--repeat", type=int, default=20)
+    explain.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    explain.set_defaults(run=bench_explain)
+
+    cohort = commands.add_parser("cohort", help="approved-applicant statistics, sketch against rescan")
+    cohort.add_argument("--rows", type=int, default=1_000_000)
+    cohort.add_argument("--saves", type=int, default=200)
+    cohort.add_argument("--repeat", type=int, default=5)
+    cohort.set_defaults(run=bench_cohort)
+
+    drift = commands.add_parser("drift", help="drift monitoring per batch, incremental against rescan")
+    drift.add_argument("--batches", type=int, default=20)
+    drift.add_argument("--batch-rows", type=int, default=50000)
+    drift.add_argument("--repeat", type=int, default=20)
+    drift.set_defaults(run=bench_drift)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Summary statistics of a stream of applicants that can be updated a few
+# rows at a time and merged with other summaries, without keeping the rows.
+#
+# Count, mean and variance are exact running moments, combined with Chan's
+# formula. Medians and percentiles come from a uniform reservoir sample of
+# fixed size. Two reservoirs merge into a uniform sample of the combined
+# stream by drawing how many rows come from each from the hypergeometric
+# distribution their counts give, then sampling that many from each.
+
+SAMPLE_SIZE = 1024
+
+
+class CohortStats:
+    def __init__(self, features, size=SAMPLE_SIZE):
+        self.features = list(features)
+        self.size = size
+        self.count = 0
+        self.mean = np.zeros(len(self.features))
+        self.m2 = np.zeros(len(self.features))
+        self.minimum = np.full(len(self.features), np.inf)
+        self.maximum = np.full(len(self.features), -np.inf)
+        self.sample = np.empty((0, len(self.features)))
+
+    @classmethod
+    def from_frame(cls, frame, features, size=SAMPLE_SIZE, seed=None):
+        stats = cls(features, size)
+        values = frame[stats.features].to_numpy(dtype=np.float64)
+        if len(values):
+            stats.count = len(values)
+            stats.mean = values.mean(axis=0)
+            stats.m2 = ((values - stats.mean) ** 2).sum(axis=0)
+            stats.minimum = values.min(axis=0)
+            stats.maximum = values.max(axis=0)
+            if len(values) > size:
+                values = values[np.random.default_rng(seed).choice(len(values), size, replace=False)]
+            stats.sample = values.copy()
+        return stats
+
+    def merge(self, other, seed=None):
+        if other.features != self.features:
+            raise ValueError("Cannot merge statistics of different features")
+        merged = CohortStats(self.features, min(self.size, other.size))
+        merged.count = self.count + other.count
+        if merged.count == 0:
+            return merged
+        delta = other.mean - self.mean
+        merged.mean = self.mean + delta * other.count / merged.count
+        merged.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / merged.count
+        merged.minimum = np.minimum(self.minimum, other.minimum)
+        merged.maximum = np.maximum(self.maximum, other.maximum)
+
+        rng = np.random.default_rng(seed)
+        take = min(merged.size, merged.count)
+        from_self = rng.hypergeometric(self.count, other.count, take) if self.count and other.count else \
+            (take if self.count else 0)
+        merged.sample = np.vstack([
+            self.sample[rng.choice(len(self.sample), from_self, replace=False)],
+            other.sample[rng.choice(len(other.sample), take - from_self, replace=False)],
+        ])
+        return merged
+
+    def add(self, frame, seed=None):
+        merged = self.merge(CohortStats.from_frame(frame, self.features, self.size, seed), seed)
+        self.__dict__.update(merged.__dict__)
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.zeros(len(self.features))
+
+    def percentiles(self, q):
+        if not len(self.sample):
+            return np.full((len(np.atleast_1d(q)), len(self.features)), np.nan)
+        return np.percentile(self.sample, q, axis=0).reshape(-1, len(self.features))
+
+    def summary(self):
+        p25, median, p75 = self.percentiles([25, 50, 75])
+        return {
+            feature: {
+                'mean': self.mean[index], 'std': self.std[index], 'min': self.minimum[index],
+                'p25': p25[index], 'median': median[index], 'p75': p75[index], 'max': self.maximum[index],
+            }
+            for index, feature in enumerate(self.features)
+        }
+
+    def to_dict(self):
+        return {
+            'features': self.features,
+            'size': self.size,
+            'count': self.count,
+            'mean': self.mean.tolist(),
+            'm2': self.m2.tolist(),
+            'minimum': self.minimum.tolist(),
+            'maximum': self.maximum.tolist(),
+            'sample': self.sample.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data['features'], data['size'])
+        stats.count = data['count']
+        for name in ('mean', 'm2', 'minimum', 'maximum'):
+            setattr(stats, name, np.array(data[name], dtype=np.float64))
+        stats.sample = np.array(data['sample'], dtype=np.float64).reshape(-1, len(stats.features))
+        return stats
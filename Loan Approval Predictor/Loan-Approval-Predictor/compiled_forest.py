@@ -0,0 +1,247 @@
+import numpy as np
+
+# Inference for the fitted loan pipeline without going through scikit-learn.
+#
+# The scaler and one-hot encoder are applied inline, and every tree of the
+# forest is flattened into one set of contiguous node arrays, so scoring is
+# a few NumPy gathers per tree level for all rows and all trees at once.
+# Results are identical to the pipeline's predict_proba: features are
+# rounded to float32 before the threshold tests as the trees do, leaf
+# probabilities are normalised the same way and trees are summed in order.
+# Missing values are handled as the pipeline handles them: a missing number
+# takes the side each split learned for missing values, and a missing or
+# non-string category is an unknown one.
+
+CHUNK_ROWS = 4096  # rows walked down the trees together
+COMPACT_EVERY = 4  # levels between dropping finished walks
+
+
+class CompiledForest:
+    def __init__(self, numeric, mean, scale, categorical, categories, feature, threshold, left, is_leaf,
+                 leaf_value, roots, classes, missing_right):
+        self.numeric = numeric
+        self.mean = mean
+        self.scale = scale
+        self.categorical = categorical
+        self.categories = categories
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.is_leaf = is_leaf
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.classes_ = classes
+        self.missing_right = missing_right
+        self.n_features = len(numeric) + sum(len(values) for values in categories)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def transform(self, frame):
+        n = len(frame)
+        X = np.zeros((n, self.n_features))
+        # Column by column: selecting a sub-frame costs more than scoring one row
+        for index, column in enumerate(self.numeric):
+            X[:, index] = frame[column].to_numpy(dtype=np.float64)
+        X[:, :len(self.numeric)] -= self.mean
+        X[:, :len(self.numeric)] /= self.scale
+        offset = len(self.numeric)
+        rows = np.arange(n)
+        for column, values in zip(self.categorical, self.categories):
+            # Categories are sorted; anything not among them sets no column,
+            # as with handle_unknown='ignore'
+            data = frame[column].to_numpy(dtype=object)
+            try:
+                codes = np.searchsorted(values, data)
+                known = np.ones(n, dtype=bool)
+            except TypeError:
+                # None, NaN and numbers do not order against the categories
+                known = np.array([isinstance(value, str) for value in data], dtype=bool)
+                codes = np.zeros(n, dtype=np.intp)
+                codes[known] = np.searchsorted(values, data[known])
+            codes = np.minimum(codes, len(values) - 1)
+            known &= values[codes] == data
+            X[rows[known], offset + codes[known]] = 1.0
+            offset += len(values)
+        # The trees see float32 features
+        return X.astype(np.float32)
+
+    # The child a split sends each walk to: the right one when the value is
+    # above the threshold, or missing and the split sends missing values
+    # right. Most batches have no missing values and skip that check.
+    def _step(self, nodes, values, missing):
+        right = values > self.threshold[nodes]
+        if missing:
+            right |= np.isnan(values) & self.missing_right[nodes]
+        return self.left[nodes] + right
+
+    def apply(self, X):
+        n = len(X)
+        flat = X.ravel()
+        missing = np.isnan(flat).any()
+        # One entry per (row, tree) still walking down, with the offset of
+        # its row in the flat feature array
+        nodes = np.tile(self.roots, n)
+        position = np.repeat(np.arange(n) * X.shape[1], self.n_trees)
+        slot = np.arange(n * self.n_trees)
+        leaves = np.empty(n * self.n_trees, dtype=np.intp)
+        level = 0
+        while len(nodes):
+            # Leaves step to themselves, so walks that finished are only
+            # dropped every few levels rather than checked at each one
+            if level % COMPACT_EVERY == 0:
+                done = self.is_leaf[nodes]
+                if done.any():
+                    leaves[slot[done]] = nodes[done]
+                    walking = ~done
+                    nodes, position, slot = nodes[walking], position[walking], slot[walking]
+            # Siblings are adjacent: the right child follows the left one
+            nodes = self._step(nodes, flat[position + self.feature[nodes]], missing)
+            level += 1
+        return leaves.reshape(n, self.n_trees)
+
+    def predict_proba(self, frame):
+        X = self.transform(frame)
+        proba = np.zeros((len(X), len(self.classes_)))
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self.apply(X[start:start + CHUNK_ROWS])
+            # Summed tree by tree in the forest's order, as scikit-learn sums
+            # them; cumsum adds strictly left to right
+            proba[start:start + CHUNK_ROWS] = np.cumsum(self.leaf_value[leaves], axis=1)[:, -1]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, frame):
+        return self.classes_.take(np.argmax(self.predict_proba(frame), axis=1))
+
+    @property
+    def inputs(self):
+        return list(self.numeric) + list(self.categorical)
+
+    # Approval probability of a node-less forest: the mean of the root
+    # values, where every explanation starts from
+    @property
+    def bias(self):
+        return self.leaf_value[self.roots, -1].mean()
+
+    def _contributions(self, X):
+        n, width = X.shape
+        flat = X.ravel()
+        missing = np.isnan(flat).any()
+        value = self.leaf_value[:, -1]
+        nodes = np.tile(self.roots, n)
+        # Offset of the row in the flat feature array; plus the split's
+        # feature it is also the slot its contribution is added to
+        position = np.repeat(np.arange(n) * width, self.n_trees)
+        total = np.zeros(n * width)
+        level = 0
+        while len(nodes):
+            if level % COMPACT_EVERY == 0:
+                walking = ~self.is_leaf[nodes]
+                nodes, position = nodes[walking], position[walking]
+            slot = position + self.feature[nodes]
+            child = self._step(nodes, flat[slot], missing)
+            # A leaf is its own child and adds nothing
+            total += np.bincount(slot, weights=value[child] - value[nodes], minlength=n * width)
+            nodes = child
+            level += 1
+        return total.reshape(n, width)
+
+    # Per-input contributions to the approval probability, path by path:
+    # each split a row passes credits the change in approval probability
+    # between the node and the child taken to the split's input. Along one
+    # tree they add up to its leaf value less its root value, so for every
+    # row bias + contributions.sum() is the approval probability.
+    def explain(self, frame):
+        X = self.transform(frame)
+        contributions = np.zeros((len(X), self.n_features))
+        for start in range(0, len(X), CHUNK_ROWS):
+            contributions[start:start + CHUNK_ROWS] = self._contributions(X[start:start + CHUNK_ROWS])
+        contributions /= self.n_trees
+        # The one-hot columns of a categorical input go back to it
+        offset = len(self.numeric)
+        columns = [contributions[:, :offset]]
+        for values in self.categories:
+            columns.append(contributions[:, offset:offset + len(values)].sum(axis=1, keepdims=True))
+            offset += len(values)
+        return np.hstack(columns)
+
+
+# Node order with each node's children next to each other
+def _sibling_order(children_left, children_right):
+    order = [0]
+    for node in order:
+        if children_left[node] != -1:
+            order.extend((children_left[node], children_right[node]))
+    return np.array(order)
+
+
+def compile_pipeline(model):
+    try:
+        preprocessor = model.named_steps['preprocessor']
+        forest = model.named_steps['classifier']
+        scaler = preprocessor.named_transformers_['num']
+        encoder = preprocessor.named_transformers_['cat']
+    except (AttributeError, KeyError):
+        raise ValueError("Only the loan pipeline (scaler, one-hot encoder, random forest) can be compiled")
+    if forest.n_outputs_ != 1 or encoder.drop_idx_ is not None or preprocessor.remainder != 'drop':
+        raise ValueError("Unsupported pipeline configuration")
+    columns = dict((name, list(selected)) for name, _, selected in preprocessor.transformers_)
+
+    feature, threshold, left, is_leaf, leaf_value, roots, missing_right = [], [], [], [], [], [], []
+    start = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        order = _sibling_order(tree.children_left, tree.children_right)
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        leaf = tree.children_left[order] == -1
+
+        # float32 features compared against the float64 thresholds: x <= t
+        # exactly when x <= the largest float32 not above t
+        split = tree.threshold[order].astype(np.float32)
+        above = split > tree.threshold[order]
+        split[above] = np.nextafter(split[above], np.float32(-np.inf))
+        # A leaf's test never passes and its left child is itself
+        split[leaf] = np.inf
+        child = np.where(leaf, np.arange(len(order)), position[np.maximum(tree.children_left[order], 0)])
+
+        # Where each split sends missing values; scikit-learn before 1.3
+        # rejected them instead
+        go_left = getattr(tree, 'missing_go_to_left', None)
+        missing_right.append(~leaf & (go_left[order] == 0) if go_left is not None else np.zeros(len(order), bool))
+
+        roots.append(start)
+        feature.append(np.where(leaf, 0, tree.feature[order]))
+        threshold.append(split)
+        left.append(child + start)
+        is_leaf.append(leaf)
+        # Normalised per node exactly as DecisionTreeClassifier.predict_proba
+        # normalises the leaves it reaches
+        value = tree.value[order, 0, :].copy()
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value /= normalizer
+        leaf_value.append(value)
+        start += len(order)
+
+    return CompiledForest(
+        numeric=columns['num'],
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        categorical=columns['cat'],
+        categories=[np.asarray(values) for values in encoder.categories_],
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left).astype(np.intp),
+        is_leaf=np.concatenate(is_leaf),
+        leaf_value=np.concatenate(leaf_value),
+        roots=np.array(roots, dtype=np.intp),
+        classes=forest.classes_,
+        missing_right=np.concatenate(missing_right),
+    )
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from file_lock import file_lock
+
+# Input drift: how far incoming applications have moved from the data the
+# model was trained on.
+#
+# The training data is summarised once as a histogram per input: quantile
+# bins for numbers, one bin per category (plus one for categories never
+# seen in training). Incoming applications, saved in the app or scored by
+# batch_score.py, are counted into the same bins, one set of counts per day
+# and source, so an update costs O(new rows) and a rolling window is the
+# sum of its days' counts. PSI and the KS statistic are computed from the
+# counts alone; KS is taken at the bin edges, a slight underestimate of
+# the exact statistic.
+#
+#   drift_monitor/<reference>/state.json    counts per day and source
+#   drift_monitor/<reference>/alerts.jsonl  one line per alert raised
+#
+# Counts are kept per training reference: a model trained on other data
+# starts its own.
+
+BINS = 20
+PSI_ALERT = 0.25  # the usual "significant shift" line
+PSI_WATCH = 0.1
+KS_ALERT = 0.1
+MIN_ROWS = 200  # fewer rows than this give noisy PSI
+ALERT_WINDOW_DAYS = 7
+RETENTION_DAYS = 90
+STATE_FILE = "state.json"
+ALERTS_FILE = "alerts.jsonl"
+
+
+class DriftReference:
+    def __init__(self, edges, categories, counts):
+        self.edges = {feature: np.asarray(values, dtype=np.float64) for feature, values in edges.items()}
+        self.categories = {feature: list(values) for feature, values in categories.items()}
+        self.counts = {feature: np.asarray(values, dtype=np.int64) for feature, values in counts.items()}
+        self.features = list(self.edges) + list(self.categories)
+        self.digest = hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def from_frame(cls, frame, numeric, categorical, bins=BINS):
+        edges = {}
+        for feature in numeric:
+            values = frame[feature].to_numpy(dtype=np.float64)
+            # Inner edges only; repeated quantiles of discrete inputs collapse
+            edges[feature] = np.unique(np.quantile(values, np.arange(1, bins) / bins))
+        categories = {feature: sorted(str(value) for value in frame[feature].unique()) for feature in categorical}
+        reference = cls(edges, categories, {})
+        reference.counts = reference.bin_counts(frame)
+        return reference
+
+    def bin_counts(self, frame):
+        counts = {}
+        for feature, edges in self.edges.items():
+            bins = np.searchsorted(edges, frame[feature].to_numpy(dtype=np.float64), side='right')
+            counts[feature] = np.bincount(bins, minlength=len(edges) + 1)
+        for feature, categories in self.categories.items():
+            codes = pd.Categorical(frame[feature].astype(str), categories=categories).codes
+            # Unseen categories (code -1) go to the last bin
+            counts[feature] = np.bincount(np.where(codes < 0, len(categories), codes),
+                                          minlength=len(categories) + 1)
+        return counts
+
+    def bin_labels(self, feature):
+        if feature in self.categories:
+            return self.categories[feature] + ["(other)"]
+        edges = [f"{edge:,.4g}" for edge in self.edges[feature]]
+        return [f"< {edges[0]}"] + [f"{low} to {high}" for low, high in zip(edges, edges[1:])] + [f">= {edges[-1]}"]
+
+    def to_dict(self):
+        return {
+            'edges': {feature: values.tolist() for feature, values in self.edges.items()},
+            'categories': self.categories,
+            'counts': {feature: values.tolist() for feature, values in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['edges'], data['categories'], data['counts'])
+
+
+def psi(expected, actual, floor=1e-4):
+    # Empty bins are floored, or one would make the index infinite
+    p = np.maximum(expected / expected.sum(), floor)
+    q = np.maximum(actual / actual.sum(), floor)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks(expected, actual):
+    return float(np.abs(np.cumsum(expected / expected.sum()) - np.cumsum(actual / actual.sum())).max())
+
+
+def drift_report(reference, counts):
+    rows = []
+    for feature in reference.features:
+        actual = counts.get(feature)
+        total = int(actual.sum()) if actual is not None else 0
+        if total == 0:
+            rows.append({'feature': feature, 'rows': 0, 'psi': np.nan, 'ks': np.nan, 'status': "no data"})
+            continue
+        expected = reference.counts[feature]
+        feature_psi = psi(expected, actual)
+        # Categories have no order, so no distribution function to compare
+        feature_ks = ks(expected, actual) if feature in reference.edges else np.nan
+        if total < MIN_ROWS:
+            status = "too few rows"
+        elif feature_psi >= PSI_ALERT or feature_ks >= KS_ALERT:
+            status = "drift"
+        elif feature_psi >= PSI_WATCH:
+            status = "watch"
+        else:
+            status = "stable"
+        rows.append({'feature': feature, 'rows': total, 'psi': feature_psi, 'ks': feature_ks, 'status': status})
+    return pd.DataFrame(rows, columns=['feature', 'rows', 'psi', 'ks', 'status'])
+
+
+def _load_state(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'days': {}, 'alerting': []}
+
+
+# The state is replaced on every update; keyed on the file's identity, so
+# reruns between updates do not parse it again
+@lru_cache(maxsize=16)
+def _read_state(path, inode, mtime_ns, size):
+    return _load_state(path)
+
+
+class DriftMonitor:
+    def __init__(self, reference, root="drift_monitor"):
+        self.reference = reference
+        self.root = os.path.join(root, reference.digest[:12])
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def state(self):
+        path = self._path(STATE_FILE)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return _load_state(path)
+        return _read_state(path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def window_counts(self, days=ALERT_WINDOW_DAYS, sources=None, today=None, state=None):
+        state = state or self.state()
+        start = ((today or date.today()) - timedelta(days=days - 1)).isoformat()
+        totals = {}
+        for day, by_source in state['days'].items():
+            if day < start:
+                continue
+            for source, counts in by_source.items():
+                if sources is not None and source not in sources:
+                    continue
+                for feature, values in counts.items():
+                    totals[feature] = totals.get(feature, 0) + np.asarray(values)
+        return totals
+
+    def report(self, days=ALERT_WINDOW_DAYS, sources=None, today=None):
+        return drift_report(self.reference, self.window_counts(days, sources, today))
+
+    def observe(self, frame, source, today=None, only_if_new=False):
+        # Rows with a timestamp (saved applications) count on their own day,
+        # others (a scored batch) on today
+        today = today or date.today()
+        if 'timestamp' in frame.columns:
+            groups = [(day.isoformat(), rows) for day, rows in frame.groupby(frame['timestamp'].dt.date)]
+        else:
+            groups = [(today.isoformat(), frame)]
+        # Sessions and batch jobs update the same file: one at a time
+        with file_lock(self._path(".lock")):
+            if only_if_new and os.path.exists(self._path(STATE_FILE)):
+                return []
+            # Read past the cache: the last update may be too recent to
+            # have changed the file's mtime
+            state = _load_state(self._path(STATE_FILE))
+            days = dict(state['days'])
+            for day, rows in groups:
+                by_source = dict(days.get(day, {}))
+                previous = by_source.get(source, {})
+                by_source[source] = {feature: (np.asarray(previous.get(feature, 0)) + counts).tolist()
+                                     for feature, counts in self.reference.bin_counts(rows).items()}
+                days[day] = by_source
+            oldest = (today - timedelta(days=RETENTION_DAYS - 1)).isoformat()
+            days = {day: by_source for day, by_source in days.items() if day >= oldest}
+
+            report = drift_report(self.reference, self.window_counts(today=today, state={'days': days}))
+            drifting = report[report['status'] == "drift"]
+            alerts = [{'time': datetime.now().isoformat(timespec='seconds'), 'source': source,
+                       'window_days': ALERT_WINDOW_DAYS, **row}
+                      for row in drifting.to_dict('records') if row['feature'] not in state['alerting']]
+            self._write(STATE_FILE, {'days': days, 'alerting': drifting['feature'].tolist()})
+            if alerts:
+                with open(self._path(ALERTS_FILE), 'a') as file:
+                    for alert in alerts:
+                        file.write(json.dumps(alert, default=float) + "\n")
+        return alerts
+
+    # Counts the existing history once, when this reference is first seen
+    def seed(self, read_history, source="app"):
+        if os.path.exists(self._path(STATE_FILE)):
+            return []
+        return self.observe(read_history(), source, only_if_new=True)
+
+    def _write(self, name, data):
+        path = self._path(name)
+        with open(path + ".tmp", 'w') as file:
+            json.dump(data, file)
+        os.replace(path + ".tmp", path)
+
+    def alerts(self, last=20):
+        try:
+            with open(self._path(ALERTS_FILE)) as file:
+                lines = file.readlines()[-last:]
+        except FileNotFoundError:
+            return []
+        return [json.loads(line) for line in lines]
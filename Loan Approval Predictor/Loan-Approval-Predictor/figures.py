@@ -0,0 +1,226 @@
+import io
+
+import numpy as np
+import seaborn as sns
+import streamlit as st
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, ScalarFormatter
+
+from scenarios import FACTOR_RANGES
+
+# The app's matplotlib figures, made cheap to redraw on every rerun.
+#
+# st.pyplot rasterises each figure to a 200 dpi PNG, which costs far more
+# than drawing it. Figures here are emitted as SVG instead, which skips
+# rasterisation and is drawn by the browser. The feature importance chart
+# only depends on the model, so its SVG is kept per model version. The
+# others are built once per session and, on a rerun, only the artists
+# that show the applicant's values are updated.
+
+sns.set_style('whitegrid')
+
+GAUGE_COLORS = ['#FF0000', '#FFA500', '#FFFF00', '#008000']
+
+
+def to_svg(fig):
+    buffer = io.StringIO()
+    fig.savefig(buffer, format='svg', bbox_inches='tight')
+    svg = buffer.getvalue()
+    # Streamlit recognises SVG by its opening tag, not the XML prologue
+    return svg[svg.index('<svg'):]
+
+
+def show(fig):
+    st.image(to_svg(fig), width='stretch')
+
+
+# One figure per session: Streamlit runs a session's reruns one at a time,
+# so its figures are never drawn by two threads at once
+def session_figure(key, factory):
+    figure = st.session_state.get(key)
+    if figure is None:
+        figure = st.session_state[key] = factory()
+    return figure
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def feature_importance_svg(version, _model):
+    # Extract the classifier from the pipeline
+    classifier = _model.named_steps['classifier']
+
+    # Get feature names after preprocessing
+    preprocessor = _model.named_steps['preprocessor']
+    numeric, categorical = (list(columns) for _, _, columns in preprocessor.transformers_[:2])
+    feature_names = np.append(numeric, preprocessor.named_transformers_['cat'].get_feature_names_out(categorical))
+
+    # Coefficient sizes while the logistic fallback is serving
+    if hasattr(classifier, 'feature_importances_'):
+        importances = classifier.feature_importances_
+    else:
+        importances = np.abs(classifier.coef_[0])
+
+    # Top eight features, largest first
+    top = np.argsort(importances)[::-1][:8]
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(x=importances[top], y=feature_names[top], hue=feature_names[top], palette='viridis',
+                legend=False, ax=ax)
+    ax.set_xlabel('Importance')
+    ax.set_ylabel('Feature')
+    ax.set_title('Top Features Affecting Loan Approval')
+    fig.tight_layout()
+    return to_svg(fig)
+
+
+class GaugeFigure:
+    def __init__(self):
+        self.fig = Figure(figsize=(8, 4))
+        ax = self.fig.subplots()
+        ax.barh(y=0, width=1, height=0.5, color='lightgrey')
+        self.bar = ax.barh(y=0, width=0, height=0.5)[0]
+
+        # Needle pointer and probability text
+        self.needle = ax.arrow(0, -0.1, 0, 0.25, head_width=0.03, head_length=0.05, fc='black', ec='black')
+        self.label = ax.text(0.5, -0.3, '', ha='center', va='center', fontsize=12, fontweight='bold')
+
+        # Low/medium/high markers
+        ax.text(0.1, 0.15, 'Low', ha='center', va='center', fontsize=10)
+        ax.text(0.35, 0.15, 'Medium', ha='center', va='center', fontsize=10)
+        ax.text(0.65, 0.15, 'High', ha='center', va='center', fontsize=10)
+        ax.text(0.9, 0.15, 'Very High', ha='center', va='center', fontsize=10)
+
+        ax.set_xlim(0, 1)
+        ax.set_ylim(-0.5, 0.5)
+        ax.axis('off')
+
+    def update(self, probability):
+        self.bar.set_width(probability)
+        self.bar.set_color(GAUGE_COLORS[int(probability * 3.99)])
+        self.needle.set_data(x=probability)
+        self.label.set_text(f'Approval Probability: {probability:.2%}')
+        return self.fig
+
+
+class RadarFigure:
+    def __init__(self, categories):
+        self.fig = Figure(figsize=(8, 8))
+        ax = self.fig.subplots(subplot_kw=dict(polar=True))
+        angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False)
+        # Closing the loop
+        self.angles = np.append(angles, angles[0])
+
+        empty = np.zeros_like(self.angles)
+        self.lines, self.areas = [], []
+        for label in ('Your Values', 'Avg. Approved'):
+            self.lines.append(ax.plot(self.angles, empty, 'o-', linewidth=2, label=label)[0])
+            self.areas.append(ax.fill(self.angles, empty, alpha=0.25)[0])
+
+        ax.set_thetagrids(np.degrees(angles), categories)
+        ax.set_ylim(0, 1)
+        ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
+
+    def update(self, your_values, avg_values):
+        for line, area, values in zip(self.lines, self.areas, (your_values, avg_values)):
+            values = np.append(values, values[0])
+            line.set_ydata(values)
+            area.set_xy(np.column_stack([self.angles, values]))
+        return self.fig
+
+
+class AttributionFigure:
+    def __init__(self, count):
+        self.fig = Figure(figsize=(10, 5))
+        self.ax = ax = self.fig.subplots()
+        self.bars = ax.barh(np.arange(count), np.zeros(count), height=0.6)
+        ax.axvline(x=0, color='black', linewidth=1)
+        ax.set_yticks(np.arange(count))
+        ax.invert_yaxis()
+        ax.set_xlabel('Change in Approval Probability')
+
+    def update(self, labels, contributions, bias, probability):
+        # Largest effect first
+        order = np.argsort(-np.abs(contributions))
+        for bar, value in zip(self.bars, contributions[order]):
+            bar.set_width(value)
+            bar.set_color('#2e8b57' if value >= 0 else '#d62728')
+        self.ax.set_yticklabels([labels[index] for index in order])
+        limit = max(np.abs(contributions).max() * 1.1, 0.01)
+        self.ax.set_xlim(-limit, limit)
+        self.ax.set_title(f'From the {bias:.1%} average to your {probability:.1%}')
+        return self.fig
+
+
+class ScenarioFigure:
+    def __init__(self):
+        self.fig = Figure(figsize=(10, 6))
+        self.ax = ax = self.fig.subplots()
+        self.curve, = ax.plot([], [], 'b-', linewidth=2)
+        self.current = ax.axvline(x=0, color='r', linestyle='--')
+        self.threshold = ax.axhline(y=0.5, color='g', linestyle='--', label='Approval Threshold')
+        self.marker, = ax.plot([], [], 'ro', markersize=8)
+        ax.set_ylabel('Approval Probability')
+        ax.set_ylim(0, 1)
+
+    def update(self, factor, values, probabilities, current_value, current_prob):
+        ax = self.ax
+        label = FACTOR_RANGES[factor][1]
+        self.curve.set_data(values, probabilities)
+        self.current.set_xdata([current_value, current_value])
+        self.current.set_label(f'Current: {current_value:.2f}')
+        self.marker.set_data([current_value], [current_prob])
+        margin = (values[-1] - values[0]) * 0.05
+        ax.set_xlim(values[0] - margin, values[-1] + margin)
+        ax.set_xlabel(label)
+        ax.set_title(f'How {label} Affects Approval Probability')
+        # Currency symbols on the money factors
+        if factor in ['annual_income', 'loan_amount']:
+            ax.xaxis.set_major_formatter(FuncFormatter(lambda x, pos: f"${x:,.0f}"))
+        else:
+            ax.xaxis.set_major_formatter(ScalarFormatter())
+        ax.legend(handles=[self.current, self.threshold])
+        return self.fig
+
+
+class GridFigure:
+    def __init__(self):
+        self.fig = Figure(figsize=(10, 6))
+        self.ax = self.fig.subplots()
+        # The colour scale is fixed at 0-1, so its bar is added once
+        self.colorbar = None
+
+    def update(self, x_factor, x_values, y_factor, y_values, probabilities, x_current, y_current):
+        ax = self.ax
+        ax.clear()
+        mesh = ax.pcolormesh(x_values, y_values, probabilities, cmap='RdYlGn', vmin=0, vmax=1,
+                             shading='nearest')
+        ax.contour(x_values, y_values, probabilities, levels=[0.5], colors='black', linewidths=1.5)
+        ax.plot(x_current, y_current, 'wo', markersize=10, markeredgecolor='black', label='Your Application')
+        if self.colorbar is None:
+            self.colorbar = self.fig.colorbar(mesh, ax=ax, label='Approval Probability')
+        ax.set_xlabel(FACTOR_RANGES[x_factor][1])
+        ax.set_ylabel(FACTOR_RANGES[y_factor][1])
+        ax.set_title('Approval Probability (black line: approval threshold)')
+        ax.legend(loc='upper right')
+        return self.fig
+
+
+class DriftFigure:
+    def __init__(self):
+        self.fig = Figure(figsize=(10, 5))
+        self.ax = self.fig.subplots()
+
+    def update(self, feature, labels, reference, recent):
+        # Bin count changes with the input, so the bars are redrawn
+        ax = self.ax
+        ax.clear()
+        positions = np.arange(len(labels))
+        ax.bar(positions - 0.2, reference / reference.sum(), width=0.4, label='Training Data', color='#4c72b0')
+        if recent.sum():
+            ax.bar(positions + 0.2, recent / recent.sum(), width=0.4, label='Recent Applications', color='#dd8452')
+        ax.set_xticks(positions)
+        ax.set_xticklabels(labels, rotation=45, ha='right')
+        ax.set_ylabel('Share of Applications')
+        ax.set_title(f'{feature.replace("_", " ").title()}: Training Data vs. Recent Applications')
+        ax.legend()
+        self.fig.tight_layout()
+        return self.fig
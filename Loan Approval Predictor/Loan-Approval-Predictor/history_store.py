@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import time
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cohort_stats import CohortStats
+from file_lock import file_lock
+
+# Saved applications, kept as typed Parquet partitioned by day.
+#
+#   application_history/day=2026-10-19/part-<ns>.parquet   one per save
+#   application_history/day=2026-10-17/data.parquet        compacted day
+#   application_history/day=2026-10-17/summary.json        its aggregates
+#   application_history/cohort.json                        approved applicants
+#
+# A save writes one new file and never rewrites existing ones. Reading a
+# window opens only the partitions of the days in it. Days that can no
+# longer receive saves are compacted into a single file with a summary
+# beside it, so all-time totals come from those summaries plus the few
+# rows of the last two days. Compaction runs apart from reads, under the
+# day's lock, which writes to that day take too. The statistics of
+# approved applications are updated with each save, so they never need a
+# pass over the history.
+
+SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('credit_score', pa.int64()),
+    ('annual_income', pa.int64()),
+    ('loan_amount', pa.int64()),
+    ('loan_term', pa.int64()),
+    ('employment_years', pa.int64()),
+    ('debt_to_income', pa.float64()),
+    ('education', pa.string()),
+    ('employment_type', pa.string()),
+    ('approval_probability', pa.float64()),
+    ('predicted_approval', pa.string()),
+])
+
+DATA_FILE = "data.parquet"
+SUMMARY_FILE = "summary.json"
+COHORT_FILE = "cohort.json"
+COHORT_FEATURES = ['credit_score', 'annual_income', 'loan_amount', 'loan_term', 'employment_years',
+                   'debt_to_income']
+
+
+def summarize(frame):
+    return {
+        'count': len(frame),
+        'approved': int((frame['predicted_approval'] == "Approved").sum()),
+        'probability_sum': float(frame['approval_probability'].sum()),
+        'first': frame['timestamp'].min().isoformat() if len(frame) else None,
+        'last': frame['timestamp'].max().isoformat() if len(frame) else None,
+    }
+
+
+# A compacted day's summary never changes; keyed on the file's mtime in
+# case the history is cleared and that day saved to again
+@lru_cache(maxsize=4096)
+def _read_summary(path, mtime_ns):
+    with open(path) as file:
+        return json.load(file)
+
+
+class HistoryStore:
+    def __init__(self, root="application_history"):
+        self.root = root
+
+    def _day_path(self, day, name=""):
+        return os.path.join(self.root, f"day={day.isoformat()}", name)
+
+    def days(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(date.fromisoformat(name[4:]) for name in os.listdir(self.root) if name.startswith("day="))
+
+    def _files(self, day):
+        directory = self._day_path(day)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:  # cleared
+            return []
+        # A compacted day holds everything its parts did; parts still lying
+        # around are on their way out
+        if DATA_FILE in names:
+            return [os.path.join(directory, DATA_FILE)]
+        return [os.path.join(directory, name) for name in sorted(names)
+                if name.startswith("part-") and name.endswith(".parquet")]
+
+    def _write_part(self, day, table):
+        directory = self._day_path(day)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{time.time_ns()}-{os.getpid()}.parquet")
+        # Written under a name readers skip, then renamed into place; not
+        # while the day is being compacted, which would miss the part
+        with file_lock(self._day_path(day, ".lock")):
+            pq.write_table(table, path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+    def append(self, record):
+        record = dict(record)
+        record.setdefault('timestamp', datetime.now())
+        self._write_part(record['timestamp'].date(), pa.Table.from_pylist([record], schema=SCHEMA))
+        self._add_to_cohort(pd.DataFrame([record]))
+
+    def cohort(self):
+        try:
+            with open(os.path.join(self.root, COHORT_FILE)) as file:
+                return CohortStats.from_dict(json.load(file))
+        except FileNotFoundError:
+            return CohortStats(COHORT_FEATURES)
+
+    def _add_to_cohort(self, frame):
+        approved = frame[frame['predicted_approval'] == "Approved"]
+        if approved.empty:
+            return
+        # Saves from other sessions update the same file: one at a time
+        with file_lock(os.path.join(self.root, ".cohort.lock")):
+            cohort = self.cohort()
+            cohort.add(approved)
+            path = os.path.join(self.root, COHORT_FILE)
+            with open(path + ".tmp", 'w') as file:
+                json.dump(cohort.to_dict(), file)
+            os.replace(path + ".tmp", path)
+
+    def _read_day(self, day):
+        # ParquetFile skips the dataset discovery read_table does per file
+        try:
+            return [pq.ParquetFile(path).read().cast(SCHEMA) for path in self._files(day)]
+        except FileNotFoundError:
+            # Compacted while we read: its parts are removed only once
+            # data.parquet is in place, so listing again finds that
+            return [pq.ParquetFile(path).read().cast(SCHEMA) for path in self._files(day)]
+
+    def read(self, start=None, end=None):
+        tables = [table for day in self.days()
+                  if (start is None or day >= start) and (end is None or day <= end)
+                  for table in self._read_day(day)]
+        if not tables:
+            return SCHEMA.empty_table().to_pandas()
+        table = pa.concat_tables(tables)
+        return table.to_pandas().sort_values('timestamp', ignore_index=True)
+
+    def read_last(self, days):
+        return self.read(start=date.today() - timedelta(days=days - 1))
+
+    def compact(self, day):
+        directory = self._day_path(day)
+        # Sessions and jobs compact the same days: one at a time, and no
+        # part written meanwhile
+        with file_lock(self._day_path(day, ".lock")):
+            files = self._files(day)
+            if not files or files[0].endswith(DATA_FILE):
+                return False
+            frame = self.read(start=day, end=day)
+            temp = os.path.join(directory, DATA_FILE + ".tmp")
+            pq.write_table(pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False), temp)
+            with open(os.path.join(directory, SUMMARY_FILE + ".tmp"), 'w') as file:
+                json.dump(summarize(frame), file)
+            os.replace(os.path.join(directory, SUMMARY_FILE + ".tmp"), os.path.join(directory, SUMMARY_FILE))
+            # Readers switch to data.parquet the moment it appears
+            os.replace(temp, os.path.join(directory, DATA_FILE))
+            for path in files:
+                os.remove(path)
+        return True
+
+    # Saves are stamped when they are written, so days before yesterday
+    # are closed and can be compacted. Returns the number of days compacted.
+    def compact_closed(self, today=None):
+        today = today or date.today()
+        return sum(self.compact(day) for day in self.days() if day < today - timedelta(days=1))
+
+    def summary(self):
+        # Days not compacted yet are summarized from their parts
+        totals = {'count': 0, 'approved': 0, 'probability_sum': 0.0, 'first': None, 'last': None}
+        for day in self.days():
+            if os.path.exists(self._day_path(day, DATA_FILE)):
+                summary_path = self._day_path(day, SUMMARY_FILE)
+                day_summary = _read_summary(summary_path, os.stat(summary_path).st_mtime_ns)
+            else:
+                day_summary = summarize(self.read(start=day, end=day))
+            for name in ('count', 'approved', 'probability_sum'):
+                totals[name] += day_summary[name]
+            totals['first'] = totals['first'] or day_summary['first']
+            totals['last'] = day_summary['last'] or totals['last']
+        totals['approval_rate'] = totals['approved'] / totals['count'] if totals['count'] else 0.0
+        totals['mean_probability'] = totals['probability_sum'] / totals['count'] if totals['count'] else 0.0
+        return totals
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    # The CSV the app used to write, with probabilities as "73.45%" strings
+    def import_csv(self, path):
+        frame = pd.read_csv(path)
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+        frame['approval_probability'] = frame['approval_probability'].astype(str).str.rstrip('%').astype(float) / 100
+        for day, rows in frame.groupby(frame['timestamp'].dt.date):
+            self._write_part(day, pa.Table.from_pandas(rows, schema=SCHEMA, preserve_index=False))
+        self._add_to_cohort(frame)
+        return len(frame)
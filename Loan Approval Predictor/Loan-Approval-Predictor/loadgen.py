@@ -0,0 +1,84 @@
+# Open-loop load generator for the scoring API.
+# Run with: python loadgen.py --url http://127.0.0.1:8000 --rate 1000 --duration 20
+#
+# Requests are fired on a fixed schedule whether or not earlier ones have
+# finished, and each latency is measured from its scheduled start, so a
+# slow server shows up as high latency instead of a lower request rate.
+import argparse
+import asyncio
+import random
+import time
+
+import aiohttp
+import numpy as np
+
+
+def random_application(rng):
+    return {
+        'credit_score': rng.randint(300, 850),
+        'annual_income': rng.randint(20000, 200000),
+        'loan_amount': rng.randint(5000, 500000),
+        'loan_term': rng.choice([36, 60, 84, 120, 180, 240, 360]),
+        'employment_years': rng.randint(0, 30),
+        'debt_to_income': round(rng.uniform(0, 0.6), 2),
+        'education': rng.choice(['High School', 'Bachelor', 'Master', 'PhD']),
+        'employment_type': rng.choice(['Full-time', 'Part-time', 'Self-employed', 'Unemployed']),
+    }
+
+
+async def run(url, rate, duration, connections, seed=0):
+    rng = random.Random(seed)
+    connector = aiohttp.TCPConnector(limit=connections)
+    timeout = aiohttp.ClientTimeout(total=60)
+    latencies = []
+    errors = 0
+
+    # aiohttp rather than httpx: the client must cost far less per request
+    # than the server, or it becomes the bottleneck being measured
+    async with aiohttp.ClientSession(url, connector=connector, timeout=timeout) as session:
+        async def fire(scheduled, payload):
+            nonlocal errors
+            try:
+                async with session.post("/predict", json=payload) as response:
+                    response.raise_for_status()
+                    await response.read()
+                latencies.append(time.perf_counter() - scheduled)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+
+        total = int(rate * duration)
+        tasks = []
+        started = time.perf_counter()
+        for i in range(total):
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(scheduled, random_application(rng))))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        async with session.get("/metrics") as response:
+            server = await response.json()
+
+    latencies = np.array(latencies) * 1000
+    print(f"sent {total} requests at a target {rate:,.0f} req/s over {duration:.0f}s")
+    print(f"completed {len(latencies)} ({len(latencies) / elapsed:,.0f} req/s), {errors} errors")
+    if len(latencies):
+        print(f"latency: p50 {np.percentile(latencies, 50):.1f} ms, p99 {np.percentile(latencies, 99):.1f} ms, "
+              f"max {latencies.max():.1f} ms")
+    print(f"server: mean batch size {server['mean_batch_size']:.1f} over {server['batches']} batches, "
+          f"server-side p50 {server['latency_ms']['p50']:.1f} ms / p99 {server['latency_ms']['p99']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the loan approval API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rate", type=float, default=1000, help="requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--connections", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.rate, args.duration, args.connections))
+
+
+if __name__ == "__main__":
+    main()
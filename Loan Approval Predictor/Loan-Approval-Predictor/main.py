@@ -1,20 +1,18 @@
 import pandas as pd
 import numpy as np
-import joblib
 import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_curve, auc
 import streamlit as st
-import pickle
 import os
-from datetime import datetime
+from datetime import date, datetime
 import base64
-import io
+from figures import AttributionFigure, DriftFigure, GaugeFigure, GridFigure, RadarFigure, ScenarioFigure, \
+    feature_importance_svg, session_figure, show
+from drift_monitor import KS_ALERT, MIN_ROWS, PSI_ALERT, PSI_WATCH, drift_report
+from history_store import HistoryStore
+from model_cache import cached_compiled, cached_model, drift_monitor, explanation_cache, history_compaction, \
+    model_version, prediction_cache, production_model, training_cohort
+from scenarios import FACTOR_RANGES, score_grid, score_scenarios
+from training_job import fallback_model, training_job
 
 # Set page configuration
 st.set_page_config(
@@ -31,126 +29,69 @@ various financial and personal factors. Adjust the parameters below to see how t
 your approval chances.
 """)
 
-# Function to train or load model
+# Training progress, polled every second until the forest is ready; then
+# the whole script reruns and picks the new model up. A failed run can be
+# started again from here.
+@st.fragment(run_every=1)
+def training_status(job):
+    if job.done:
+        if job.error is not None:
+            st.error(f"Model training failed: {job.error}")
+            if st.button("Retry training"):
+                training_job.clear()
+                st.rerun()
+            return
+        st.rerun()
+    st.info(f"Model warming up ({job.stage}, {job.elapsed:.0f}s). "
+            "Predictions come from a simpler logistic model until it is ready.")
+    st.progress(job.progress)
+
+# Function to train or load model, returning the pipeline, the model to
+# score with (the compiled forest: same probabilities as the pipeline at a
+# fraction of the per-call cost) and the model's version
 def get_model():
+    registry_root = "models"
     model_path = "loan_approval_model.pkl"
     
-    # Check if model exists
+    # The registry's production model, if one has been promoted
+    registered = production_model(registry_root)
+    if registered:
+        return registered
+    # Otherwise a plain pickled model from before the registry
     if os.path.exists(model_path):
-        # Load existing model
-        with open(model_path, 'rb') as file:
-            model = pickle.load(file)
-        return model
+        # Loaded once per process and reloaded only when the file changes
+        return cached_model(model_path), cached_compiled(model_path), model_version(model_path)
     else:
-        # Generate synthetic data for demonstration
-        st.info("No trained model found. Training a new model with synthetic data...")
-        
-        # Generate synthetic data
-        np.random.seed(42)
-        n_samples = 1000
-        
-        # Generate features
-        credit_scores = np.random.randint(300, 850, n_samples)
-        incomes = np.random.randint(20000, 200000, n_samples)
-        loan_amounts = np.random.randint(5000, 500000, n_samples)
-        loan_terms = np.random.choice([36, 60, 84, 120, 180, 240, 360], n_samples)
-        employment_years = np.random.randint(0, 30, n_samples)
-        debt_to_income = np.random.uniform(0, 0.6, n_samples)
-        
-        # Generate education and employment type categories
-        education = np.random.choice(['High School', 'Bachelor', 'Master', 'PhD'], n_samples)
-        employment_type = np.random.choice(['Full-time', 'Part-time', 'Self-employed', 'Unemployed'], n_samples)
-        
-        # Create DataFrame
-        data = pd.DataFrame({
-            'credit_score': credit_scores,
-            'annual_income': incomes,
-            'loan_amount': loan_amounts,
-            'loan_term': loan_terms,
-            'employment_years': employment_years,
-            'debt_to_income': debt_to_income,
-            'education': education,
-            'employment_type': employment_type
-        })
-        
-        # Generate target (loan approval) with a reasonable model
-        # Higher credit scores, income, and employment years increase approval chance
-        # Higher loan amounts and debt-to-income reduce approval chance
-        
-        approval_score = (
-            (data['credit_score'] - 300) / 550 * 0.35 +  # Credit score (normalized)
-            (np.log10(data['annual_income']) - 4) / 2 * 0.25 +  # Log income
-            (1 - data['loan_amount'] / 500000) * 0.15 +  # Inverse loan amount
-            (data['employment_years'] / 30) * 0.15 +  # Employment years
-            (1 - data['debt_to_income'] / 0.6) * 0.1  # Inverse debt-to-income
-        )
-        
-        # Education bonus
-        edu_bonus = pd.Series(0, index=range(n_samples))
-        edu_bonus[data['education'] == 'Bachelor'] = 0.05
-        edu_bonus[data['education'] == 'Master'] = 0.08
-        edu_bonus[data['education'] == 'PhD'] = 0.1
-        
-        # Employment type impact
-        emp_impact = pd.Series(0, index=range(n_samples))
-        emp_impact[data['employment_type'] == 'Part-time'] = -0.1
-        emp_impact[data['employment_type'] == 'Self-employed'] = -0.05
-        emp_impact[data['employment_type'] == 'Unemployed'] = -0.4
-        
-        approval_score = approval_score + edu_bonus + emp_impact
-        
-        # Add some randomness
-        approval_score += np.random.normal(0, 0.1, n_samples)
-        
-        # Convert to binary outcome
-        data['loan_approved'] = (approval_score > 0.5).astype(int)
-        
-        # Split the data
-        X = data.drop('loan_approved', axis=1)
-        y = data['loan_approved']
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        # Define preprocessing for numeric features
-        numeric_features = ['credit_score', 'annual_income', 'loan_amount', 'loan_term', 
-                           'employment_years', 'debt_to_income']
-        numeric_transformer = StandardScaler()
-        
-        # Define preprocessing for categorical features
-        categorical_features = ['education', 'employment_type']
-        categorical_transformer = OneHotEncoder(handle_unknown='ignore')
-        
-        # Combine preprocessing steps
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ('num', numeric_transformer, numeric_features),
-                ('cat', categorical_transformer, categorical_features)
-            ])
-        
-        # Create and train the model pipeline
-        model = Pipeline(steps=[
-            ('preprocessor', preprocessor),
-            ('classifier', RandomForestClassifier(n_estimators=100, random_state=42))
-        ])
-        
-        model.fit(X_train, y_train)
-        
-        # Evaluate the model
-        y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        st.success(f"Model trained successfully with {accuracy:.2%} accuracy")
-        
-        # Save the model
-        with open(model_path, 'wb') as file:
-            pickle.dump(model, file)
-        
-        return model
+        # Train in the background instead of blocking this run; the job
+        # registers and promotes the model when it is done
+        training_status(training_job(registry_root))
+        model = fallback_model()
+        return model, model, "fallback"
+
+# Saved applications. A CSV history from earlier versions is imported
+# once; renaming it first means only one session does the import.
+history = HistoryStore("application_history")
+try:
+    os.replace('saved_loan_applications.csv', 'saved_loan_applications.csv.imported')
+except FileNotFoundError:
+    pass
+else:
+    history.import_csv('saved_loan_applications.csv.imported')
+history_compaction(history.root, date.today())
 
 # Create tabs for different sections
-tab1, tab2, tab3 = st.tabs(["Loan Predictor", "Model Insights", "Application History"])
+tab1, tab2, tab3, tab4 = st.tabs(["Loan Predictor", "Model Insights", "Application History", "Input Drift"])
 
 with tab1:
     # Get the model
-    model = get_model()
+    model, forest, version = get_model()
+    # Applications are checked against the model's training inputs; saved
+    # history is counted once, the first time this training data is seen
+    monitor = drift_monitor("models", version)
+    monitor.seed(history.read)
+    # Applicants scored before, by any session, are answered from the cache;
+    # the main prediction, scenario analysis and what-if all go through it
+    scorer = prediction_cache().scorer(version, forest)
 
     # Create columns for layout
     col1, col2 = st.columns([1, 1])
@@ -211,43 +152,13 @@ with tab1:
             'employment_type': [employment_type]
         })
         
-        # Get prediction
-        prediction_proba = model.predict_proba(input_data)[0][1]
-        prediction = model.predict(input_data)[0]
+        # Get prediction, the most probable class, from the one cached lookup
+        probabilities = scorer.predict_proba(input_data)[0]
+        prediction_proba = probabilities[1]
+        prediction = scorer.classes_[np.argmax(probabilities)]
         
         # Display gauge chart for probability
-        fig, ax = plt.subplots(figsize=(8, 4))
-        
-        # Create gauge chart
-        gauge_colors = ['#FF0000', '#FFA500', '#FFFF00', '#008000']
-        sns.set_style('whitegrid')
-        
-        # Draw the gauge
-        gauge = np.linspace(0, 1, 100)
-        ax.barh(y=0, width=1, height=0.5, color='lightgrey')
-        ax.barh(y=0, width=prediction_proba, height=0.5, color=gauge_colors[int(prediction_proba*3.99)])
-        
-        # Add needle pointer
-        needle_length = 0.25
-        ax.arrow(prediction_proba, -0.1, 0, needle_length, head_width=0.03, 
-                head_length=0.05, fc='black', ec='black')
-        
-        # Add text
-        ax.text(0.5, -0.3, f'Approval Probability: {prediction_proba:.2%}', 
-                ha='center', va='center', fontsize=12, fontweight='bold')
-        
-        # Add low/medium/high markers
-        ax.text(0.1, 0.15, 'Low', ha='center', va='center', fontsize=10)
-        ax.text(0.35, 0.15, 'Medium', ha='center', va='center', fontsize=10)
-        ax.text(0.65, 0.15, 'High', ha='center', va='center', fontsize=10)
-        ax.text(0.9, 0.15, 'Very High', ha='center', va='center', fontsize=10)
-        
-        # Format the chart
-        ax.set_xlim(0, 1)
-        ax.set_ylim(-0.5, 0.5)
-        ax.axis('off')
-        
-        st.pyplot(fig)
+        show(session_figure('gauge', GaugeFigure).update(prediction_proba))
         
         # Display approval result
         if prediction == 1:
@@ -279,9 +190,9 @@ with tab1:
     
     # Save application button
     if st.button("Save This Application"):
-        # Create a dictionary with the current inputs
-        current_inputs = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # Saved typed, with the probability as a number, into today's partition
+        history.append({
+            'timestamp': datetime.now(),
             'credit_score': credit_score,
             'annual_income': annual_income,
             'loan_amount': loan_amount,
@@ -290,18 +201,10 @@ with tab1:
             'debt_to_income': debt_to_income,
             'education': education,
             'employment_type': employment_type,
-            'approval_probability': f"{prediction_proba:.2%}",
+            'approval_probability': float(prediction_proba),
             'predicted_approval': "Approved" if prediction == 1 else "Denied"
-        }
-        
-        # Convert to DataFrame
-        df_inputs = pd.DataFrame([current_inputs])
-        
-        # Check if the file exists
-        if os.path.exists('saved_loan_applications.csv'):
-            df_inputs.to_csv('saved_loan_applications.csv', mode='a', header=False, index=False)
-        else:
-            df_inputs.to_csv('saved_loan_applications.csv', index=False)
+        })
+        monitor.observe(input_data, "app")
         
         st.success("Application saved successfully!")
 
@@ -313,71 +216,45 @@ with tab2:
     with col1:
         st.subheader("Feature Importance")
         
-        # Extract the RandomForestClassifier from the pipeline
-        rf_classifier = model.named_steps['classifier']
-        
-        # Get feature names after preprocessing
-        preprocessor = model.named_steps['preprocessor']
-        cat_features = preprocessor.transformers_[1][1].get_feature_names_out(
-            ['education', 'employment_type']
-        )
-        feature_names = np.append(['credit_score', 'annual_income', 'loan_amount', 'loan_term', 
-                                  'employment_years', 'debt_to_income'], cat_features)
-        
-        # Get feature importances
-        importances = rf_classifier.feature_importances_
-        
-        # Create DataFrame for visualization
-        feature_importance = pd.DataFrame({
-            'Feature': feature_names,
-            'Importance': importances
-        })
-        
-        # Sort by importance
-        feature_importance = feature_importance.sort_values('Importance', ascending=False).head(8)
-        
-        # Plot feature importance
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.barplot(x='Importance', y='Feature', data=feature_importance, palette='viridis')
-        plt.title('Top Features Affecting Loan Approval')
-        plt.tight_layout()
-        
-        st.pyplot(fig)
+        # Drawn once per model version
+        st.image(feature_importance_svg(version, model), width='stretch')
     
     with col2:
         st.subheader("Your Application vs. Average Approved Application")
         
-        # Generate synthetic "average" approved applicant
-        avg_approved = {
-            'credit_score': 720,
-            'annual_income': 85000,
-            'loan_amount': 150000,
-            'employment_years': 8,
-            'debt_to_income': 0.32
-        }
+        # Approved applicants in the training data and among saved
+        # applications, from running statistics rather than the rows
+        cohort = training_cohort("models", version).merge(history.cohort(), seed=0)
+        cohort_summary = cohort.summary()
+        avg_approved = {feature: cohort_summary[feature]['mean'] for feature in
+                        ['credit_score', 'annual_income', 'loan_amount', 'employment_years', 'debt_to_income']}
         
         # Create comparison data
         comparison_data = pd.DataFrame({
             'Metric': list(avg_approved.keys()),
             'Your Value': [credit_score, annual_income, loan_amount, employment_years, debt_to_income],
-            'Avg. Approved Value': list(avg_approved.values())
+            'Avg. Approved Value': list(avg_approved.values()),
+            'Median': [cohort_summary[feature]['median'] for feature in avg_approved],
+            '25th Percentile': [cohort_summary[feature]['p25'] for feature in avg_approved],
+            '75th Percentile': [cohort_summary[feature]['p75'] for feature in avg_approved],
         })
         
         # Format the values for display
-        comparison_data['Your Value'] = comparison_data.apply(
-            lambda x: f"${int(x['Your Value']):,}" if 'income' in x['Metric'] or 'amount' in x['Metric'] 
-            else (f"{x['Your Value']:.2%}" if 'ratio' in x['Metric'] else x['Your Value']),
-            axis=1
-        )
+        def format_value(metric, value):
+            if metric == 'debt_to_income':
+                return f"{value:.2%}"
+            if 'income' in metric or 'amount' in metric:
+                return f"${int(value):,}"
+            return f"{value:.0f}" if float(value).is_integer() else f"{value:.1f}"
         
-        comparison_data['Avg. Approved Value'] = comparison_data.apply(
-            lambda x: f"${int(x['Avg. Approved Value']):,}" if 'income' in x['Metric'] or 'amount' in x['Metric'] 
-            else (f"{x['Avg. Approved Value']:.2%}" if 'ratio' in x['Metric'] else x['Avg. Approved Value']),
-            axis=1
-        )
+        for column in comparison_data.columns[1:]:
+            comparison_data[column] = [format_value(metric, value) for metric, value
+                                       in zip(comparison_data['Metric'], comparison_data[column])]
         
         # Display the comparison table
         st.table(comparison_data)
+        st.caption(f"Based on {cohort.count:,} approved applicants from the model's training data "
+                   "and saved applications")
         
         # Plot radar chart comparing user values to average approved values
         st.subheader("Profile Comparison")
@@ -386,8 +263,6 @@ with tab2:
         categories = ['Credit Score', 'Annual Income', 'Loan Amount', 'Employment Years', 'Debt-to-Income']
         
         # Normalize values to 0-1 scale for comparison
-        N = len(categories)
-        
         # Your values
         your_values = [
             (credit_score - 300) / 550,  # Credit score normalized to 0-1
@@ -406,30 +281,22 @@ with tab2:
             1 - avg_approved['debt_to_income'] / 0.6
         ]
         
-        # Set up the radar chart
-        angles = np.linspace(0, 2*np.pi, N, endpoint=False).tolist()
-        
-        # Close the loop
-        your_values += [your_values[0]]
-        avg_values += [avg_values[0]]
-        angles += [angles[0]]
-        
         # Create the plot
-        fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(polar=True))
-        
-        # Plot your values and average values
-        ax.plot(angles, your_values, 'o-', linewidth=2, label='Your Values')
-        ax.fill(angles, your_values, alpha=0.25)
-        ax.plot(angles, avg_values, 'o-', linewidth=2, label='Avg. Approved')
-        ax.fill(angles, avg_values, alpha=0.25)
-        
-        # Set category labels
-        ax.set_thetagrids(np.degrees(angles[:-1]), categories)
-        
-        # Add legend
-        ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
-        
-        st.pyplot(fig)
+        show(session_figure('radar', lambda: RadarFigure(categories)).update(your_values, avg_values))
+
+    # Per-applicant explanation: how much each input moved the approval
+    # probability away from the forest's average
+    st.subheader("What Drives Your Prediction")
+    
+    if hasattr(forest, 'explain'):
+        contributions = explanation_cache().lookup(version, forest.explain, input_data)[0]
+        labels = [f"{name.replace('_', ' ').title()} = {input_data[name].values[0]}" for name in forest.inputs]
+        show(session_figure('attribution', lambda: AttributionFigure(len(labels))).update(
+            labels, contributions, forest.bias, forest.bias + contributions.sum()))
+        st.caption("Each bar is the change in approval probability credited to that input along the paths "
+                   "your application takes through the forest's trees. Together they add up to your probability.")
+    else:
+        st.info("Explanations are available once the random forest has finished training.")
 
     # Scenario Analysis
     st.header("Scenario Analysis")
@@ -441,75 +308,50 @@ with tab2:
         # Select factor to analyze
         factor_to_analyze = st.selectbox(
             "Select factor to analyze",
-            ['credit_score', 'annual_income', 'loan_amount', 'loan_term', 'employment_years', 'debt_to_income']
+            list(FACTOR_RANGES)
         )
         
-        # Get current input data
-        scenario_data = input_data.copy()
-        
-        # Create range for the selected factor
-        if factor_to_analyze == 'credit_score':
-            range_values = np.linspace(300, 850, 20)
-            x_label = 'Credit Score'
-        elif factor_to_analyze == 'annual_income':
-            range_values = np.linspace(20000, 200000, 20)
-            x_label = 'Annual Income ($)'
-        elif factor_to_analyze == 'loan_amount':
-            range_values = np.linspace(5000, 500000, 20)
-            x_label = 'Loan Amount ($)'
-        elif factor_to_analyze == 'loan_term':
-            range_values = np.array([36, 60, 84, 120, 180, 240, 360])
-            x_label = 'Loan Term (months)'
-        elif factor_to_analyze == 'employment_years':
-            range_values = np.linspace(0, 30, 20)
-            x_label = 'Employment Years'
-        elif factor_to_analyze == 'debt_to_income':
-            range_values = np.linspace(0, 0.6, 20)
-            x_label = 'Debt-to-Income Ratio'
-        
-        # Calculate probabilities for each value
-        probabilities = []
-        for value in range_values:
-            temp_data = scenario_data.copy()
-            temp_data[factor_to_analyze] = value
-            probabilities.append(model.predict_proba(temp_data)[0][1])
+        # Range and label for the selected factor
+        range_values, x_label = FACTOR_RANGES[factor_to_analyze]
+        
+        # Calculate probabilities for every value in one batch
+        probabilities = score_scenarios(scorer, input_data, {factor_to_analyze: range_values})[factor_to_analyze]
     
     with analysis_col2:
-        # Plot the scenario analysis
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # Mark current value with a vertical line
+        # Plot the scenario analysis, marking the current value
         current_value = input_data[factor_to_analyze].values[0]
         current_idx = np.abs(range_values - current_value).argmin()
         current_prob = probabilities[current_idx]
-        
-        # Plot the probability curve
-        ax.plot(range_values, probabilities, 'b-', linewidth=2)
-        ax.axvline(x=current_value, color='r', linestyle='--', label=f'Current: {current_value:.2f}')
-        ax.axhline(y=0.5, color='g', linestyle='--', label='Approval Threshold')
-        
-        # Add a marker at the current value
-        ax.plot(current_value, current_prob, 'ro', markersize=8)
-        
-        # Format axes
-        ax.set_xlabel(x_label)
-        ax.set_ylabel('Approval Probability')
-        ax.set_title(f'How {x_label} Affects Approval Probability')
-        ax.legend()
-        
-        # Set y-axis limits
-        ax.set_ylim(0, 1)
-        
-        # Format x-axis to include currency symbols if needed
-        if factor_to_analyze in ['annual_income', 'loan_amount']:
-            # Format x-axis labels with dollar signs
-            from matplotlib.ticker import FuncFormatter
-            def currency_formatter(x, pos):
-                return f"${x:,.0f}"
-            ax.xaxis.set_major_formatter(FuncFormatter(currency_formatter))
-        
-        # Show the plot
-        st.pyplot(fig)
+        show(session_figure('scenario', ScenarioFigure).update(
+            factor_to_analyze, range_values, probabilities, current_value, current_prob))
+
+    # Two factors at once: approval probability over a grid, scored in one batch
+    st.subheader("Two-Factor Scenario Map")
+    
+    grid_col1, grid_col2, grid_col3 = st.columns([1, 1, 1])
+    
+    with grid_col1:
+        grid_x = st.selectbox("Horizontal factor", list(FACTOR_RANGES), index=0)
+    
+    with grid_col2:
+        grid_y = st.selectbox("Vertical factor", [f for f in FACTOR_RANGES if f != grid_x],
+                              index=4 if grid_x != 'debt_to_income' else 0)
+    
+    with grid_col3:
+        grid_resolution = st.slider("Grid resolution", 10, 60, 30, 5)
+    
+    # Loan terms are discrete; other factors are sampled evenly over their range
+    def grid_values(factor):
+        values = FACTOR_RANGES[factor][0]
+        return values if factor == 'loan_term' else np.linspace(values[0], values[-1], grid_resolution)
+    
+    x_values, y_values = grid_values(grid_x), grid_values(grid_y)
+    # Grids run to thousands of rows, where scikit-learn's own tree code is faster
+    grid_probabilities = score_grid(model, input_data, grid_x, x_values, grid_y, y_values)
+    
+    show(session_figure('grid', GridFigure).update(
+        grid_x, x_values, grid_y, y_values, grid_probabilities,
+        input_data[grid_x].values[0], input_data[grid_y].values[0]))
 
     # Show what-if analysis
     st.header("What-If Analysis")
@@ -532,8 +374,9 @@ with tab2:
     what_if_data['debt_to_income'] = what_if_debt
     
     # Get prediction for what-if scenario
-    what_if_prob = model.predict_proba(what_if_data)[0][1]
-    what_if_pred = model.predict(what_if_data)[0]
+    what_if_probabilities = scorer.predict_proba(what_if_data)[0]
+    what_if_prob = what_if_probabilities[1]
+    what_if_pred = scorer.classes_[np.argmax(what_if_probabilities)]
     
     # Show the results
     what_if_result_col1, what_if_result_col2 = st.columns([1, 1])
@@ -557,13 +400,29 @@ with tab2:
         st.success("With these changes, your application would likely be **APPROVED**")
     else:
         st.error("With these changes, your application would likely still be **DENIED**")
+    
+    # How often the predictions above came from the cache
+    cache = prediction_cache()
+    st.caption(f"Model version {version[:12]}. Prediction cache: {len(cache):,} applicants, "
+               f"{cache.hits:,} hits / {cache.misses:,} misses ({cache.hit_rate:.0%} hit rate), "
+               f"{cache.invalidations} model changes")
 
 with tab3:
     st.header("Application History")
     
     # Display saved applications if any exist
-    if os.path.exists('saved_loan_applications.csv'):
-        saved_df = pd.read_csv('saved_loan_applications.csv')
+    if history.days():
+        # Totals over all of history, from per-day summaries
+        totals = history.summary()
+        total_col1, total_col2, total_col3 = st.columns([1, 1, 1])
+        total_col1.metric("Saved Applications", f"{totals['count']:,}")
+        total_col2.metric("Predicted Approved", f"{totals['approval_rate']:.1%}")
+        total_col3.metric("Mean Approval Probability", f"{totals['mean_probability']:.1%}")
+        
+        # Only the partitions of the selected window are read
+        window = st.selectbox("Show applications from", ["Last 7 days", "Last 30 days", "Last 90 days", "All time"],
+                              index=1)
+        saved_df = history.read() if window == "All time" else history.read_last(int(window.split()[1]))
         
         # Show data
         st.dataframe(saved_df)
@@ -584,11 +443,8 @@ with tab3:
             # Timeline of applications
             fig, ax = plt.subplots(figsize=(10, 6))
             
-            # Convert approval probability to numeric
-            saved_df['approval_numeric'] = saved_df['approval_probability'].str.rstrip('%').astype(float) / 100
-            
             # Plot timeline
-            ax.plot(saved_df['timestamp'], saved_df['approval_numeric'], 'o-', linewidth=2)
+            ax.plot(saved_df['timestamp'], saved_df['approval_probability'], 'o-', linewidth=2)
             ax.set_xlabel('Application Date')
             ax.set_ylabel('Approval Probability')
             ax.set_title('Approval Probability Over Time')
@@ -619,13 +475,64 @@ with tab3:
         
         # Option to clear history
         if st.button("Clear Application History"):
-            if os.path.exists('saved_loan_applications.csv'):
-                os.remove('saved_loan_applications.csv')
+            if history.days():
+                history.clear()
                 st.success("Application history has been cleared!")
-                st.experimental_rerun()
+                st.rerun()
     else:
         st.info("No saved applications found. Save an application to see it here.")
 
+with tab4:
+    st.header("Input Drift")
+    st.write("How far recent applications have moved from the data the model was trained on. "
+             "Saved applications and batch-scored files are counted as they arrive.")
+
+    drift_col1, drift_col2 = st.columns([1, 1])
+    with drift_col1:
+        drift_window = st.selectbox("Applications from", ["Last 7 days", "Last 30 days", "Last 90 days"])
+    with drift_col2:
+        drift_source = st.selectbox("Source", ["All", "Saved in the app", "Batch scoring"])
+    sources = {"All": None, "Saved in the app": ["app"], "Batch scoring": ["batch"]}[drift_source]
+
+    # Summed from per-day counts: no pass over the applications themselves
+    window_counts = monitor.window_counts(int(drift_window.split()[1]), sources)
+    report = drift_report(monitor.reference, window_counts)
+
+    drifting = report[report['status'] == "drift"]
+    for row in drifting.itertuples():
+        st.warning(f"{row.feature.replace('_', ' ').title()} has drifted: PSI {row.psi:.3f}"
+                   + ("" if np.isnan(row.ks) else f", KS {row.ks:.3f}"))
+
+    if report['rows'].max() == 0:
+        st.info("No applications in this window yet.")
+    else:
+        drift_metric1, drift_metric2 = st.columns([1, 1])
+        drift_metric1.metric("Applications", f"{report['rows'].max():,}")
+        drift_metric2.metric("Inputs Drifting", f"{len(drifting)} of {len(report)}")
+
+        st.dataframe(pd.DataFrame({
+            'Input': report['feature'].str.replace('_', ' ').str.title(),
+            'PSI': report['psi'].round(3),
+            'KS': report['ks'].round(3),
+            'Status': report['status'],
+        }), hide_index=True, width='stretch')
+        st.caption(f"PSI of {PSI_WATCH} or more is worth watching; {PSI_ALERT} or more, or KS of {KS_ALERT} or "
+                   f"more, is drift. Inputs with fewer than {MIN_ROWS} applications are not judged.")
+
+        drift_feature = st.selectbox("Compare distributions for", monitor.reference.features,
+                                     format_func=lambda name: name.replace('_', ' ').title())
+        recent = window_counts.get(drift_feature, np.zeros(len(monitor.reference.counts[drift_feature])))
+        show(session_figure('drift', DriftFigure).update(
+            drift_feature, monitor.reference.bin_labels(drift_feature),
+            monitor.reference.counts[drift_feature], recent))
+
+    # Alerts raised over the last week's applications, newest first
+    alerts = monitor.alerts()
+    if alerts:
+        st.subheader("Recent Alerts")
+        st.dataframe(pd.DataFrame(alerts[::-1])[['time', 'feature', 'source', 'psi', 'ks', 'rows']],
+                     hide_index=True, width='stretch')
+
 # Add a footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import pickle
+import threading
+
+import streamlit as st
+
+from compiled_forest import compile_pipeline
+from drift_monitor import DriftMonitor
+from history_store import HistoryStore
+from train import approved_cohort, input_reference, load_data
+from prediction_cache import PredictionCache
+from registry import ModelRegistry
+
+
+# Content hash of the model file. Cached on the file's mtime and size, so
+# a rerun only costs an os.stat() and the file is re-hashed only after it
+# has been written to.
+@st.cache_resource(max_entries=8, show_spinner=False)
+def file_digest(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# The unpickled model, shared by every session in the process. Keyed by
+# content hash: rewriting the file with a new model loads it on the next
+# rerun, while touching it without changes keeps the loaded one.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_model(path, digest):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def model_version(path):
+    stat = os.stat(path)
+    return file_digest(path, stat.st_mtime_ns, stat.st_size)
+
+
+def cached_model(path):
+    return load_model(path, model_version(path))
+
+
+# The same model flattened for fast scoring of a few rows at a time,
+# rebuilt whenever the model itself is reloaded
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_compiled(path, digest):
+    return compile_pipeline(load_model(path, digest))
+
+
+def cached_compiled(path):
+    return load_compiled(path, model_version(path))
+
+
+# The registry's production model: the pipeline, for the app's insights,
+# and the memory-mapped compiled forest for scoring, with the version.
+# Keyed by version, so promoting another version loads it on the next rerun.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_registered(root, version):
+    registry = ModelRegistry(root)
+    return registry.load_pipeline(version), registry.load_compiled(version)
+
+
+def production_model(root):
+    version = ModelRegistry(root).production_version()
+    return (*load_registered(root, version), version) if version else None
+
+
+# Approved applicants in the model's training data. Registered models carry
+# their own; others were trained on the default synthetic data.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def training_cohort(root, version):
+    cohort = ModelRegistry(root).load_cohort(version) if version else None
+    return cohort or approved_cohort(load_data())
+
+
+# Drift monitoring against the model's training inputs, likewise falling
+# back to the default synthetic data
+@st.cache_resource(max_entries=2, show_spinner=False)
+def drift_monitor(root, version):
+    reference = ModelRegistry(root).load_reference(version) if version else None
+    return DriftMonitor(reference or input_reference(load_data()))
+
+
+# Predictions already made, shared by every session in the process
+@st.cache_resource(show_spinner=False)
+def prediction_cache():
+    return PredictionCache()
+
+
+# Explanations already computed, likewise
+@st.cache_resource(show_spinner=False)
+def explanation_cache():
+    return PredictionCache(max_entries=1024)
+
+
+# Closed days of the saved history are compacted in a background thread,
+# once per process and day, so no rerun waits on it
+@st.cache_resource(max_entries=2, show_spinner=False)
+def history_compaction(root, day):
+    thread = threading.Thread(target=HistoryStore(root).compact_closed, kwargs={'today': day}, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from train import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+# Memoised approval probabilities (and explanations) for the app.
+#
+# Most reruns rescore applicants that were scored moments ago: switching
+# tabs, or moving a slider away and back. Each row is keyed by its eight
+# inputs, numbers rounded so that 0.3 from a slider and 0.30000000000000004
+# from arithmetic are the same applicant, and only rows not seen before
+# reach the model. Entries belong to one model version; a different
+# version empties the cache.
+
+DECIMALS = 6  # far finer than any input control's step
+
+
+def row_keys(frame):
+    numeric = [np.round(frame[column].to_numpy(dtype=np.float64), DECIMALS).tolist()
+               for column in NUMERIC_FEATURES]
+    categorical = [[str(value) for value in frame[column]] for column in CATEGORICAL_FEATURES]
+    return list(zip(*numeric, *categorical))
+
+
+class PredictionCache:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    # Per-row results of compute(frame) for any function returning one row
+    # per input row
+    def lookup(self, version, compute, frame):
+        keys = row_keys(frame)
+        found = {}
+        with self._lock:
+            self._check_version(version)
+            for index, key in enumerate(keys):
+                row = self._entries.get(key)
+                if row is not None:
+                    self._entries.move_to_end(key)
+                    found[index] = row
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        missing = [index for index in range(len(keys)) if index not in found]
+        if missing:
+            # Scored outside the lock, all missing rows in one call
+            scored = compute(frame.iloc[missing] if len(missing) < len(keys) else frame)
+            with self._lock:
+                # A newer model may have taken over while these were scored
+                if version == self.version:
+                    for index, row in zip(missing, scored):
+                        self._entries[keys[index]] = row
+                        self._entries.move_to_end(keys[index])
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            found.update(zip(missing, scored))
+        return np.array([found[index] for index in range(len(keys))])
+
+    def predict_proba(self, version, model, frame):
+        return self.lookup(version, model.predict_proba, frame)
+
+    def scorer(self, version, model):
+        return CachedScorer(self, version, model)
+
+
+# Drop-in for the model's predict_proba, answered from the cache. There is
+# no predict: it would look the rows up a second time and count the reuse
+# twice, so callers take the most probable of classes_ instead.
+class CachedScorer:
+    def __init__(self, cache, version, model):
+        self.cache = cache
+        self.version = version
+        self.model = model
+        self.classes_ = model.classes_
+
+    def predict_proba(self, frame):
+        return self.cache.predict_proba(self.version, self.model, frame)
@@ -0,0 +1,200 @@
+# Local registry of versioned model artifacts.
+# Run with: python registry.py [--root models] list | show <version> |
+#           register <model.pkl> [--promote] | promote <version>
+#
+# Each version is a directory holding the fitted pipeline, the compiled
+# forest, a metadata.json (training data hash, metrics, feature schema)
+# and, when registered with them, cohort.json: statistics of the approved
+# applicants in the training data, and reference.json: histograms of its
+# inputs, which incoming applications are checked against for drift.
+# The compiled forest is a set of plain NumPy arrays saved uncompressed, so
+# joblib can memory-map it: loading is near-instant whatever the forest
+# size, and every process that maps the same file shares one read-only
+# copy in the page cache. The scikit-learn pipeline cannot be mapped (its
+# trees copy their arrays on unpickling) and is loaded only where its
+# internals are needed.
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+import joblib
+import sklearn
+
+from cohort_stats import CohortStats
+from compiled_forest import compile_pipeline
+from drift_monitor import DriftReference
+
+PRODUCTION = "PRODUCTION"
+PIPELINE_FILE = "pipeline.joblib"
+COMPILED_FILE = "compiled.joblib"
+METADATA_FILE = "metadata.json"
+COHORT_FILE = "cohort.json"
+REFERENCE_FILE = "reference.json"
+
+
+def feature_schema(model):
+    preprocessor = model.named_steps['preprocessor']
+    columns = dict((name, list(selected)) for name, _, selected in preprocessor.transformers_)
+    encoder = preprocessor.named_transformers_['cat']
+    return {
+        'numeric': columns['num'],
+        'categorical': {column: [str(value) for value in values]
+                        for column, values in zip(columns['cat'], encoder.categories_)},
+    }
+
+
+class ModelRegistry:
+    def __init__(self, root="models"):
+        self.root = root
+
+    def _path(self, version, name=""):
+        return os.path.join(self.root, version, name)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith('v') and os.path.exists(self._path(name, METADATA_FILE)))
+
+    def metadata(self, version):
+        with open(self._path(version, METADATA_FILE)) as file:
+            return json.load(file)
+
+    def production_version(self):
+        try:
+            with open(os.path.join(self.root, PRODUCTION)) as file:
+                return file.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def register(self, model, data_digest=None, metrics=None, params=None, promote=False, cohort=None, reference=None,
+                 **extra):
+        os.makedirs(self.root, exist_ok=True)
+        # Built in a scratch directory and renamed into place, so a version
+        # directory is either absent or complete
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+        os.chmod(staging, 0o755)
+        compiled = compile_pipeline(model)
+        joblib.dump(model, os.path.join(staging, PIPELINE_FILE))
+        joblib.dump(compiled, os.path.join(staging, COMPILED_FILE))
+        if cohort is not None:
+            with open(os.path.join(staging, COHORT_FILE), 'w') as file:
+                json.dump(cohort.to_dict(), file)
+        if reference is not None:
+            with open(os.path.join(staging, REFERENCE_FILE), 'w') as file:
+                json.dump(reference.to_dict(), file)
+        metadata = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'data_digest': data_digest,
+            'metrics': metrics or {},
+            'params': params or {},
+            'feature_schema': feature_schema(model),
+            'n_trees': compiled.n_trees,
+            'n_nodes': compiled.n_nodes,
+            'sklearn_version': sklearn.__version__,
+            **extra,
+        }
+        while True:
+            existing = self.versions()
+            version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+            metadata['version'] = version
+            with open(os.path.join(staging, METADATA_FILE), 'w') as file:
+                json.dump(metadata, file, indent=2, default=str)
+            try:
+                os.rename(staging, self._path(version))
+                break
+            except OSError:
+                # Another process took this number first
+                if not os.path.exists(self._path(version)):
+                    shutil.rmtree(staging, ignore_errors=True)
+                    raise
+        if promote:
+            self.promote(version)
+        return version
+
+    def promote(self, version):
+        if version not in self.versions():
+            raise ValueError(f"No model version {version} in {self.root}")
+        temp = os.path.join(self.root, PRODUCTION + ".tmp")
+        with open(temp, 'w') as file:
+            file.write(version)
+        os.replace(temp, os.path.join(self.root, PRODUCTION))
+
+    def _resolve(self, version):
+        version = version or self.production_version()
+        if version is None:
+            raise ValueError(f"No production model in {self.root}")
+        return version
+
+    def load_compiled(self, version=None, mmap=True):
+        version = self._resolve(version)
+        compiled = joblib.load(self._path(version, COMPILED_FILE), mmap_mode='r' if mmap else None)
+        # Compiled before missing values were routed as the trees route
+        # them: compiled again from the pipeline
+        if getattr(compiled, 'missing_right', None) is None:
+            compiled = compile_pipeline(self.load_pipeline(version))
+        return compiled
+
+    def load_pipeline(self, version=None):
+        return joblib.load(self._path(self._resolve(version), PIPELINE_FILE))
+
+    def load_cohort(self, version=None):
+        try:
+            with open(self._path(self._resolve(version), COHORT_FILE)) as file:
+                return CohortStats.from_dict(json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def load_reference(self, version=None):
+        try:
+            with open(self._path(self._resolve(version), REFERENCE_FILE)) as file:
+                return DriftReference.from_dict(json.load(file))
+        except FileNotFoundError:
+            return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local model registry")
+    parser.add_argument("--root", default="models")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list versions, marking production")
+    show = commands.add_parser("show", help="print a version's metadata")
+    show.add_argument("version")
+    register = commands.add_parser("register", help="add a pickled pipeline as a new version")
+    register.add_argument("model")
+    register.add_argument("--promote", action="store_true")
+    promote = commands.add_parser("promote", help="make a version the production model")
+    promote.add_argument("version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    try:
+        if args.command == "list":
+            production = registry.production_version()
+            for version in registry.versions():
+                metadata = registry.metadata(version)
+                metrics = ", ".join(f"{name} {value:.4f}" for name, value in metadata['metrics'].items()
+                                    if isinstance(value, float))
+                print(f"{'*' if version == production else ' '} {version}  {metadata['created_at']}  {metrics}")
+        elif args.command == "show":
+            print(json.dumps(registry.metadata(args.version), indent=2))
+        elif args.command == "register":
+            with open(args.model, 'rb') as file:
+                model = pickle.load(file)
+            version = registry.register(model, promote=args.promote, source=os.path.abspath(args.model))
+            print(f"Registered {version}{' as production' if args.promote else ''}")
+        else:
+            registry.promote(args.version)
+            print(f"{args.version} is now the production model")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
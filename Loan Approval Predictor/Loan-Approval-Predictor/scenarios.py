@@ -0,0 +1,43 @@
+import numpy as np
+
+# Values swept by the scenario analysis for each numeric factor, with the
+# axis label to show for it
+FACTOR_RANGES = {
+    'credit_score': (np.linspace(300, 850, 20), 'Credit Score'),
+    'annual_income': (np.linspace(20000, 200000, 20), 'Annual Income ($)'),
+    'loan_amount': (np.linspace(5000, 500000, 20), 'Loan Amount ($)'),
+    'loan_term': (np.array([36, 60, 84, 120, 180, 240, 360]), 'Loan Term (months)'),
+    'employment_years': (np.linspace(0, 30, 20), 'Employment Years'),
+    'debt_to_income': (np.linspace(0, 0.6, 20), 'Debt-to-Income Ratio'),
+}
+
+
+def _repeat(base, n):
+    # n copies of the single applicant row, as one frame
+    return base.iloc[np.zeros(n, dtype=int)].reset_index(drop=True)
+
+
+# Approval probability as each factor sweeps its range with the other
+# inputs held at the applicant's values. Every factor's rows go into one
+# frame and are scored by a single predict_proba call.
+def score_scenarios(model, base, factors=None):
+    factors = factors or {factor: values for factor, (values, _) in FACTOR_RANGES.items()}
+    sizes = [len(values) for values in factors.values()]
+    frame = _repeat(base, sum(sizes)).astype({factor: float for factor in factors})
+    start = 0
+    for (factor, values), size in zip(factors.items(), sizes):
+        column = frame.columns.get_loc(factor)
+        frame.iloc[start:start + size, column] = values
+        start += size
+    probabilities = model.predict_proba(frame)[:, 1]
+    return dict(zip(factors, np.split(probabilities, np.cumsum(sizes)[:-1])))
+
+
+# Approval probability over a 2-D grid of two factors, as an array with
+# one row per y value and one column per x value
+def score_grid(model, base, x_factor, x_values, y_factor, y_values):
+    x_grid, y_grid = np.meshgrid(x_values, y_values)
+    frame = _repeat(base, x_grid.size)
+    frame[x_factor] = x_grid.ravel().astype(float)
+    frame[y_factor] = y_grid.ravel().astype(float)
+    return model.predict_proba(frame)[:, 1].reshape(x_grid.shape)
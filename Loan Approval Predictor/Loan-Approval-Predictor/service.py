@@ -0,0 +1,239 @@
+# Loan approval scoring API using FastAPI
+# Run with: uvicorn service:app --port 8000
+#
+# Single-application requests that arrive together are coalesced into one
+# predict_proba call: the first request of a batch waits at most
+# MAX_WAIT_MS for others to join, up to MAX_BATCH rows.
+import asyncio
+import os
+import pickle
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Literal
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
+
+from compiled_forest import compile_pipeline
+from registry import ModelRegistry
+
+MODEL_REGISTRY = os.environ.get("LOAN_MODEL_REGISTRY", "models")
+MODEL_PATH = os.environ.get("LOAN_MODEL_PATH", "loan_approval_model.pkl")
+MAX_BATCH = int(os.environ.get("LOAN_MAX_BATCH", "256"))
+MAX_WAIT_MS = float(os.environ.get("LOAN_MAX_WAIT_MS", "5"))
+COMPILED = os.environ.get("LOAN_COMPILED", "1") == "1"
+THRESHOLD = 0.5
+
+FEATURES = ['credit_score', 'annual_income', 'loan_amount', 'loan_term',
+            'employment_years', 'debt_to_income', 'education', 'employment_type']
+
+
+# Pydantic models
+class LoanApplication(BaseModel):
+    credit_score: int = Field(ge=300, le=850)
+    annual_income: float = Field(ge=0)
+    loan_amount: float = Field(gt=0)
+    loan_term: int = Field(gt=0)
+    employment_years: float = Field(ge=0)
+    debt_to_income: float = Field(ge=0)
+    education: Literal['High School', 'Bachelor', 'Master', 'PhD']
+    employment_type: Literal['Full-time', 'Part-time', 'Self-employed', 'Unemployed']
+
+
+class LoanDecision(BaseModel):
+    approval_probability: float
+    predicted_approval: Literal['Approved', 'Denied']
+
+
+def decision(probability):
+    return LoanDecision(approval_probability=float(probability),
+                        predicted_approval="Approved" if probability >= THRESHOLD else "Denied")
+
+
+# The registry's production model, or the plain pickle when nothing has
+# been promoted. Checked before each batch and reloaded when it changes.
+class ModelHolder:
+    def __init__(self, registry_root, path, compiled=COMPILED):
+        self.registry = ModelRegistry(registry_root)
+        self.path = path
+        self.compiled = compiled
+        self.stamp = None
+        self.model = None
+        self.source = None
+
+    def get(self):
+        version = self.registry.production_version()
+        if version is not None:
+            if version != self.stamp:
+                # Memory-mapped: near-instant, and shared with every other
+                # process serving the same version
+                model = self.registry.load_compiled(version) if self.compiled else self._prepare(
+                    self.registry.load_pipeline(version))
+                self.model, self.stamp, self.source = model, version, f"{self.registry.root}/{version}"
+            return self.model
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self.stamp:
+            with open(self.path, 'rb') as file:
+                model = self._prepare(pickle.load(file))
+            if self.compiled:
+                # Micro-batches are small, where the compiled forest is
+                # several times faster than the pipeline
+                model = compile_pipeline(model)
+            self.model, self.stamp, self.source = model, stamp, self.path
+        return self.model
+
+    def _prepare(self, model):
+        # Batches are small; a thread pool per call would cost more than it saves
+        model.named_steps['classifier'].n_jobs = 1
+        return model
+
+    def predict(self, frame):
+        return self.get().predict_proba(frame)[:, 1]
+
+
+# Request latency and throughput over the most recent requests
+class Metrics:
+    def __init__(self, window=10000):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.latencies = deque(maxlen=window)
+        self.finished = deque(maxlen=window)  # completion times, for the recent rate
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_rows += size
+
+    def record_request(self, latency):
+        self.requests += 1
+        self.latencies.append(latency)
+        self.finished.append(time.monotonic())
+
+    def snapshot(self):
+        latencies = np.array(self.latencies) * 1000
+        recent = self.finished[-1] - self.finished[0] if len(self.finished) > 1 else 0
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_rows / self.batches if self.batches else 0.0,
+            "throughput_rps": (len(self.finished) - 1) / recent if recent else 0.0,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                "p95": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+                "p99": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            },
+            "uptime_s": time.monotonic() - self.started,
+        }
+
+
+class MicroBatcher:
+    def __init__(self, holder, metrics, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.holder = holder
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = []
+        self.ready = asyncio.Event()  # at least one request is waiting
+        self.full = asyncio.Event()  # a whole batch is waiting
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+    async def score(self, row):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((row, future))
+        self.ready.set()
+        if len(self.pending) >= self.max_batch:
+            self.full.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.ready.wait()
+            # The first request waits at most max_wait for others to join
+            # unless a full batch turns up sooner
+            if len(self.pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self.full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self.pending[:self.max_batch]
+            del self.pending[:self.max_batch]
+            if len(self.pending) < self.max_batch:
+                self.full.clear()
+            if not self.pending:
+                self.ready.clear()
+
+            frame = pd.DataFrame([row for row, _ in batch], columns=FEATURES)
+            try:
+                # Scored off the event loop so requests keep being accepted;
+                # whatever arrives meanwhile makes up the next batch
+                probabilities = await loop.run_in_executor(None, self.holder.predict, frame)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.metrics.record_batch(len(batch))
+            for (_, future), probability in zip(batch, probabilities):
+                if not future.done():
+                    future.set_result(probability)
+
+
+holder = ModelHolder(MODEL_REGISTRY, MODEL_PATH)
+metrics = Metrics()
+batcher = MicroBatcher(holder, metrics)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    holder.get()
+    batcher.start()
+    yield
+    await batcher.stop()
+
+
+# FastAPI app
+app = FastAPI(title="Loan Approval API", lifespan=lifespan)
+
+
+@app.post("/predict", response_model=LoanDecision)
+async def predict(application: LoanApplication):
+    """Score one application"""
+    started = time.perf_counter()
+    probability = await batcher.score(application.model_dump())
+    metrics.record_request(time.perf_counter() - started)
+    return decision(probability)
+
+
+@app.post("/predict/batch", response_model=List[LoanDecision])
+async def predict_batch(applications: List[LoanApplication]):
+    """Score many applications in one call"""
+    frame = pd.DataFrame([application.model_dump() for application in applications], columns=FEATURES)
+    probabilities = await asyncio.get_running_loop().run_in_executor(None, holder.predict, frame)
+    return [decision(probability) for probability in probabilities]
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Latency percentiles, throughput and batching statistics"""
+    return metrics.snapshot()
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "model": holder.source}
@@ -0,0 +1,117 @@
+# Synthetic loan applications for training, at any volume.
+# Run with: python synthetic_data.py data/ --rows 10000000 [options]
+#
+# Rows are generated in fixed-size chunks, each from its own random stream
+# spawned from the seed, so the output depends only on the seed and the
+# chunk size: chunks can be generated in any order, in parallel, and only
+# one chunk per worker is ever in memory. Each chunk becomes one Parquet
+# shard of the output directory.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+EDUCATION = ['High School', 'Bachelor', 'Master', 'PhD']
+EMPLOYMENT_TYPES = ['Full-time', 'Part-time', 'Self-employed', 'Unemployed']
+LOAN_TERMS = np.array([36, 60, 84, 120, 180, 240, 360])
+
+# Approval score adjustment per category, in the order above
+EDUCATION_BONUS = np.array([0.0, 0.05, 0.08, 0.1])
+EMPLOYMENT_IMPACT = np.array([0.0, -0.1, -0.05, -0.4])
+
+
+def generate_chunk(rng, n):
+    credit_score = rng.integers(300, 850, n)
+    annual_income = rng.integers(20000, 200000, n)
+    loan_amount = rng.integers(5000, 500000, n)
+    loan_term = LOAN_TERMS[rng.integers(0, len(LOAN_TERMS), n)]
+    employment_years = rng.integers(0, 30, n)
+    debt_to_income = rng.uniform(0, 0.6, n)
+    education = rng.integers(0, len(EDUCATION), n)
+    employment_type = rng.integers(0, len(EMPLOYMENT_TYPES), n)
+
+    # Higher credit scores, income and employment years increase the
+    # approval chance; higher loan amounts and debt-to-income reduce it
+    approval_score = (
+        (credit_score - 300) / 550 * 0.35 +
+        (np.log10(annual_income) - 4) / 2 * 0.25 +
+        (1 - loan_amount / 500000) * 0.15 +
+        employment_years / 30 * 0.15 +
+        (1 - debt_to_income / 0.6) * 0.1 +
+        EDUCATION_BONUS[education] +
+        EMPLOYMENT_IMPACT[employment_type] +
+        rng.normal(0, 0.1, n)
+    )
+
+    return pd.DataFrame({
+        'credit_score': credit_score,
+        'annual_income': annual_income,
+        'loan_amount': loan_amount,
+        'loan_term': loan_term,
+        'employment_years': employment_years,
+        'debt_to_income': debt_to_income,
+        'education': pd.Categorical.from_codes(education, EDUCATION),
+        'employment_type': pd.Categorical.from_codes(employment_type, EMPLOYMENT_TYPES),
+        'loan_approved': (approval_score > 0.5).astype(np.int8),
+    })
+
+
+def chunk_sizes(rows, chunk_size):
+    full, rest = divmod(rows, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def generate(rows, seed=42, chunk_size=1_000_000):
+    sizes = chunk_sizes(rows, chunk_size)
+    for stream, size in zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes):
+        yield generate_chunk(np.random.default_rng(stream), size)
+
+
+def generate_frame(rows, seed=42):
+    return pd.concat(generate(rows, seed), ignore_index=True)
+
+
+def _write_shard(path, stream, size):
+    generate_chunk(np.random.default_rng(stream), size).to_parquet(path, index=False)
+    return size
+
+
+def write_shards(directory, rows, seed=42, chunk_size=1_000_000, workers=None, progress=None):
+    os.makedirs(directory, exist_ok=True)
+    sizes = chunk_sizes(rows, chunk_size)
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    paths = [os.path.join(directory, f"part-{index:05d}.parquet") for index in range(len(sizes))]
+    written = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as pool:
+        for size in pool.map(_write_shard, paths, streams, sizes):
+            written += size
+            if progress:
+                progress(written, time.perf_counter() - started)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic loan applications as Parquet shards")
+    parser.add_argument("output", help="directory to write the part-NNNNN.parquet shards to")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="rows per shard")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    def progress(rows, elapsed):
+        print(f"\r{rows:,} rows, {rows / elapsed:,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    paths = write_shards(args.output, args.rows, args.seed, args.chunk_size, args.workers, progress)
+    print(f"\nWrote {args.rows:,} rows to {len(paths)} shards in {args.output} "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiled_forest import compile_pipeline  # noqa: E402
+from train import CATEGORICAL_FEATURES, NUMERIC_FEATURES, TARGET, build_pipeline, load_data  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    data = load_data(rows=3000, seed=7)
+    model = build_pipeline(n_estimators=25).fit(data[NUMERIC_FEATURES + CATEGORICAL_FEATURES], data[TARGET])
+    frame = load_data(rows=400, seed=8)[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+    return model, compile_pipeline(model), frame
+
+
+def with_missing(frame):
+    frame = frame.copy()
+    rng = np.random.default_rng(0)
+    for column in NUMERIC_FEATURES:
+        frame.loc[rng.random(len(frame)) < 0.2, column] = np.nan
+    for column in CATEGORICAL_FEATURES:
+        rows = np.flatnonzero(rng.random(len(frame)) < 0.3)
+        for row, value in zip(rows, [None, np.nan, "Unseen", 3] * len(rows)):
+            frame.iat[row, frame.columns.get_loc(column)] = value
+    return frame
+
+
+def test_matches_pipeline(fitted):
+    model, compiled, frame = fitted
+    assert np.array_equal(compiled.predict_proba(frame), model.predict_proba(frame))
+
+
+def test_matches_pipeline_with_missing_values(fitted):
+    model, compiled, frame = fitted
+    frame = with_missing(frame)
+    assert np.array_equal(compiled.predict_proba(frame), model.predict_proba(frame))
+
+
+def test_explanations_add_up_with_missing_values(fitted):
+    _, compiled, frame = fitted
+    frame = with_missing(frame)
+    total = compiled.bias + compiled.explain(frame).sum(axis=1)
+    assert np.allclose(total, compiled.predict_proba(frame)[:, -1])
@@ -0,0 +1,221 @@
+# Offline training with a hyperparameter search.
+# Run with: python train.py [--data shards/ | --rows 20000] [options]
+#
+# The grid is searched with GridSearchCV over a pool of worker processes.
+# The pipeline caches its fitted preprocessing on disk, so each CV fold's
+# scaler and encoder are fitted once and shared by every parameter
+# combination and every worker. The whole search result is cached too:
+# with the same data, grid and settings, the best model is reused instead
+# of retrained. The best model is added to the model registry (see
+# registry.py) and promoted to production.
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from cohort_stats import CohortStats
+from drift_monitor import DriftReference
+from registry import ModelRegistry
+
+NUMERIC_FEATURES = ['credit_score', 'annual_income', 'loan_amount', 'loan_term',
+                    'employment_years', 'debt_to_income']
+CATEGORICAL_FEATURES = ['education', 'employment_type']
+TARGET = 'loan_approved'
+
+DEFAULT_GRID = {
+    'classifier__n_estimators': [100, 200],
+    'classifier__max_depth': [None, 10, 20],
+    'classifier__min_samples_leaf': [1, 5],
+}
+
+
+def build_preprocessor():
+    return ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), NUMERIC_FEATURES),
+            ('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_FEATURES)
+        ])
+
+
+def build_pipeline(memory=None, **classifier_params):
+    classifier_params.setdefault('n_estimators', 100)
+    classifier_params.setdefault('random_state', 42)
+    return Pipeline(steps=[
+        ('preprocessor', build_preprocessor()),
+        ('classifier', RandomForestClassifier(**classifier_params))
+    ], memory=memory)
+
+
+def load_data(data=None, rows=20000, seed=42):
+    if data:
+        frame = pd.read_parquet(data) if os.path.isdir(data) or data.endswith('.parquet') else pd.read_csv(data)
+    else:
+        from synthetic_data import generate_frame
+        frame = generate_frame(rows, seed)
+    # Categoricals go to the encoder as plain strings, as the app sends them
+    for column in CATEGORICAL_FEATURES:
+        frame[column] = frame[column].astype(object)
+    return frame
+
+
+# Statistics of the approved applicants, kept with the model so the app
+# can compare an applicant against them
+def approved_cohort(frame):
+    return CohortStats.from_frame(frame[frame[TARGET] == 1], NUMERIC_FEATURES, seed=0)
+
+
+# Histograms of the training inputs, which incoming applications are
+# checked against for drift
+def input_reference(frame):
+    return DriftReference.from_frame(frame, NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+
+
+def data_digest(frame):
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+# Everything that decides the search outcome; equal keys mean the cached
+# result is the one a new search would produce
+def search_key(digest, grid, folds, test_size, seed):
+    settings = {
+        'data': digest,
+        'grid': {name: list(values) for name, values in sorted(grid.items())},
+        'folds': folds,
+        'test_size': test_size,
+        'seed': seed,
+        'sklearn': sklearn.__version__,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def run_search(frame, grid=None, folds=3, test_size=0.2, seed=42, workers=None, cache_dir=".train_cache",
+               log=print):
+    grid = grid or DEFAULT_GRID
+    digest = data_digest(frame)
+    key = search_key(digest, grid, folds, test_size, seed)
+    result_path = os.path.join(cache_dir, "results", f"{key}.joblib")
+    if os.path.exists(result_path):
+        log(f"Search unchanged since last run, reusing {result_path}")
+        return joblib.load(result_path)
+
+    X = frame[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+    y = frame[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed,
+                                                        stratify=y)
+
+    memory = joblib.Memory(os.path.join(cache_dir, "transformers"), verbose=0)
+    search = GridSearchCV(
+        build_pipeline(memory=memory),
+        grid,
+        cv=StratifiedKFold(folds, shuffle=True, random_state=seed),
+        scoring='roc_auc',
+        n_jobs=workers or os.cpu_count() or 1,
+        refit=True,
+    )
+    candidates = int(np.prod([len(values) for values in grid.values()]))
+    log(f"Searching {candidates} candidates x {folds} folds on {len(X_train):,} rows")
+    started = time.perf_counter()
+    search.fit(X_train, y_train)
+    elapsed = time.perf_counter() - started
+
+    model = search.best_estimator_
+    # The saved model must not point at the cache directory
+    model.set_params(memory=None)
+    probabilities = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        'cv_roc_auc': float(search.best_score_),
+        'test_roc_auc': float(roc_auc_score(y_test, probabilities)),
+        'test_accuracy': float(accuracy_score(y_test, probabilities >= 0.5)),
+        'search_seconds': elapsed,
+    }
+    result = {
+        'model': model,
+        'metadata': {
+            'version': f"rf-{key[:12]}",
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            'data_digest': digest,
+            'rows': len(frame),
+            'params': {name.split('__', 1)[1]: value for name, value in search.best_params_.items()},
+            'metrics': metrics,
+            'grid': grid,
+        },
+    }
+    os.makedirs(os.path.dirname(result_path), exist_ok=True)
+    joblib.dump(result, result_path)
+    return result
+
+
+def save_model(result, output):
+    # Written beside the target and renamed over it, so the app never
+    # reads a half-written model
+    temp = output + ".tmp"
+    with open(temp, 'wb') as file:
+        pickle.dump(result['model'], file)
+    os.replace(temp, output)
+    with open(os.path.splitext(output)[0] + ".json", 'w') as file:
+        json.dump(result['metadata'], file, indent=2, default=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the loan approval model with a hyperparameter search")
+    parser.add_argument("--data", help="Parquet file or shard directory, or CSV (default: generate --rows)")
+    parser.add_argument("--rows", type=int, default=20000, help="synthetic rows when no --data is given")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--grid", help="JSON parameter grid, e.g. '{\"classifier__max_depth\": [10, 20]}'")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default=".train_cache")
+    parser.add_argument("--registry", default="models", help="model registry directory")
+    parser.add_argument("--no-promote", action="store_true", help="register without making it production")
+    parser.add_argument("--output", help="also write the model as a plain pickle")
+    args = parser.parse_args()
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    try:
+        frame = load_data(args.data, args.rows, args.seed)
+        grid = json.loads(args.grid) if args.grid else None
+    except (OSError, ValueError) as e:
+        log(f"Error: {e}")
+        sys.exit(1)
+    started = time.perf_counter()
+    result = run_search(frame, grid, args.folds, seed=args.seed, workers=args.workers,
+                        cache_dir=args.cache_dir, log=log)
+    metadata = result['metadata']
+    registry = ModelRegistry(args.registry)
+    # A cached search result is registered once, not on every run
+    version = next((version for version in registry.versions()
+                    if registry.metadata(version).get('tag') == metadata['version']), None)
+    if version is None:
+        version = registry.register(result['model'], data_digest=metadata['data_digest'],
+                                    metrics=metadata['metrics'], params=metadata['params'],
+                                    cohort=approved_cohort(frame), reference=input_reference(frame),
+                                    tag=metadata['version'], rows=metadata['rows'], grid=metadata['grid'])
+    if not args.no_promote:
+        registry.promote(version)
+    if args.output:
+        save_model(result, args.output)
+    log(f"{metadata['version']} is {version} in {args.registry}{'' if args.no_promote else ' (production)'}, "
+        f"{time.perf_counter() - started:.1f}s: params {metadata['params']}, " +
+        ", ".join(f"{name} {value:.4f}" for name, value in metadata['metrics'].items() if name != 'search_seconds'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Background training for when the app starts without a model.
+# The app starts it itself; to run it by hand:
+#   python training_job.py models --status status.json
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import streamlit as st
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from registry import ModelRegistry
+from train import CATEGORICAL_FEATURES, NUMERIC_FEATURES, TARGET, approved_cohort, build_pipeline, \
+    build_preprocessor, data_digest, input_reference, load_data
+
+
+def write_status(path, **status):
+    temp = path + ".tmp"
+    with open(temp, 'w') as file:
+        json.dump(status, file)
+    os.replace(temp, path)
+
+
+def train(registry_root, status_path, rows=20000, seed=42, trees=100, step=10):
+    try:
+        write_status(status_path, stage="Generating training data", progress=0.0)
+        data = load_data(rows=rows, seed=seed)
+        X = data[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+        y = data[TARGET]
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+
+        # warm_start grows the forest a few trees at a time, giving the
+        # same trees a one-shot fit with this seed would
+        model = build_pipeline(n_estimators=0, warm_start=True)
+        for count in range(step, trees + step, step):
+            count = min(count, trees)
+            write_status(status_path, stage=f"Training trees {count}/{trees}", progress=(count - step) / trees * 0.95)
+            model.set_params(classifier__n_estimators=count)
+            model.fit(X_train, y_train)
+        model.set_params(classifier__warm_start=False)
+
+        write_status(status_path, stage="Registering model", progress=0.95)
+        accuracy = accuracy_score(y_test, model.predict(X_test))
+        # The version directory is renamed into place before it is
+        # promoted: readers see the old production model or the new one
+        version = ModelRegistry(registry_root).register(
+            model, data_digest=data_digest(data), metrics={'test_accuracy': accuracy},
+            params={'n_estimators': trees}, promote=True, cohort=approved_cohort(data),
+            reference=input_reference(data), rows=rows, source="background training")
+        write_status(status_path, stage="Ready", progress=1.0, accuracy=accuracy, version=version, done=True)
+    except Exception as e:
+        write_status(status_path, stage="Failed", progress=0.0, error=f"{type(e).__name__}: {e}", done=True)
+
+
+# Runs train() in a child process, so neither the GIL nor, at low
+# priority, the CPU is taken from the app's reruns. Progress comes back
+# through a small status file.
+class TrainingJob:
+    def __init__(self, registry_root, rows=20000, seed=42, trees=100, step=10):
+        self.registry_root = registry_root
+        self.args = ["--rows", str(rows), "--seed", str(seed), "--trees", str(trees), "--step", str(step)]
+        self.status_path = os.path.join(tempfile.mkdtemp(prefix="loan-training-"), "status.json")
+        self.stage = "Starting"
+        self.progress = 0.0
+        self.accuracy = None
+        self.version = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._process = None
+
+    def start(self):
+        self.started = time.monotonic()
+        priority = {'creationflags': subprocess.BELOW_NORMAL_PRIORITY_CLASS} if os.name == 'nt' else {}
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), self.registry_root, "--status", self.status_path] + self.args,
+            **priority,
+        )
+        # Lowered from outside rather than with preexec_fn, which is not safe
+        # to run in a child forked from the server's threads
+        if os.name != 'nt':
+            try:
+                os.setpriority(os.PRIO_PROCESS, self._process.pid, 19)
+            except ProcessLookupError:
+                pass  # already exited; poll() reports how
+
+    def poll(self):
+        if self.finished is not None:
+            return
+        try:
+            with open(self.status_path) as file:
+                status = json.load(file)
+        except (OSError, ValueError):
+            status = {}
+        self.stage = status.get('stage', self.stage)
+        self.progress = status.get('progress', self.progress)
+        if status.get('done'):
+            self.accuracy = status.get('accuracy')
+            self.version = status.get('version')
+            self.error = status.get('error')
+            # Reported done, yet nothing for the app to load: a failure too,
+            # or the app would rerun forever waiting for the model
+            if self.error is None and ModelRegistry(self.registry_root).production_version() is None:
+                self.error = "training finished but no production model was registered"
+                self.stage = "Failed"
+            self.finished = time.monotonic()
+        elif self._process.poll() is not None:
+            self.error = f"training process exited with code {self._process.returncode}"
+            self.stage = "Failed"
+            self.finished = time.monotonic()
+
+    @property
+    def done(self):
+        self.poll()
+        return self.finished is not None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started if self.started else 0.0
+
+
+# One training job per process, however many sessions are waiting on it;
+# after a failure, training_job.clear() lets the next call start another
+@st.cache_resource(show_spinner=False)
+def training_job(registry_root):
+    job = TrainingJob(registry_root)
+    job.start()
+    return job
+
+
+# A logistic model fitted in well under a second, served until the
+# forest is ready
+@st.cache_resource(show_spinner=False)
+def fallback_model():
+    data = load_data(rows=2000, seed=0)
+    model = Pipeline(steps=[
+        ('preprocessor', build_preprocessor()),
+        ('classifier', LogisticRegression(max_iter=1000))
+    ])
+    model.fit(data[NUMERIC_FEATURES + CATEGORICAL_FEATURES], data[TARGET])
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the loan approval model in the background")
+    parser.add_argument("registry", help="registry directory to add the model to")
+    parser.add_argument("--status", required=True, help="JSON file to report progress to")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--step", type=int, default=10)
+    args = parser.parse_args()
+    train(args.registry, args.status, args.rows, args.seed, args.trees, args.step)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,583 @@
+# Performance benchmarks for the university system.
+# Run with: python benchmarks.py <benchmark> [options]
+import argparse
+import csv
+import gc
+import inspect
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from bulk_import import BulkImporter
+from event_log import EventLog, apply_event
+import models
+from models import Course, Instructor, Person, Session, StaleVersionError, Student, University
+from recommend import CourseRecommender
+from timetabling import TimetableProblem, generate_timetable
+from waitlist import EnrollmentRequest, allocate
+
+
+# Build a synthetic catalog: courses spread over departments, each with an
+# instructor, and students enrolled in a handful of courses each
+def build_university(n_courses, n_students, courses_per_student=5, n_instructors=None, seed=0):
+    rng = random.Random(seed)
+    University._instance = None
+    university = University()
+    departments = [f"DEPT{d}" for d in range(40)]
+    n_instructors = n_instructors or max(n_courses // 2, 1)
+    instructors = []
+    for i in range(n_instructors):
+        instructor = Instructor(f"I{i}", f"Instructor {i}", f"i{i}@uni.edu", rng.choice(departments), "Lecturer")
+        university.add_instructor(instructor)
+        instructors.append(instructor)
+    courses = []
+    for c in range(n_courses):
+        course = Course(f"C{c}", f"Course {c}", rng.choice(departments), 10 ** 6, 3)
+        university.add_course(course)
+        university.assign_instructor(course, instructors[c % n_instructors])
+        courses.append(course)
+    for s in range(n_students):
+        student = Student(f"S{s}", f"Student {s}", f"s{s}@uni.edu", rng.choice(departments))
+        university.add_student(student)
+        # Students mostly take courses from a small cluster so clashes matter
+        base = rng.randrange(n_courses)
+        for offset in rng.sample(range(40), courses_per_student):
+            university.enroll_student(student, courses[(base + offset) % n_courses])
+    return university
+
+
+def bench_timetable(args):
+    university = build_university(args.courses, args.students)
+    rng = random.Random(1)
+    rooms = {f"R{r}": rng.choice([40, 60, 80, 120, 200, 400]) for r in range(args.rooms)}
+
+    started = time.perf_counter()
+    problem = TimetableProblem.from_university(university, rooms)
+    print(f"problem: {len(problem.events)} sessions, {len(rooms)} rooms, {len(problem.slots)} slots "
+          f"(built in {time.perf_counter() - started:.2f}s)")
+
+    started = time.perf_counter()
+    result = generate_timetable(problem, time_budget=args.budget, workers=args.workers)
+    print(f"solved in {time.perf_counter() - started:.1f}s: cost={result.cost} "
+          f"clashes={result.clashes} unplaced={len(result.unplaced)}")
+    print("elapsed_s  best_cost")
+    step = max(len(result.trace) // 20, 1)
+    for elapsed, cost in result.trace[::step] + result.trace[-1:]:
+        print(f"{elapsed:9.2f}  {cost}")
+
+
+# Simulated registration rush: every student submits ranked requests at
+# once, courses are oversubscribed, and freed seats are re-filled from the
+# waitlists as students drop
+def bench_registration(args):
+    rng = random.Random(2)
+    University._instance = None
+    university = University()
+    departments = [f"DEPT{d}" for d in range(40)]
+    courses = []
+    for c in range(args.courses):
+        course = Course(f"C{c}", f"Course {c}", rng.choice(departments), args.capacity, 3)
+        university.add_course(course)
+        courses.append(course)
+    students = []
+    for s in range(args.students):
+        student = Student(f"S{s}", f"Student {s}", f"s{s}@uni.edu", rng.choice(departments))
+        university.add_student(student)
+        students.append(student)
+
+    # Popular courses draw far more requests than they have seats
+    weights = [1 / (rank + 1) for rank in range(args.courses)]
+    requests = []
+    for student in students:
+        seniority = rng.randrange(5)
+        chosen = set()
+        while len(chosen) < args.choices:
+            chosen.add(rng.choices(courses, weights)[0].id)
+        for rank, course_id in enumerate(chosen):
+            requests.append(EnrollmentRequest(student.id, course_id, seniority, rng.random(), rank))
+
+    started = time.perf_counter()
+    result = allocate(university, requests)
+    elapsed = time.perf_counter() - started
+    print(f"allocated {len(requests)} requests in {elapsed:.2f}s "
+          f"({len(requests) / elapsed:,.0f} requests/s): {result.enrolled} enrolled, "
+          f"{result.waitlisted} waitlisted, {result.rejected} rejected")
+
+    # Drop/add period: random drops promote the next waitlisted student
+    enrolled = [(student, course) for student in students for course in student.enrolled_courses]
+    drops = rng.sample(enrolled, min(args.drops, len(enrolled)))
+    started = time.perf_counter()
+    for student, course in drops:
+        university.drop_student(student, course)
+    elapsed = time.perf_counter() - started
+    print(f"processed {len(drops)} drops with waitlist promotion in {elapsed:.2f}s "
+          f"({len(drops) / elapsed:,.0f} drops/s)")
+    for course in courses:
+        assert len(course.students) <= course.max_capacity
+
+
+# Term roster load: write CSV/JSONL roster files, then stage, validate,
+# commit and save them in one go
+def bench_import(args):
+    rng = random.Random(3)
+    directory = tempfile.mkdtemp()
+    paths = {name: os.path.join(directory, name) for name in
+             ("instructors.csv", "students.csv", "courses.csv", "enrollments.jsonl")}
+    with open(paths["instructors.csv"], "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "name", "email", "department", "rank"])
+        for i in range(args.courses // 2):
+            writer.writerow([f"I{i}", f"Instructor {i}", f"i{i}@uni.edu", f"DEPT{i % 40}", "Lecturer"])
+    with open(paths["students.csv"], "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "name", "email", "major"])
+        for s in range(args.students):
+            writer.writerow([f"S{s}", f"Student {s}", f"s{s}@uni.edu", f"DEPT{s % 40}"])
+    with open(paths["courses.csv"], "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "title", "department", "max_capacity", "credits", "instructor_id"])
+        for c in range(args.courses):
+            writer.writerow([f"C{c}", f"Course {c}", f"DEPT{c % 40}", 1000, 3, f"I{c // 2}"])
+    with open(paths["enrollments.jsonl"], "w") as file:
+        for s in range(args.students):
+            for c in rng.sample(range(args.courses), args.per_student):
+                file.write(json.dumps({"student_id": f"S{s}", "course_id": f"C{c}"}) + "\n")
+
+    University._instance = None
+    university = University()
+    os.chdir(directory)
+    importer = BulkImporter(university)
+    started = time.perf_counter()
+    importer.stage_instructors(paths["instructors.csv"])
+    importer.stage_students(paths["students.csv"])
+    importer.stage_courses(paths["courses.csv"])
+    importer.stage_enrollments(paths["enrollments.jsonl"])
+    staged = time.perf_counter()
+    report = importer.commit()
+    finished = time.perf_counter()
+    print(f"validated and staged in {staged - started:.2f}s, committed and saved in {finished - staged:.2f}s")
+    print(f"imported {report.students} students, {report.instructors} instructors, {report.courses} courses, "
+          f"{report.enrollments} enrollments with {len(report.errors)} errors "
+          f"({finished - started:.2f}s total)")
+
+
+# Enrollment churn recorded through the event log: students enroll and
+# drop at random, holding up to --per-student courses each, until the log
+# holds the requested number of events. Then the log is read back,
+# replayed from scratch, recovered from the latest snapshot plus its tail
+# as on a restart, and students' histories are looked up.
+def bench_events(args):
+    rng = random.Random(4)
+    directory = tempfile.mkdtemp()
+    log_directory = os.path.join(directory, "log")
+    os.chdir(directory)
+
+    University._instance = None
+    university = University()
+    log = EventLog(log_directory, batch_size=args.batch_size, snapshot_every=args.snapshot_every)
+    university.attach_event_log(log)
+
+    started = time.perf_counter()
+    courses = []
+    for c in range(args.courses):
+        course = Course(f"C{c}", f"Course {c}", f"DEPT{c % 40}", 10 ** 9, 3)
+        university.add_course(course)
+        courses.append(course)
+    students = []
+    for s in range(args.students):
+        student = Student(f"S{s}", f"Student {s}", f"s{s}@uni.edu", f"DEPT{s % 40}")
+        university.add_student(student)
+        students.append(student)
+    while log.last_seq < args.events:
+        student = rng.choice(students)
+        course = rng.choice(courses)
+        if len(student.enrolled_courses) >= args.per_student or course in student.enrolled_courses:
+            university.drop_student(student, rng.choice(student.enrolled_courses))
+        else:
+            university.enroll_student(student, course, allow_conflicts=True)
+    log.flush()
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(path) for _, path in log._segments())
+    print(f"appended {log.last_seq} events in {elapsed:.1f}s ({log.last_seq / elapsed:,.0f} events/s "
+          f"including the University updates), {size / 2 ** 20:.1f} MiB on disk "
+          f"({size / log.last_seq:.1f} bytes/event)")
+
+    started = time.perf_counter()
+    count = sum(1 for _ in log.read())
+    elapsed = time.perf_counter() - started
+    print(f"read {count} events in {elapsed:.1f}s ({count / elapsed:,.0f} events/s)")
+
+    University._instance = None
+    replayed = University()
+    started = time.perf_counter()
+    with replayed.replaying():
+        for _, _, event, data in log.read():
+            apply_event(replayed, event, data)
+    elapsed = time.perf_counter() - started
+    print(f"full replay in {elapsed:.1f}s ({count / elapsed:,.0f} events/s)")
+    expected = university._dump_state()
+    log.close()
+
+    University._instance = None
+    recovered = University()
+    started = time.perf_counter()
+    tail = recovered.attach_event_log(EventLog(log_directory))
+    elapsed = time.perf_counter() - started
+    print(f"startup from snapshot + {tail} tail events in {elapsed:.2f}s")
+
+    # One student's history through the per-segment index, against the
+    # full scan it used to be
+    log = recovered.event_log
+    sample = rng.sample(students, 20)
+    started = time.perf_counter()
+    list(log.history(student_id=sample[0].id))
+    print(f"first history lookup (loads the segment indexes) in {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    lengths = [len(list(log.history(student_id=student.id))) for student in sample]
+    elapsed = (time.perf_counter() - started) / len(sample)
+    started = time.perf_counter()
+    scanned = [record for record in log.read() if record[3].get("student_id") == sample[0].id]
+    print(f"history of one student ({statistics.mean(lengths):.0f} events on average) in "
+          f"{elapsed * 1000:.1f} ms; full scan {time.perf_counter() - started:.1f}s")
+    if scanned != list(log.history(student_id=sample[0].id)):
+        print("indexed history does not match the full scan")
+    for name, state in (("replayed", replayed._dump_state()), ("recovered", recovered._dump_state())):
+        if state["students"] != expected["students"] or state["courses"] != expected["courses"]:
+            print(f"{name} state does not match the original")
+
+
+# Concurrent registrars on one small course. First, threads race for the
+# seats of a fresh course directly through Course.add_student; then
+# sessions share a pool of students and enroll, drop and waitlist through
+# the University with optimistic version checks. Both check that the
+# course is never overbooked and that every index agrees afterwards.
+def bench_concurrency(args):
+    # Switch threads as often as possible to provoke races
+    sys.setswitchinterval(1e-6)
+
+    overbooked = 0
+    barrier = threading.Barrier(args.sessions)
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        course = Course("C0", "Contested", "CS", args.capacity, 3)
+        students = [[Student(f"S{t}-{n}", "Student", "s@uni.edu", "CS") for n in range(args.capacity)]
+                    for t in range(args.sessions)]
+
+        def race(own):
+            barrier.wait()
+            for student in own:
+                course.add_student(student)
+
+        threads = [threading.Thread(target=race, args=(own,)) for own in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        overbooked += len(course.students) != args.capacity
+    elapsed = time.perf_counter() - started
+    attempts = args.rounds * args.sessions * args.capacity
+    print(f"Course.add_student: {attempts} seat attempts by {args.sessions} threads in {elapsed:.2f}s "
+          f"({attempts / elapsed:,.0f} ops/s), {overbooked} of {args.rounds} rounds with the wrong seat count")
+
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    University._instance = None
+    university = University()
+    course = Course("C1", "Contested", "CS", args.capacity, 3)
+    university.add_course(course)
+    pool = []
+    for s in range(args.students):
+        student = Student(f"S{s}", f"Student {s}", f"s{s}@uni.edu", "CS")
+        university.add_student(student)
+        pool.append(student)
+
+    counts = {"enrolled": 0, "dropped": 0, "waitlisted": 0, "stale": 0, "full": 0, "max_seats": 0}
+    counts_lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def session(seed):
+        rng = random.Random(seed)
+        local = dict.fromkeys(counts, 0)
+        while time.perf_counter() < deadline:
+            student = rng.choice(pool)
+            # The version the registrar saw when the page was rendered
+            version = student.version
+            time.sleep(0)
+            try:
+                if course in student.enrolled_courses:
+                    university.drop_student(student, course, expected_version=version)
+                    local["dropped"] += 1
+                elif course.has_capacity():
+                    if university.enroll_student(student, course, expected_version=version):
+                        local["enrolled"] += 1
+                    else:
+                        local["full"] += 1
+                else:
+                    university.request_enrollment(student, course)
+                    local["waitlisted"] += 1
+            except StaleVersionError:
+                local["stale"] += 1
+            local["max_seats"] = max(local["max_seats"], len(course.students))
+        with counts_lock:
+            for key, value in local.items():
+                counts[key] = max(counts[key], value) if key == "max_seats" else counts[key] + value
+
+    threads = [threading.Thread(target=session, args=(seed,)) for seed in range(args.sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    operations = sum(value for key, value in counts.items() if key != "max_seats")
+    print(f"University sessions: {operations} operations by {args.sessions} sessions in {elapsed:.1f}s "
+          f"({operations / elapsed:,.0f} ops/s)")
+    print(f"  {counts['enrolled']} enrolled directly, {counts['dropped']} dropped (seats refilled from the waitlist), {counts['waitlisted']} waitlist "
+          f"requests, {counts['full']} refused as full, {counts['stale']} refused as stale")
+
+    enrolled = course.students
+    problems = []
+    if counts["max_seats"] > args.capacity or len(enrolled) > args.capacity:
+        problems.append(f"course overbooked ({counts['max_seats']} seats taken at peak)")
+    if len(set(enrolled)) != len(enrolled):
+        problems.append("duplicate enrollments")
+    if any(course not in student.enrolled_courses for student in enrolled):
+        problems.append("course lists a student who is not enrolled")
+    if sum(course in student.enrolled_courses for student in pool) != len(enrolled):
+        problems.append("student enrolled without a seat")
+    if university.reports.course_enrollment()["Enrolled"] != [len(enrolled)]:
+        problems.append("report counts out of step")
+    if any(student.id in university.waitlists.get(course.id) for student in enrolled):
+        problems.append("enrolled student still waitlisted")
+    print(f"  final seats {len(enrolled)}/{args.capacity}, peak {counts['max_seats']}: "
+          + ("; ".join(problems) if problems else "consistent"))
+
+    # Registrars editing the same course: each reassigns its instructor
+    # from the course version it rendered. Two edits applied from the same
+    # version would mean one silently overwrote the other.
+    instructors = []
+    for i in range(args.sessions):
+        instructor = Instructor(f"I{i}", f"Instructor {i}", f"i{i}@uni.edu", "CS", "Lecturer")
+        university.add_instructor(instructor)
+        instructors.append(instructor)
+    applied, stale = [], [0]
+    deadline = time.perf_counter() + args.duration
+
+    def editor(instructor):
+        while time.perf_counter() < deadline:
+            version = course.version
+            time.sleep(0)
+            try:
+                university.assign_instructor(course, instructor, expected_version=version)
+                applied.append((version, instructor))
+            except StaleVersionError:
+                with counts_lock:
+                    stale[0] += 1
+
+    threads = [threading.Thread(target=editor, args=(instructor,)) for instructor in instructors]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lost = len(applied) - len({version for version, _ in applied})
+    last = max(applied, key=lambda edit: edit[0])[1]
+    print(f"Course edits: {len(applied)} applied, {stale[0]} refused as stale, {lost} lost updates; final "
+          f"instructor {'matches' if course.instructor is last else 'does not match'} the last edit applied")
+
+
+# The entity classes as they were before __slots__: the same class bodies
+# with the __slots__ declarations removed, so each instance has a __dict__,
+# and without string interning
+def unslotted_entities():
+    source = "\n".join(inspect.getsource(cls) for cls in (Person, Instructor, Student, Course, Session))
+    source = re.sub(r"\n    __slots__ = \([^)]*\)\n", "\n", source)
+    namespace = {"ABC": ABC, "abstractmethod": abstractmethod, "threading": threading,
+                 "_get_state": models._get_state, "_set_state": models._set_state,
+                 "_shared": lambda value: value}
+    exec(source, namespace)
+    return namespace
+
+
+def build_entities(classes, n_students, n_courses, per_student, seed=5):
+    rng = random.Random(seed)
+    instructors = [classes["Instructor"](f"I{i}", f"Instructor {i}", f"i{i}@uni.edu", f"DEPT{i % 40}", "Lecturer")
+                   for i in range(max(n_courses // 2, 1))]
+    courses = []
+    for c in range(n_courses):
+        course = classes["Course"](f"C{c}", f"Course {c}", f"DEPT{c % 40}", 10 ** 6, 3)
+        course.set_instructor(instructors[c % len(instructors)])
+        course.add_session(classes["Session"]("Monday", "9:00", "10:30", f"R{c % 300}"))
+        course.add_session(classes["Session"]("Wednesday", "9:00", "10:30", f"R{c % 300}"))
+        courses.append(course)
+    students = []
+    for s in range(n_students):
+        student = classes["Student"](f"S{s}", f"Student {s}", f"s{s}@uni.edu", f"DEPT{s % 40}")
+        for course in rng.sample(courses, per_student):
+            student.enroll_course(course)
+            student.assign_grade(course, "ABCDF"[s % 5])
+        students.append(student)
+    return instructors, courses, students
+
+
+# Typical read paths: listing students with their GPA and courses, and
+# walking course rosters
+def read_entities(courses, students):
+    total = 0
+    for student in students:
+        total += len(student.id) + len(student.name) + len(student.email) + len(student.major)
+        total += student.get_gpa()
+        for course in student.enrolled_courses:
+            total += course.credits
+    for course in courses:
+        total += course.max_capacity - len(course.students)
+        for session in course.schedule:
+            total += len(session.day) + len(session.location)
+        total += len(course.instructor.name)
+    return total
+
+
+def bench_entities(args):
+    variants = [("__dict__", unslotted_entities()),
+                ("__slots__", {"Instructor": Instructor, "Student": Student, "Course": Course, "Session": Session})]
+    print(f"{args.students} students, {args.courses} courses, {args.per_student} enrollments each")
+    for label, classes in variants:
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        instructors, courses, students = build_entities(classes, args.students, args.courses, args.per_student)
+        built = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            read_entities(courses, students)
+        read = (time.perf_counter() - started) / args.repeat
+
+        student = students[0]
+        instance = sys.getsizeof(student) + (sys.getsizeof(student.__dict__) if hasattr(student, "__dict__") else 0)
+        print(f"{label:>9}: {memory / 2 ** 20:7.1f} MiB, {instance} bytes per Student object, "
+              f"built in {built:.2f}s, full read pass {read * 1000:.0f} ms")
+        del instructors, courses, students, student
+
+
+# Recommendation latency on a large catalog, the cost of a full rebuild,
+# and a check that incremental updates match a rebuild after churn
+def bench_recommend(args):
+    started = time.perf_counter()
+    university = build_university(args.courses, args.students)
+    print(f"built {args.students} students x {args.courses} courses in {time.perf_counter() - started:.1f}s")
+
+    recommender = CourseRecommender()
+    started = time.perf_counter()
+    recommender.rebuild(university)
+    print(f"full rebuild in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(6)
+    students = university.get_all_students()
+    latencies = []
+    for student in rng.sample(students, args.queries):
+        started = time.perf_counter()
+        university.recommend_courses(student)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"recommend_courses over {args.queries} students: "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+    courses = university.get_all_courses()
+    started = time.perf_counter()
+    for _ in range(args.churn):
+        student = rng.choice(students)
+        course = rng.choice(courses)
+        if course not in student.enrolled_courses:
+            university.enroll_student(student, course, allow_conflicts=True)
+        elif rng.random() < 0.5:
+            university.assign_grade(student, course, rng.choice("ABCDF"))
+        else:
+            university.drop_student(student, course)
+    elapsed = time.perf_counter() - started
+    print(f"{args.churn} enroll/grade/drop changes in {elapsed:.2f}s ({args.churn / elapsed:,.0f} changes/s "
+          f"with incremental model updates)")
+
+    recommender.rebuild(university)
+    n = len(recommender._course_ids)
+    incremental = university._recommender._cooccurrence[:n, :n]
+    difference = np.abs(incremental - recommender._cooccurrence[:n, :n]).max()
+    # Float rounding differs with the order of the updates, nothing more
+    print(f"incremental model vs rebuild: max difference {difference:.2e} "
+          f"({'within' if difference <= 1e-9 else 'OUTSIDE'} tolerance 1e-9)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="University system benchmarks")
+    commands = parser.add_subparsers(dest="benchmark", required=True)
+
+    timetable = commands.add_parser("timetable", help="timetable generator quality against time")
+    timetable.add_argument("--courses", type=int, default=2000)
+    timetable.add_argument("--rooms", type=int, default=300)
+    timetable.add_argument("--students", type=int, default=20000)
+    timetable.add_argument("--budget", type=float, default=60.0)
+    timetable.add_argument("--workers", type=int, default=None)
+    timetable.set_defaults(run=bench_timetable)
+
+    registration = commands.add_parser("registration", help="waitlist allocator throughput")
+    registration.add_argument("--courses", type=int, default=2000)
+    registration.add_argument("--students", type=int, default=50000)
+    registration.add_argument("--capacity", type=int, default=60)
+    registration.add_argument("--choices", type=int, default=6)
+    registration.add_argument("--drops", type=int, default=20000)
+    registration.set_defaults(run=bench_registration)
+
+    bulk = commands.add_parser("import", help="bulk roster import time")
+    bulk.add_argument("--students", type=int, default=50000)
+    bulk.add_argument("--courses", type=int, default=2000)
+    bulk.add_argument("--per-student", type=int, default=5)
+    bulk.set_defaults(run=bench_import)
+
+    events = commands.add_parser("events", help="event log append, replay and recovery throughput")
+    events.add_argument("--events", type=int, default=10_000_000)
+    events.add_argument("--students", type=int, default=20000)
+    events.add_argument("--courses", type=int, default=500)
+    events.add_argument("--batch-size", type=int, default=1000)
+    events.add_argument("--snapshot-every", type=int, default=1_000_000)
+    events.add_argument("--per-student", type=int, default=8, help="most courses a student holds at once")
+    events.set_defaults(run=bench_events)
+
+    concurrency = commands.add_parser("concurrency", help="concurrent enrollment into one course")
+    concurrency.add_argument("--sessions", type=int, default=32)
+    concurrency.add_argument("--capacity", type=int, default=30)
+    concurrency.add_argument("--students", type=int, default=200)
+    concurrency.add_argument("--rounds", type=int, default=200)
+    concurrency.add_argument("--duration", type=float, default=10.0)
+    concurrency.set_defaults(run=bench_concurrency)
+
+    entities = commands.add_parser("entities", help="entity memory footprint and attribute access")
+    entities.add_argument("--students", type=int, default=200000)
+    entities.add_argument("--courses", type=int, default=5000)
+    entities.add_argument("--per-student", type=int, default=5)
+    entities.add_argument("--repeat", type=int, default=5)
+    entities.set_defaults(run=bench_entities)
+
+    recommend = commands.add_parser("recommend", help="course recommendation latency and refresh")
+    recommend.add_argument("--students", type=int, default=100000)
+    recommend.add_argument("--courses", type=int, default=2000)
+    recommend.add_argument("--queries", type=int, default=1000)
+    recommend.add_argument("--churn", type=int, default=20000)
+    recommend.set_defaults(run=bench_recommend)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
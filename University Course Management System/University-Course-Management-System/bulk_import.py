@@ -0,0 +1,238 @@
+import csv
+import io
+import json
+import sys
+from collections import namedtuple
+from itertools import islice
+
+RowError = namedtuple("RowError", ["source", "line", "message"])
+ImportReport = namedtuple("ImportReport", ["students", "instructors", "courses", "enrollments", "errors"])
+
+GRADES = {"A", "B", "C", "D", "F"}
+
+
+# Yield rows as dicts from a CSV or JSONL path or binary/text file object,
+# one line at a time so large rosters are never fully loaded
+def read_rows(source, fmt=None):
+    name = getattr(source, "name", source if isinstance(source, str) else "")
+    fmt = fmt or ("jsonl" if str(name).lower().endswith((".jsonl", ".json", ".ndjson")) else "csv")
+
+    if isinstance(source, str):
+        stream = open(source, "r", encoding="utf-8", newline="")
+    elif isinstance(source, io.TextIOBase):
+        stream = source
+    else:
+        stream = io.TextIOWrapper(source, encoding="utf-8", newline="")
+
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, {key.strip(): (value or "").strip()
+                                        for key, value in row.items() if key}
+        else:
+            for line_number, line in enumerate(stream, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, ValueError(f"expected an object, got {type(row).__name__}")
+                    continue
+                yield line_number, {key: str(value).strip() if value is not None else ""
+                                    for key, value in row.items()}
+    finally:
+        if isinstance(source, str):
+            stream.close()
+        elif isinstance(stream, io.TextIOWrapper) and stream is not source:
+            stream.detach()
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    return number if number > 0 else None
+
+
+# Stages students, instructors, courses and enrollments from roster files.
+# Rows are validated chunk by chunk against the existing university and
+# everything staged so far; nothing touches the University until commit(),
+# which adds all valid rows and saves once.
+class BulkImporter:
+    def __init__(self, university, chunk_size=5000):
+        self._university = university
+        self._chunk_size = chunk_size
+        self._students = {}
+        self._instructors = {}
+        self._courses = {}  # course_id: (row, instructor_id)
+        self._enrollments = []  # (student_id, course_id, grade)
+        self._enrollment_keys = set()
+        self.errors = []
+
+    def _error(self, source, line, message):
+        self.errors.append(RowError(source, line, message))
+
+    def _skip(self, source, id, skipped):
+        self._error(source, None, f"ID {id} was added by another session meanwhile; skipped")
+        skipped.add((source, id))
+
+    def _check_required(self, source, line, row, fields):
+        if isinstance(row, Exception):
+            self._error(source, line, f"Invalid JSON: {row}")
+            return False
+        missing = [field for field in fields if not row.get(field)]
+        if missing:
+            self._error(source, line, f"Missing {', '.join(missing)}")
+            return False
+        return True
+
+    def _student_exists(self, student_id):
+        return student_id in self._students or self._university.get_student(student_id) is not None
+
+    def _instructor_exists(self, instructor_id):
+        return instructor_id in self._instructors or self._university.get_instructor(instructor_id) is not None
+
+    def _course_exists(self, course_id):
+        return course_id in self._courses or self._university.get_course(course_id) is not None
+
+    def stage_students(self, source, fmt=None):
+        for chunk in _chunks(read_rows(source, fmt), self._chunk_size):
+            for line, row in chunk:
+                if not self._check_required("students", line, row, ("id", "name", "email", "major")):
+                    continue
+                if "@" not in row["email"]:
+                    self._error("students", line, f"Invalid email {row['email']}")
+                elif self._student_exists(row["id"]):
+                    self._error("students", line, f"Duplicate student ID {row['id']}")
+                else:
+                    self._students[row["id"]] = row
+
+    def stage_instructors(self, source, fmt=None):
+        for chunk in _chunks(read_rows(source, fmt), self._chunk_size):
+            for line, row in chunk:
+                if not self._check_required("instructors", line, row,
+                                            ("id", "name", "email", "department", "rank")):
+                    continue
+                if "@" not in row["email"]:
+                    self._error("instructors", line, f"Invalid email {row['email']}")
+                elif self._instructor_exists(row["id"]):
+                    self._error("instructors", line, f"Duplicate instructor ID {row['id']}")
+                else:
+                    self._instructors[row["id"]] = row
+
+    def stage_courses(self, source, fmt=None):
+        for chunk in _chunks(read_rows(source, fmt), self._chunk_size):
+            for line, row in chunk:
+                if not self._check_required("courses", line, row,
+                                            ("id", "title", "department", "max_capacity", "credits")):
+                    continue
+                instructor_id = row.get("instructor_id") or None
+                if self._course_exists(row["id"]):
+                    self._error("courses", line, f"Duplicate course ID {row['id']}")
+                elif _positive_int(row["max_capacity"]) is None or _positive_int(row["credits"]) is None:
+                    self._error("courses", line, "max_capacity and credits must be positive integers")
+                elif instructor_id and not self._instructor_exists(instructor_id):
+                    self._error("courses", line, f"Unknown instructor ID {instructor_id}")
+                else:
+                    self._courses[row["id"]] = (row, instructor_id)
+
+    def stage_enrollments(self, source, fmt=None):
+        for chunk in _chunks(read_rows(source, fmt), self._chunk_size):
+            for line, row in chunk:
+                if not self._check_required("enrollments", line, row, ("student_id", "course_id")):
+                    continue
+                key = (row["student_id"], row["course_id"])
+                grade = row.get("grade") or None
+                if not self._student_exists(key[0]):
+                    self._error("enrollments", line, f"Unknown student ID {key[0]}")
+                elif not self._course_exists(key[1]):
+                    self._error("enrollments", line, f"Unknown course ID {key[1]}")
+                elif grade and grade not in GRADES:
+                    self._error("enrollments", line, f"Invalid grade {grade}")
+                elif key in self._enrollment_keys:
+                    self._error("enrollments", line, f"Duplicate enrollment {key[0]} in {key[1]}")
+                else:
+                    self._enrollment_keys.add(key)
+                    self._enrollments.append((key[0], key[1], grade))
+
+    def commit(self, save=True):
+        # Entity classes come from the module that defined the University
+        university = self._university
+        models = sys.modules[type(university).__module__]
+        Course, Instructor, Student = models.Course, models.Instructor, models.Student
+
+        # Other sessions may have added the same ids since the rows were
+        # staged. Checked again under the University's lock: those rows are
+        # skipped, with the rows that depend on them, rather than replacing
+        # the live records.
+        added = {"instructors": 0, "students": 0, "courses": 0}
+        skipped = set()  # (source, id)
+        enrolled = 0
+        with university._lock:
+            for instructor_id, row in self._instructors.items():
+                if university.get_instructor(instructor_id) is not None:
+                    self._skip("instructors", instructor_id, skipped)
+                    continue
+                university.add_instructor(Instructor(row["id"], row["name"], row["email"],
+                                                     row["department"], row["rank"]))
+                added["instructors"] += 1
+            for student_id, row in self._students.items():
+                if university.get_student(student_id) is not None:
+                    self._skip("students", student_id, skipped)
+                    continue
+                university.add_student(Student(row["id"], row["name"], row["email"], row["major"]))
+                added["students"] += 1
+            for course_id, (row, instructor_id) in self._courses.items():
+                if university.get_course(course_id) is not None:
+                    self._skip("courses", course_id, skipped)
+                    continue
+                instructor = university.get_instructor(instructor_id) if instructor_id else None
+                if instructor_id and (instructor is None or ("instructors", instructor_id) in skipped):
+                    self._error("courses", None, f"Instructor {instructor_id} of course {course_id} was "
+                                                 f"removed or skipped; course skipped")
+                    skipped.add(("courses", course_id))
+                    continue
+                course = Course(row["id"], row["title"], row["department"],
+                                int(row["max_capacity"]), int(row["credits"]))
+                university.add_course(course)
+                added["courses"] += 1
+                if instructor:
+                    university.assign_instructor(course, instructor)
+
+            for student_id, course_id, grade in self._enrollments:
+                student = university.get_student(student_id)
+                course = university.get_course(course_id)
+                if (student is None or course is None or ("students", student_id) in skipped
+                        or ("courses", course_id) in skipped):
+                    self._error("enrollments", None, f"Could not enroll {student_id} in {course_id} "
+                                                     f"(student or course removed or skipped)")
+                elif university.enroll_student(student, course):
+                    enrolled += 1
+                    if grade:
+                        university.assign_grade(student, course, grade)
+                else:
+                    self._error("enrollments", None, f"Could not enroll {student_id} in {course_id} "
+                                                     f"(course full or schedule conflict)")
+
+        if save:
+            university.save_data()
+
+        report = ImportReport(added["students"], added["instructors"], added["courses"],
+                              enrolled, list(self.errors))
+        self.__init__(university, self._chunk_size)
+        return report
@@ -0,0 +1,354 @@
+import os
+import pickle
+from array import array
+import struct
+import sys
+import threading
+import time
+import zlib
+from itertools import chain
+
+# Frame header: payload length, payload crc32, first sequence number, event count
+FRAME_HEADER = struct.Struct("<IIQI")
+
+
+def _segment_name(first_seq):
+    return f"events-{first_seq:012d}.log"
+
+
+def _snapshot_name(seq):
+    return f"snapshot-{seq:012d}.pkl"
+
+
+def _index_name(first_seq):
+    return f"events-{first_seq:012d}.idx"
+
+
+# History keys of the records in one frame: every student and course a
+# record mentions
+def _history_keys(records):
+    return {(name, data[name]) for _, _, _, data in records for name in ("student_id", "course_id")
+            if name in data}
+
+
+def _fsync_directory(directory):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+# Walk the valid frames of a segment file, yielding (offset, first_seq,
+# count, payload). Frames that end at or before after_seq are skipped
+# without being read. A torn frame at the end, left by a crash mid-write,
+# ends the walk.
+def _frames(path, after_seq=0):
+    with open(path, "rb") as file:
+        offset = 0
+        while True:
+            header = file.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            length, checksum, first_seq, count = FRAME_HEADER.unpack(header)
+            if first_seq + count - 1 <= after_seq:
+                file.seek(length, os.SEEK_CUR)
+            else:
+                payload = file.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    return
+                yield offset, first_seq, count, payload
+            offset += FRAME_HEADER.size + length
+
+
+# Append-only, segmented log of University events. Events are buffered and
+# written as one zlib-compressed, checksummed frame per batch, followed by
+# an fsync. Snapshots of the full state are written every snapshot_every
+# events; recovery loads the newest snapshot and replays only the events
+# logged after it. Segments are kept, so the log doubles as the full
+# enrollment history. Each closed segment gets an index beside it mapping
+# every student and course to the offsets of the frames that mention
+# them, so one student's history reads only those frames.
+class EventLog:
+    def __init__(self, directory="university_log", batch_size=1000, flush_interval=1.0,
+                 snapshot_every=100000, keep_snapshots=2, compress_level=6):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = keep_snapshots
+        self.compress_level = compress_level
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._university = None
+        self._replaying = False
+        os.makedirs(directory, exist_ok=True)
+        self.last_seq = self._recover_tail()
+        self._segment = None
+        self._segment_seq = None
+        self._history_index = {}  # segment first_seq: {(field, id): frame offsets}
+        self._snapshot_seq = self._snapshots()[-1] if self._snapshots() else 0
+
+    # Files
+    def _segments(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith("events-") and name.endswith(".log"))
+        return [(int(name[7:-4]), os.path.join(self.directory, name)) for name in names]
+
+    def _snapshots(self):
+        return sorted(int(name[9:-4]) for name in os.listdir(self.directory)
+                      if name.startswith("snapshot-") and name.endswith(".pkl"))
+
+    # Find the last sequence number and cut off a torn frame, if any. Only
+    # the newest segment can have one, and segments are rotated at every
+    # snapshot, so this reads a bounded amount of data.
+    def _recover_tail(self):
+        segments = self._segments()
+        if not segments:
+            return 0
+        first_seq, path = segments[-1]
+        last_seq, valid_end = first_seq - 1, 0
+        for offset, frame_seq, count, payload in _frames(path):
+            last_seq = frame_seq + count - 1
+            valid_end = offset + FRAME_HEADER.size + len(payload)
+        if os.path.getsize(path) != valid_end:
+            with open(path, "r+b") as file:
+                file.truncate(valid_end)
+        return last_seq
+
+    def _open_segment(self):
+        if self._segment is None:
+            segments = self._segments()
+            if segments and segments[-1][0] > self._snapshot_seq:
+                self._segment_seq, path = segments[-1]
+            else:
+                self._segment_seq = self.last_seq + 1
+                path = os.path.join(self.directory, _segment_name(self._segment_seq))
+            self._segment = open(path, "ab")
+        return self._segment
+
+    # Writing
+    def append(self, event, data):
+        if self._replaying:
+            return None
+        with self._lock:
+            self.last_seq += 1
+            self._buffer.append((self.last_seq, time.time(), event, data))
+            if (len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+                if self._university and self.last_seq - self._snapshot_seq >= self.snapshot_every:
+                    self.snapshot()
+            return self.last_seq
+
+    # University listener interface
+    __call__ = append
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer:
+                return
+            payload = zlib.compress(pickle.dumps(self._buffer, pickle.HIGHEST_PROTOCOL), self.compress_level)
+            segment = self._open_segment()
+            offset = segment.tell()
+            segment.write(FRAME_HEADER.pack(len(payload), zlib.crc32(payload), self._buffer[0][0],
+                                            len(self._buffer)))
+            segment.write(payload)
+            segment.flush()
+            os.fsync(segment.fileno())
+            # Kept current once this segment's index has been built
+            index = self._history_index.get(self._segment_seq)
+            if index is not None:
+                for key in _history_keys(self._buffer):
+                    index.setdefault(key, array("Q")).append(offset)
+            self._buffer = []
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._segment:
+                self._segment.close()
+                self._segment = None
+
+    # Write the full state atomically, then start a new segment so recovery
+    # only has to open segments created after it. The University's lock is
+    # taken first, as when events are appended, so no change lands between
+    # the state and its sequence number.
+    def snapshot(self, university=None):
+        university = university or self._university
+        with university._lock, self._lock:
+            self.flush()
+            seq = self.last_seq
+            path = os.path.join(self.directory, _snapshot_name(seq))
+            with open(path + ".tmp", "wb") as file:
+                pickle.dump({"seq": seq, "state": university._dump_state()}, file, pickle.HIGHEST_PROTOCOL)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(path + ".tmp", path)
+            _fsync_directory(self.directory)
+            self._snapshot_seq = seq
+            for old in self._snapshots()[:-self.keep_snapshots]:
+                os.remove(os.path.join(self.directory, _snapshot_name(old)))
+            if self._segment:
+                self._segment.close()
+                self._segment = None
+                # The segment is closed for good; its index is written once
+                index = self._history_index.get(self._segment_seq)
+                if index is None:
+                    self._segment_history_index(self._segment_seq)
+                else:
+                    self._write_history_index(self._segment_seq, index)
+            return seq
+
+    # Reading
+    def read(self, after_seq=0):
+        with self._lock:
+            self.flush()
+        segments = self._segments()
+        for index, (first_seq, path) in enumerate(segments):
+            # Skip whole segments that end before the requested position
+            if index + 1 < len(segments) and segments[index + 1][0] <= after_seq + 1:
+                continue
+            for _, _, _, payload in _frames(path, after_seq):
+                for record in pickle.loads(zlib.decompress(payload)):
+                    if record[0] > after_seq:
+                        yield record
+
+    # History index of one segment: from memory, from its index file, or
+    # built by reading the segment once. Segments started after the last
+    # snapshot are still being appended to; theirs is kept in memory only.
+    def _segment_history_index(self, first_seq):
+        index = self._history_index.get(first_seq)
+        if index is not None:
+            return index
+        path = os.path.join(self.directory, _index_name(first_seq))
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                index = pickle.load(file)
+        else:
+            index = {}
+            for offset, _, _, payload in _frames(os.path.join(self.directory, _segment_name(first_seq))):
+                for key in _history_keys(pickle.loads(zlib.decompress(payload))):
+                    index.setdefault(key, array("Q")).append(offset)
+            if first_seq <= self._snapshot_seq:
+                self._write_history_index(first_seq, index)
+        self._history_index[first_seq] = index
+        return index
+
+    def _write_history_index(self, first_seq, index):
+        path = os.path.join(self.directory, _index_name(first_seq))
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(index, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    # Every logged action touching a student or course, oldest first,
+    # including drops and the grade held at the time. Only the frames the
+    # history index lists for them are read.
+    def history(self, student_id=None, course_id=None):
+        if student_id is None and course_id is None:
+            yield from self.read()
+            return
+        key = ("student_id", student_id) if student_id is not None else ("course_id", course_id)
+        with self._lock:
+            self.flush()
+            segments = self._segments()
+            offsets = [(first_seq, path, self._segment_history_index(first_seq).get(key, ()))
+                       for first_seq, path in segments]
+        for first_seq, path, frame_offsets in offsets:
+            if not len(frame_offsets):
+                continue
+            with open(path, "rb") as file:
+                for offset in frame_offsets:
+                    file.seek(offset)
+                    length, checksum, _, _ = FRAME_HEADER.unpack(file.read(FRAME_HEADER.size))
+                    payload = file.read(length)
+                    if zlib.crc32(payload) != checksum:
+                        break
+                    for record in pickle.loads(zlib.decompress(payload)):
+                        data = record[3]
+                        if student_id is not None and data.get("student_id") != student_id:
+                            continue
+                        if course_id is not None and data.get("course_id") != course_id:
+                            continue
+                        yield record
+
+    # Load the newest snapshot (or, for a fresh log, the legacy pickle file),
+    # replay the tail, then log every further change
+    def attach(self, university, legacy_filename="university_data.pkl"):
+        snapshots = self._snapshots()
+        replayed = 0
+        self._replaying = True
+        try:
+            if snapshots:
+                with open(os.path.join(self.directory, _snapshot_name(snapshots[-1])), "rb") as file:
+                    snapshot = pickle.load(file)
+                university._load_state(snapshot["state"])
+                after_seq = snapshot["seq"]
+            elif self.last_seq == 0:
+                university.load_data(legacy_filename)
+                after_seq = 0
+            else:
+                after_seq = 0
+            records = self.read(after_seq)
+            first = next(records, None)
+            if first is not None:
+                with university.replaying():
+                    for _, _, event, data in chain([first], records):
+                        apply_event(university, event, data)
+                        replayed += 1
+        finally:
+            self._replaying = False
+        self._university = university
+        university.subscribe(self)
+        if not snapshots:
+            self.snapshot()
+        return replayed
+
+
+# Re-apply one logged event through the University API. Waitlist promotion
+# is not repeated on drops, since the promoted enrollments are logged
+# events of their own.
+def apply_event(university, event, data):
+    models = sys.modules[type(university).__module__]
+    student = university.get_student(data["student_id"]) if "student_id" in data else None
+    course = university.get_course(data["course_id"]) if "course_id" in data else None
+
+    if event == "student_added":
+        university.add_student(models.Student(data["student_id"], data["name"], data["email"], data["major"]))
+    elif event == "instructor_added":
+        university.add_instructor(models.Instructor(data["instructor_id"], data["name"], data["email"],
+                                                    data["department"], data["rank"]))
+    elif event == "course_added":
+        university.add_course(models.Course(data["course_id"], data["title"], data["department"],
+                                            data["capacity"], data["credits"]))
+    elif event == "student_removed":
+        university.remove_student(data["student_id"])
+    elif event == "instructor_removed":
+        university.remove_instructor(data["instructor_id"])
+    elif event == "course_removed":
+        university.remove_course(data["course_id"])
+    elif event == "session_scheduled":
+        university.schedule_session(course, models.Session(data["day"], data["start_time"], data["end_time"],
+                                                           data["location"]), allow_conflicts=True)
+    elif event == "session_unscheduled":
+        for session in course.schedule:
+            if (session.day, session.start_time, session.end_time, session.location) == (
+                    data["day"], data["start_time"], data["end_time"], data["location"]):
+                university.unschedule_session(course, session)
+                break
+    elif event == "instructor_assigned":
+        instructor = university.get_instructor(data["instructor_id"]) if data["instructor_id"] else None
+        university.assign_instructor(course, instructor, allow_conflicts=True)
+    elif event == "enrolled":
+        university.enroll_student(student, course, allow_conflicts=True)
+    elif event == "dropped":
+        university.drop_student(student, course, promote=False)
+    elif event == "graded":
+        university.assign_grade(student, course, data["grade"])
+    elif event == "waitlisted":
+        university.join_waitlist(student, course, data["seniority"], data["timestamp"])
+    elif event == "waitlist_left":
+        university.leave_waitlist(student, course)
@@ -1,311 +1,58 @@
 import streamlit as st
-import pickle
-import os
 from datetime import datetime
-from abc import ABC, abstractmethod
 
-# Abstract base class for Person
-class Person(ABC):
-    def __init__(self, id, name, email):
-        self._id = id
-        self._name = name
-        self._email = email
-        
-    @property
-    def id(self):
-        return self._id
-        
-    @property
-    def name(self):
-        return self._name
-        
-    @property
-    def email(self):
-        return self._email
-    
-    @abstractmethod
-    def get_role(self):
-        pass
-    
-    def __str__(self):
-        return f"{self._name} ({self.get_role()})"
+from bulk_import import BulkImporter
+from event_log import EventLog
+# Files saved by earlier versions pickled the entities as __main__ classes
+from models import Course, Instructor, Session, StaleVersionError, Student, University
+from reports import to_csv, to_parquet
+from scheduling import DAYS, describe_conflict
+from timetabling import TimetableProblem, generate_timetable
+from waitlist import WAITLISTED
 
-# Instructor class inherits from Person
-class Instructor(Person):
-    def __init__(self, id, name, email, department, rank):
-        super().__init__(id, name, email)
-        self._department = department
-        self._rank = rank
-        self._courses = []
-        
-    @property
-    def department(self):
-        return self._department
-        
-    @property
-    def rank(self):
-        return self._rank
-        
-    @property
-    def courses(self):
-        return self._courses
-    
-    def add_course(self, course):
-        if course not in self._courses:
-            self._courses.append(course)
-            
-    def remove_course(self, course):
-        if course in self._courses:
-            self._courses.remove(course)
-            
-    def get_role(self):
-        return "Instructor"
+# Listings render one page at a time so page time doesn't grow with the catalog
+PAGE_SIZE = 20
 
-# Student class inherits from Person
-class Student(Person):
-    def __init__(self, id, name, email, major):
-        super().__init__(id, name, email)
-        self._major = major
-        self._enrolled_courses = []
-        self._grades = {}  # course_id: grade
-        
-    @property
-    def major(self):
-        return self._major
-        
-    @property
-    def enrolled_courses(self):
-        return self._enrolled_courses
-        
-    @property
-    def grades(self):
-        return self._grades
-    
-    def enroll_course(self, course):
-        if course not in self._enrolled_courses and course.has_capacity():
-            self._enrolled_courses.append(course)
-            course.add_student(self)
-            return True
-        return False
-            
-    def drop_course(self, course):
-        if course in self._enrolled_courses:
-            self._enrolled_courses.remove(course)
-            course.remove_student(self)
-            if course.id in self._grades:
-                del self._grades[course.id]
-            return True
-        return False
-    
-    def assign_grade(self, course, grade):
-        if course in self._enrolled_courses:
-            self._grades[course.id] = grade
-            return True
-        return False
-    
-    def get_gpa(self):
-        if not self._grades:
-            return 0.0
-        
-        grade_points = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
-        total_points = sum(grade_points.get(g, 0) for g in self._grades.values())
-        return total_points / len(self._grades)
-    
-    def get_role(self):
-        return "Student"
+def page_selector(results, key):
+    # The chosen page is read back from session state on the next rerun;
+    # clamp it first in case a new search returned fewer pages
+    st.session_state[key] = results.page
+    if results.pages > 1:
+        st.number_input(f"Page (of {results.pages})", min_value=1, max_value=results.pages, key=key)
+    st.caption(f"{results.total} result(s)")
 
-# Course class
-class Course:
-    def __init__(self, id, title, department, max_capacity, credits):
-        self._id = id
-        self._title = title
-        self._department = department
-        self._max_capacity = max_capacity
-        self._credits = credits
-        self._instructor = None
-        self._students = []
-        self._schedule = []  # List of session objects
-        
-    @property
-    def id(self):
-        return self._id
-        
-    @property
-    def title(self):
-        return self._title
-        
-    @property
-    def department(self):
-        return self._department
-        
-    @property
-    def max_capacity(self):
-        return self._max_capacity
-        
-    @property
-    def credits(self):
-        return self._credits
-        
-    @property
-    def instructor(self):
-        return self._instructor
-        
-    @property
-    def students(self):
-        return self._students
-        
-    @property
-    def schedule(self):
-        return self._schedule
-    
-    def set_instructor(self, instructor):
-        if self._instructor:
-            self._instructor.remove_course(self)
-        
-        self._instructor = instructor
-        if instructor:
-            instructor.add_course(self)
-            
-    def add_student(self, student):
-        if len(self._students) < self._max_capacity and student not in self._students:
-            self._students.append(student)
-            return True
-        return False
-            
-    def remove_student(self, student):
-        if student in self._students:
-            self._students.remove(student)
-            return True
-        return False
-    
-    def has_capacity(self):
-        return len(self._students) < self._max_capacity
-    
-    def add_session(self, session):
-        self._schedule.append(session)
-        
-    def remove_session(self, session):
-        if session in self._schedule:
-            self._schedule.remove(session)
-    
-    def __str__(self):
-        instructor_name = self._instructor.name if self._instructor else "No instructor assigned"
-        return f"{self._id} - {self._title} ({instructor_name})"
+# The entity version this session rendered on its previous run. A button
+# click reruns the script, so that is the version the user actually saw;
+# passing it back lets the University refuse changes made on stale data.
+def seen_version(entity, key):
+    seen = st.session_state.get(key, entity.version)
+    st.session_state[key] = entity.version
+    return seen
 
-# Session class to represent course schedule
-class Session:
-    def __init__(self, day, start_time, end_time, location):
-        self._day = day
-        self._start_time = start_time
-        self._end_time = end_time
-        self._location = location
-        
-    @property
-    def day(self):
-        return self._day
-        
-    @property
-    def start_time(self):
-        return self._start_time
-        
-    @property
-    def end_time(self):
-        return self._end_time
-        
-    @property
-    def location(self):
-        return self._location
-    
-    def __str__(self):
-        return f"{self._day}, {self._start_time}-{self._end_time} at {self._location}"
+STALE_MESSAGE = "This record was changed by another user. The page has been refreshed; please review and try again."
 
-# University class to manage everything
-class University:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(University, cls).__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-    
-    def __init__(self):
-        if self._initialized:
-            return
-            
-        self._students = {}  # id: Student object
-        self._instructors = {}  # id: Instructor object
-        self._courses = {}  # id: Course object
-        self._departments = set()
-        self._initialized = True
-        
-    def add_student(self, student):
-        self._students[student.id] = student
-        
-    def add_instructor(self, instructor):
-        self._instructors[instructor.id] = instructor
-        self._departments.add(instructor.department)
-        
-    def add_course(self, course):
-        self._courses[course.id] = course
-        self._departments.add(course.department)
-        
-    def get_student(self, student_id):
-        return self._students.get(student_id)
-        
-    def get_instructor(self, instructor_id):
-        return self._instructors.get(instructor_id)
-        
-    def get_course(self, course_id):
-        return self._courses.get(course_id)
-    
-    def get_all_students(self):
-        return list(self._students.values())
-        
-    def get_all_instructors(self):
-        return list(self._instructors.values())
-        
-    def get_all_courses(self):
-        return list(self._courses.values())
-    
-    def get_departments(self):
-        return sorted(list(self._departments))
-    
-    def save_data(self, filename="university_data.pkl"):
-        data = {
-            "students": self._students,
-            "instructors": self._instructors,
-            "courses": self._courses,
-            "departments": self._departments
-        }
-        
-        with open(filename, 'wb') as file:
-            pickle.dump(data, file)
-    
-    def load_data(self, filename="university_data.pkl"):
-        if os.path.exists(filename):
-            with open(filename, 'rb') as file:
-                data = pickle.load(file)
-                
-                self._students = data.get("students", {})
-                self._instructors = data.get("instructors", {})
-                self._courses = data.get("courses", {})
-                self._departments = data.get("departments", set())
+@st.cache_resource
+def shared_university():
+    university = University()
+    university.attach_event_log(EventLog())
+    return university
 
 # Let's create the Streamlit UI
 def main():
     st.set_page_config(page_title="University Course Management System", layout="wide")
     
-    # Initialize the university system
-    university = University()
+    # Initialize the university system. Every session shares the one
+    # University of the process; the resource cache attaches the event log
+    # once, so only the first run in a process restores state from it.
     try:
-        university.load_data()
+        university = shared_university()
     except Exception as e:
         st.error(f"Error loading data: {e}")
+        university = University()
     
     # Sidebar navigation
     st.sidebar.title("Navigation")
-    pages = ["Dashboard", "Courses", "Instructors", "Students", "Enrollments", "Reports"]
+    pages = ["Dashboard", "Courses", "Instructors", "Students", "Enrollments", "Bulk Import", "Reports"]
     selection = st.sidebar.radio("Go to", pages)
     
     # Dashboard page
@@ -331,16 +78,17 @@ def main():
     elif selection == "Courses":
         st.title("Course Management")
         
-        tab1, tab2 = st.tabs(["View Courses", "Add Course"])
+        tab1, tab2, tab3 = st.tabs(["View Courses", "Add Course", "Generate Timetable"])
         
         with tab1:
             st.subheader("All Courses")
-            courses = university.get_all_courses()
+            query = st.text_input("Search courses", placeholder="ID, title or department")
+            results = university.find_courses(query, st.session_state.get("course_page", 1), PAGE_SIZE)
             
-            if not courses:
-                st.info("No courses available. Add some courses first.")
+            if not results.total:
+                st.info("No courses found. Add some courses first." if not query else "No courses match your search.")
             else:
-                for course in courses:
+                for course in results.items:
                     with st.expander(f"{course.id} - {course.title}"):
                         st.write(f"**Department:** {course.department}")
                         st.write(f"**Credits:** {course.credits}")
@@ -360,6 +108,7 @@ def main():
                             st.write("No sessions scheduled")
                         
                         # Actions
+                        course_version = seen_version(course, f"course_version_{course.id}")
                         col1, col2 = st.columns(2)
                         with col1:
                             if st.button(f"Edit Course {course.id}"):
@@ -367,9 +116,15 @@ def main():
                         
                         with col2:
                             if st.button(f"Delete Course {course.id}"):
-                                del university._courses[course.id]
-                                university.save_data()
-                                st.experimental_rerun()
+                                try:
+                                    university.remove_course(course.id, expected_version=course_version)
+                                except StaleVersionError:
+                                    st.warning(STALE_MESSAGE)
+                                else:
+                                    university.save_data()
+                                    st.rerun()
+                
+                page_selector(results, "course_page")
         
         with tab2:
             st.subheader("Add New Course")
@@ -389,21 +144,39 @@ def main():
             st.subheader("Add Schedule (Optional)")
             add_schedule = st.checkbox("Add a class session")
             
-            sessions = []
+            # Pending sessions survive reruns until the course is created
+            if "pending_sessions" not in st.session_state:
+                st.session_state.pending_sessions = []
+            sessions = st.session_state.pending_sessions
+            
             if add_schedule:
                 col1, col2 = st.columns(2)
                 with col1:
-                    day = st.selectbox("Day", ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+                    day = st.selectbox("Day", DAYS)
                     location = st.text_input("Location (Room/Building)")
                 
                 with col2:
                     start_time = st.time_input("Start Time")
                     end_time = st.time_input("End Time")
                 
+                free_rooms = university.free_rooms(day, start_time, end_time)
+                if free_rooms:
+                    st.caption(f"Free rooms on {day} {start_time.strftime('%H:%M')}-{end_time.strftime('%H:%M')}: {', '.join(free_rooms)}")
+                
                 if st.button("Add Session"):
                     session = Session(day, start_time.strftime("%H:%M"), end_time.strftime("%H:%M"), location)
-                    sessions.append(session)
-                    st.success("Session added!")
+                    conflicts = university.room_conflicts(day, start_time, end_time, location) if location else []
+                    if end_time <= start_time:
+                        st.error("End time must be after start time.")
+                    elif conflicts:
+                        for conflict in conflicts:
+                            st.error(describe_conflict(conflict))
+                    else:
+                        sessions.append(session)
+                        st.success("Session added!")
+                
+                for session in sessions:
+                    st.write(f"- {session}")
             
             if st.button("Create Course"):
                 if not course_id or not course_title or not course_dept:
@@ -412,22 +185,85 @@ def main():
                     st.error(f"Course ID {course_id} already exists.")
                 else:
                     new_course = Course(course_id, course_title, course_dept, course_capacity, course_credits)
-                    
-                    # Add sessions
-                    for session in sessions:
-                        new_course.add_session(session)
+                    university.add_course(new_course)
                     
                     # Assign instructor if selected
                     if selected_instructor != "None":
                         instructor_id = selected_instructor.split(" - ")[0]
                         instructor = university.get_instructor(instructor_id)
                         if instructor:
-                            new_course.set_instructor(instructor)
+                            university.assign_instructor(new_course, instructor)
+                    
+                    # Add sessions, skipping any that clash with existing bookings
+                    for session in sessions:
+                        conflicts = university.session_conflicts(new_course, session)
+                        if conflicts:
+                            for conflict in conflicts:
+                                st.warning(f"Session {session} skipped: {describe_conflict(conflict)}")
+                        else:
+                            university.schedule_session(new_course, session)
+                    st.session_state.pending_sessions = []
                     
-                    university.add_course(new_course)
                     university.save_data()
                     st.success(f"Course {course_id} created successfully!")
-                    st.experimental_rerun()
+                    st.rerun()
+        
+        with tab3:
+            st.subheader("Generate Timetable")
+            st.write("Places every course's sessions into rooms and time slots, avoiding double-booked rooms and instructors and minimizing student clashes.")
+            
+            known_rooms = university.get_rooms()
+            rooms_text = st.text_area(
+                "Rooms (one per line, as Room:Capacity)",
+                "\n".join(f"{room}:30" for room in known_rooms)
+            )
+            meetings = st.number_input("Sessions per course", min_value=1, max_value=5, value=2)
+            time_budget = st.slider("Time budget (seconds)", 5, 300, 30)
+            
+            if st.button("Generate"):
+                rooms = {}
+                for line in rooms_text.splitlines():
+                    if ":" in line:
+                        room, capacity = line.rsplit(":", 1)
+                        if room.strip() and capacity.strip().isdigit():
+                            rooms[room.strip()] = int(capacity)
+                
+                if not rooms:
+                    st.error("Add at least one room with a capacity.")
+                elif not university.get_all_courses():
+                    st.info("No courses available. Add some courses first.")
+                else:
+                    problem = TimetableProblem.from_university(university, rooms, meetings_per_course=meetings)
+                    with st.spinner("Searching for a timetable..."):
+                        st.session_state.timetable = generate_timetable(problem, time_budget=time_budget)
+            
+            result = st.session_state.get("timetable")
+            if result:
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Student Clashes", result.clashes)
+                with col2:
+                    st.metric("Unplaced Sessions", len(result.unplaced))
+                
+                st.write("**Solution quality over time**")
+                st.line_chart({
+                    "Seconds": [elapsed for elapsed, _ in result.trace],
+                    "Cost": [cost for _, cost in result.trace]
+                }, x="Seconds", y="Cost")
+                
+                st.dataframe({
+                    "Course": [p.course_id for p in result.placements],
+                    "Day": [p.day for p in result.placements],
+                    "Time": [f"{p.start_time}-{p.end_time}" for p in result.placements],
+                    "Room": [p.location for p in result.placements]
+                })
+                
+                if st.button("Apply Timetable"):
+                    university.apply_timetable(result)
+                    university.save_data()
+                    del st.session_state.timetable
+                    st.success("Timetable applied to all courses.")
+                    st.rerun()
     
     # Instructors page
     elif selection == "Instructors":
@@ -437,12 +273,13 @@ def main():
         
         with tab1:
             st.subheader("All Instructors")
-            instructors = university.get_all_instructors()
+            query = st.text_input("Search instructors", placeholder="ID, name, email or department")
+            results = university.find_instructors(query, st.session_state.get("instructor_page", 1), PAGE_SIZE)
             
-            if not instructors:
-                st.info("No instructors available. Add some instructors first.")
+            if not results.total:
+                st.info("No instructors found. Add some instructors first." if not query else "No instructors match your search.")
             else:
-                for instructor in instructors:
+                for instructor in results.items:
                     with st.expander(f"{instructor.id} - {instructor.name}"):
                         st.write(f"**Email:** {instructor.email}")
                         st.write(f"**Department:** {instructor.department}")
@@ -463,13 +300,12 @@ def main():
                         
                         with col2:
                             if st.button(f"Delete Instructor {instructor.id}"):
-                                # Remove instructor from courses first
-                                for course in instructor.courses.copy():
-                                    course.set_instructor(None)
-                                
-                                del university._instructors[instructor.id]
+                                # Removes the instructor from their courses first
+                                university.remove_instructor(instructor.id)
                                 university.save_data()
-                                st.experimental_rerun()
+                                st.rerun()
+                
+                page_selector(results, "instructor_page")
         
         with tab2:
             st.subheader("Add New Instructor")
@@ -490,7 +326,7 @@ def main():
                     university.add_instructor(new_instructor)
                     university.save_data()
                     st.success(f"Instructor {instructor_name} created successfully!")
-                    st.experimental_rerun()
+                    st.rerun()
     
     # Students page
     elif selection == "Students":
@@ -500,12 +336,13 @@ def main():
         
         with tab1:
             st.subheader("All Students")
-            students = university.get_all_students()
+            query = st.text_input("Search students", placeholder="ID, name, email or major")
+            results = university.find_students(query, st.session_state.get("student_page", 1), PAGE_SIZE)
             
-            if not students:
-                st.info("No students available. Add some students first.")
+            if not results.total:
+                st.info("No students found. Add some students first." if not query else "No students match your search.")
             else:
-                for student in students:
+                for student in results.items:
                     with st.expander(f"{student.id} - {student.name}"):
                         st.write(f"**Email:** {student.email}")
                         st.write(f"**Major:** {student.major}")
@@ -519,6 +356,20 @@ def main():
                         else:
                             st.write("Not enrolled in any courses")
                         
+                        # Full enrollment history from the event log, including drops
+                        if university.event_log and st.checkbox("Show history", key=f"history_{student.id}"):
+                            history = list(university.event_log.history(student_id=student.id))
+                            if history:
+                                st.dataframe({
+                                    "Time": [datetime.fromtimestamp(item[1]).strftime("%Y-%m-%d %H:%M:%S")
+                                             for item in history],
+                                    "Event": [item[2].replace("_", " ").title() for item in history],
+                                    "Course": [item[3].get("course_id", "") for item in history],
+                                    "Grade": [item[3].get("grade") or "" for item in history]
+                                }, hide_index=True)
+                            else:
+                                st.write("No logged history")
+                        
                         # Actions
                         col1, col2 = st.columns(2)
                         with col1:
@@ -527,13 +378,12 @@ def main():
                         
                         with col2:
                             if st.button(f"Delete Student {student.id}"):
-                                # Drop all courses first
-                                for course in student.enrolled_courses.copy():
-                                    student.drop_course(course)
-                                
-                                del university._students[student.id]
+                                # Drops all courses first
+                                university.remove_student(student.id)
                                 university.save_data()
-                                st.experimental_rerun()
+                                st.rerun()
+                
+                page_selector(results, "student_page")
         
         with tab2:
             st.subheader("Add New Student")
@@ -553,18 +403,15 @@ def main():
                     university.add_student(new_student)
                     university.save_data()
                     st.success(f"Student {student_name} created successfully!")
-                    st.experimental_rerun()
+                    st.rerun()
     
     # Enrollments page
     elif selection == "Enrollments":
         st.title("Course Enrollments")
         
-        students = university.get_all_students()
-        courses = university.get_all_courses()
-        
-        if not students:
+        if not university._students:
             st.warning("No students in the system. Please add students first.")
-        elif not courses:
+        elif not university._courses:
             st.warning("No courses in the system. Please add courses first.")
         else:
             st.subheader("Enroll Students in Courses")
@@ -572,19 +419,25 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
+                # Only the top matches are offered, so the dropdown stays small
+                student_query = st.text_input("Find Student", placeholder="ID, name, email or major")
+                students = university.find_students(student_query, page_size=50).items
                 selected_student_str = st.selectbox(
                     "Select Student", 
                     [f"{student.id} - {student.name}" for student in students]
                 )
-                student_id = selected_student_str.split(" - ")[0]
-                student = university.get_student(student_id)
+                student = university.get_student(selected_student_str.split(" - ")[0]) if selected_student_str else None
             
             with col2:
+                course_query = st.text_input("Find Course", placeholder="ID, title or department")
                 # Filter out courses the student is already enrolled in
-                available_courses = [course for course in courses if course not in student.enrolled_courses]
+                available_courses = [course for course in university.find_courses(course_query, page_size=50).items
+                                     if student and course not in student.enrolled_courses]
                 
-                if not available_courses:
-                    st.info("Student is already enrolled in all available courses.")
+                if not student:
+                    st.info("No students match your search.")
+                elif not available_courses:
+                    st.info("No available courses match your search.")
                 else:
                     selected_course_str = st.selectbox(
                         "Select Course", 
@@ -593,22 +446,72 @@ def main():
                     course_id = selected_course_str.split(" - ")[0]
                     course = university.get_course(course_id)
                     
+                    waitlist = university.waitlists.get(course.id)
+                    if len(waitlist):
+                        st.caption(f"{len(waitlist)} student(s) on the waitlist for {course.id}")
+                    
+                    student_version = seen_version(student, f"enroll_version_{student.id}")
                     if st.button("Enroll Student"):
-                        if course.has_capacity():
-                            if student.enroll_course(course):
-                                university.save_data()
-                                st.success(f"Successfully enrolled {student.name} in {course.title}")
-                                st.experimental_rerun()
+                        conflicts = university.enrollment_conflicts(student, course)
+                        if conflicts:
+                            for conflict in conflicts:
+                                st.error(describe_conflict(conflict))
+                        elif course.has_capacity():
+                            try:
+                                enrolled = university.enroll_student(student, course, expected_version=student_version)
+                            except StaleVersionError:
+                                st.warning(STALE_MESSAGE)
                             else:
-                                st.error("Failed to enroll student. They may already be enrolled in this course.")
+                                if enrolled:
+                                    university.save_data()
+                                    st.success(f"Successfully enrolled {student.name} in {course.title}")
+                                    st.rerun()
+                                else:
+                                    # Another session may have taken the last seat in the meantime
+                                    st.error(f"Failed to enroll student. {course.title} may have just filled up.")
                         else:
                             st.error(f"Course {course.title} has reached maximum capacity.")
+                    
+                    if not course.has_capacity():
+                        if student.id in waitlist:
+                            st.info(f"{student.name} is #{waitlist.position(student.id)} on the waitlist for {course.id}.")
+                            if st.button("Leave Waitlist"):
+                                university.leave_waitlist(student, course)
+                                university.save_data()
+                                st.rerun()
+                        else:
+                            seniority = st.number_input("Seniority (years completed)", min_value=0, max_value=10, value=0)
+                            if st.button("Join Waitlist"):
+                                if university.request_enrollment(student, course, seniority) == WAITLISTED:
+                                    university.save_data()
+                                    st.success(f"{student.name} added to the waitlist for {course.title}. They will be enrolled automatically when a seat frees up.")
+                                else:
+                                    st.error("Could not join the waitlist. Check for schedule conflicts.")
+            
+            if student:
+                st.subheader("Recommended Courses")
+                recommendations = university.recommend_courses(student)
+                if recommendations:
+                    st.caption(f"Open courses often taken by students with enrollments similar to {student.name}'s")
+                    st.dataframe({
+                        "Course": [course.id for course, _ in recommendations],
+                        "Title": [course.title for course, _ in recommendations],
+                        "Department": [course.department for course, _ in recommendations],
+                        "Seats Left": [course.max_capacity - len(course.students) for course, _ in recommendations],
+                        "Match": [round(score, 2) for _, score in recommendations]
+                    }, hide_index=True)
+                else:
+                    st.info("No recommendations yet. They appear once students start enrolling.")
             
             st.subheader("Current Enrollments")
-            for student in students:
+            enrollment_query = st.text_input("Search Enrollments", placeholder="Student ID, name, email or major")
+            results = university.find_students(enrollment_query, st.session_state.get("enrollment_page", 1), PAGE_SIZE,
+                                               where=lambda student: student.enrolled_courses)
+            for student in results.items:
                 if student.enrolled_courses:
                     with st.expander(f"{student.name}'s Enrollments"):
-                        for course in student.enrolled_courses:
+                        student_version = seen_version(student, f"enrollments_version_{student.id}")
+                        for course in student.enrolled_courses.copy():
                             col1, col2, col3 = st.columns([3, 2, 1])
                             
                             with col1:
@@ -627,102 +530,117 @@ def main():
                                     )
                                     
                                     if new_grade != "Not graded" and st.button(f"Save grade for {course.id}", key=f"save_{student.id}_{course.id}"):
-                                        student.assign_grade(course, new_grade)
-                                        university.save_data()
-                                        st.success(f"Grade {new_grade} assigned to {student.name} for {course.title}")
-                                        st.experimental_rerun()
+                                        try:
+                                            university.assign_grade(student, course, new_grade,
+                                                                    expected_version=student_version)
+                                        except StaleVersionError:
+                                            st.warning(STALE_MESSAGE)
+                                        else:
+                                            university.save_data()
+                                            st.success(f"Grade {new_grade} assigned to {student.name} for {course.title}")
+                                            st.rerun()
                             
                             with col3:
                                 if st.button(f"Drop {course.id}", key=f"drop_{student.id}_{course.id}"):
-                                    student.drop_course(course)
-                                    university.save_data()
-                                    st.success(f"{student.name} dropped from {course.title}")
-                                    st.experimental_rerun()
+                                    try:
+                                        university.drop_student(student, course, expected_version=student_version)
+                                    except StaleVersionError:
+                                        st.warning(STALE_MESSAGE)
+                                    else:
+                                        university.save_data()
+                                        st.success(f"{student.name} dropped from {course.title}")
+                                        st.rerun()
+            
+            page_selector(results, "enrollment_page")
+    
+    # Bulk import page
+    elif selection == "Bulk Import":
+        st.title("Bulk Import")
+        st.write("Upload roster files as CSV or JSONL (one JSON object per line). Every file is validated before anything is added, and the data is saved once at the end.")
+        
+        with st.expander("Expected columns"):
+            st.markdown("""
+            - **Instructors:** id, name, email, department, rank
+            - **Students:** id, name, email, major
+            - **Courses:** id, title, department, max_capacity, credits, instructor_id (optional)
+            - **Enrollments:** student_id, course_id, grade (optional)
+            """)
+        
+        instructors_file = st.file_uploader("Instructors", type=["csv", "jsonl"])
+        students_file = st.file_uploader("Students", type=["csv", "jsonl"])
+        courses_file = st.file_uploader("Courses", type=["csv", "jsonl"])
+        enrollments_file = st.file_uploader("Enrollments", type=["csv", "jsonl"])
+        import_with_errors = st.checkbox("Import valid rows even if some rows have errors")
+        
+        if st.button("Import"):
+            # Order matters: courses may reference instructors, and
+            # enrollments reference students and courses
+            importer = BulkImporter(university)
+            if instructors_file:
+                importer.stage_instructors(instructors_file)
+            if students_file:
+                importer.stage_students(students_file)
+            if courses_file:
+                importer.stage_courses(courses_file)
+            if enrollments_file:
+                importer.stage_enrollments(enrollments_file)
+            
+            if importer.errors and not import_with_errors:
+                st.error(f"Found {len(importer.errors)} invalid rows. Nothing was imported.")
+                errors = importer.errors
+            else:
+                report = importer.commit()
+                st.success(f"Imported {report.students} students, {report.instructors} instructors, "
+                           f"{report.courses} courses and {report.enrollments} enrollments.")
+                errors = report.errors
+            
+            if errors:
+                st.table({
+                    "File": [error.source for error in errors[:100]],
+                    "Line": [error.line if error.line else "" for error in errors[:100]],
+                    "Problem": [error.message for error in errors[:100]]
+                })
+                if len(errors) > 100:
+                    st.write(f"...and {len(errors) - 100} more")
     
     # Reports page
     elif selection == "Reports":
         st.title("Reports")
         
-        report_type = st.selectbox(
-            "Select Report Type",
-            ["Course Enrollment Statistics", "Student Performance", "Instructor Teaching Load"]
-        )
-        
-        if report_type == "Course Enrollment Statistics":
-            st.subheader("Course Enrollment Statistics")
-            
-            courses = university.get_all_courses()
-            if not courses:
-                st.info("No courses available to generate reports.")
-            else:
-                # Prepare data for visualization
-                course_names = [course.id for course in courses]
-                enrollments = [len(course.students) for course in courses]
-                capacities = [course.max_capacity for course in courses]
-                
-                # Display as a table
-                enrollment_data = {
-                    "Course": course_names,
-                    "Enrolled": enrollments,
-                    "Capacity": capacities,
-                    "Fill Rate (%)": [round(e/c*100, 1) for e, c in zip(enrollments, capacities)]
-                }
-                
-                st.table(enrollment_data)
-                
-                # Export option
-                if st.button("Export Report"):
-                    st.success("Report would be exported here (feature not implemented in this demo)")
+        # Reports are read from the report cube, which is kept up to date on
+        # every enroll, drop, grade and assignment
+        report_types = {
+            "Course Enrollment Statistics": ("Course Enrollment Statistics", university.reports.course_enrollment,
+                                             "No courses available to generate reports."),
+            "Student Performance": ("Student Performance Report", university.reports.student_performance,
+                                    "No students available to generate reports."),
+            "Instructor Teaching Load": ("Instructor Teaching Load Report", university.reports.teaching_load,
+                                         "No instructors available to generate reports."),
+            "Department Summary": ("Department Summary", university.reports.department_summary,
+                                   "No departments available to generate reports."),
+            "Major Summary": ("Major Summary", university.reports.major_summary,
+                              "No students available to generate reports.")
+        }
         
-        elif report_type == "Student Performance":
-            st.subheader("Student Performance Report")
-            
-            students = university.get_all_students()
-            if not students:
-                st.info("No students available to generate reports.")
-            else:
-                # Show GPA distribution
-                gpas = [student.get_gpa() for student in students]
-                
-                # Display as a table
-                performance_data = {
-                    "Student ID": [student.id for student in students],
-                    "Name": [student.name for student in students],
-                    "Major": [student.major for student in students],
-                    "Courses Enrolled": [len(student.enrolled_courses) for student in students],
-                    "GPA": [f"{student.get_gpa():.2f}" for student in students]
-                }
-                
-                st.table(performance_data)
-                
-                # Export option
-                if st.button("Export Report"):
-                    st.success("Report would be exported here (feature not implemented in this demo)")
+        report_type = st.selectbox("Select Report Type", list(report_types))
+        title, build_report, empty_message = report_types[report_type]
+        st.subheader(title)
         
-        elif report_type == "Instructor Teaching Load":
-            st.subheader("Instructor Teaching Load Report")
+        report_data = build_report()
+        if not next(iter(report_data.values())):
+            st.info(empty_message)
+        else:
+            st.dataframe(report_data, hide_index=True)
             
-            instructors = university.get_all_instructors()
-            if not instructors:
-                st.info("No instructors available to generate reports.")
+            # Export option
+            export_format = st.radio("Export Format", ["CSV", "Parquet"], horizontal=True)
+            file_name = report_type.lower().replace(" ", "_")
+            # Built only when the button is clicked, not on every rerun
+            if export_format == "CSV":
+                st.download_button("Download CSV", lambda: to_csv(report_data), f"{file_name}.csv", "text/csv")
             else:
-                # Display as a table
-                load_data = {
-                    "Instructor ID": [instructor.id for instructor in instructors],
-                    "Name": [instructor.name for instructor in instructors],
-                    "Department": [instructor.department for instructor in instructors],
-                    "Courses": [len(instructor.courses) for instructor in instructors],
-                    "Total Students": [
-                        sum(len(course.students) for course in instructor.courses) 
-                        for instructor in instructors
-                    ]
-                }
-                
-                st.table(load_data)
-                
-                # Export option
-                if st.button("Export Report"):
-                    st.success("Report would be exported here (feature not implemented in this demo)")
+                st.download_button("Download Parquet", lambda: to_parquet(report_data), f"{file_name}.parquet",
+                                   "application/octet-stream")
 
     # Save data before exiting
     try:
@@ -0,0 +1,759 @@
+import functools
+import os
+import pickle
+import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from recommend import CourseRecommender
+from reports import ReportCube
+from search import SearchIndex, paginate
+from scheduling import ScheduleIndex
+from waitlist import ENROLLED, REJECTED, WAITLISTED, WaitlistManager
+
+# The University and its entities. They live outside main.py because
+# Streamlit executes main.py as a fresh __main__ on every rerun: classes
+# defined there are new objects each run, so the shared University would
+# raise errors that the next run's except clauses do not match.
+
+# Raised when a change was based on an entity version that another session
+# has since modified
+class StaleVersionError(Exception):
+    pass
+
+# Entities use __slots__ rather than a per-instance __dict__, which keeps
+# large rosters compact. They pickle their slots as a dict, the same shape
+# older __dict__-based pickles have, so both load.
+def _slot_names(cls):
+    return [name for klass in cls.__mro__ for name in klass.__dict__.get("__slots__", ())]
+
+def _get_state(self):
+    return {name: getattr(self, name) for name in _slot_names(type(self)) if hasattr(self, name)}
+
+def _set_state(self, state):
+    for name, value in state.items():
+        setattr(self, name, value)
+
+# Majors, departments, ranks and session fields repeat across thousands of
+# entities, so they are interned to share one string per distinct value
+def _shared(value):
+    return sys.intern(value) if type(value) is str else value
+
+# Abstract base class for Person
+class Person(ABC):
+    __slots__ = ("_id", "_name", "_email", "_version")
+    
+    def __init__(self, id, name, email):
+        self._id = id
+        self._name = name
+        self._email = email
+        self._version = 0
+    
+    __getstate__ = _get_state
+    
+    # Older pickles predate versions
+    def __setstate__(self, state):
+        self._version = 0
+        _set_state(self, state)
+        
+    @property
+    def id(self):
+        return self._id
+    
+    # Bumped on every change, for optimistic concurrency checks
+    @property
+    def version(self):
+        return self._version
+        
+    @property
+    def name(self):
+        return self._name
+        
+    @property
+    def email(self):
+        return self._email
+    
+    @abstractmethod
+    def get_role(self):
+        pass
+    
+    def __str__(self):
+        return f"{self._name} ({self.get_role()})"
+
+# Instructor class inherits from Person
+class Instructor(Person):
+    __slots__ = ("_department", "_rank", "_courses")
+    
+    def __init__(self, id, name, email, department, rank):
+        super().__init__(id, name, email)
+        self._department = _shared(department)
+        self._rank = _shared(rank)
+        self._courses = []
+        
+    @property
+    def department(self):
+        return self._department
+        
+    @property
+    def rank(self):
+        return self._rank
+        
+    @property
+    def courses(self):
+        return self._courses
+    
+    def add_course(self, course):
+        if course not in self._courses:
+            self._courses.append(course)
+            self._version += 1
+            
+    def remove_course(self, course):
+        if course in self._courses:
+            self._courses.remove(course)
+            self._version += 1
+            
+    def get_role(self):
+        return "Instructor"
+
+# Student class inherits from Person
+class Student(Person):
+    __slots__ = ("_major", "_enrolled_courses", "_grades")
+    
+    def __init__(self, id, name, email, major):
+        super().__init__(id, name, email)
+        self._major = _shared(major)
+        self._enrolled_courses = []
+        self._grades = {}  # course_id: grade
+        
+    @property
+    def major(self):
+        return self._major
+        
+    @property
+    def enrolled_courses(self):
+        return self._enrolled_courses
+        
+    @property
+    def grades(self):
+        return self._grades
+    
+    # The seat is taken first: Course.add_student checks capacity atomically,
+    # so concurrent enrollments cannot overbook the course
+    def enroll_course(self, course):
+        if course not in self._enrolled_courses and course.add_student(self):
+            self._enrolled_courses.append(course)
+            self._version += 1
+            return True
+        return False
+            
+    def drop_course(self, course):
+        if course in self._enrolled_courses:
+            self._enrolled_courses.remove(course)
+            course.remove_student(self)
+            if course.id in self._grades:
+                del self._grades[course.id]
+            self._version += 1
+            return True
+        return False
+    
+    def assign_grade(self, course, grade):
+        if course in self._enrolled_courses:
+            self._grades[course.id] = grade
+            self._version += 1
+            return True
+        return False
+    
+    def get_gpa(self):
+        if not self._grades:
+            return 0.0
+        
+        grade_points = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
+        total_points = sum(grade_points.get(g, 0) for g in self._grades.values())
+        return total_points / len(self._grades)
+    
+    def get_role(self):
+        return "Student"
+
+# Course class
+class Course:
+    __slots__ = ("_id", "_title", "_department", "_max_capacity", "_credits", "_instructor", "_students",
+                 "_schedule", "_version", "_lock")
+    
+    def __init__(self, id, title, department, max_capacity, credits):
+        self._id = id
+        self._title = title
+        self._department = _shared(department)
+        self._max_capacity = max_capacity
+        self._credits = credits
+        self._instructor = None
+        self._students = []
+        self._schedule = []  # List of session objects
+        self._version = 0
+        self._lock = threading.Lock()
+    
+    # Locks can't be pickled; older pickles also predate versions
+    def __getstate__(self):
+        state = _get_state(self)
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self._version = 0
+        _set_state(self, state)
+        self._lock = threading.Lock()
+        
+    @property
+    def id(self):
+        return self._id
+    
+    @property
+    def version(self):
+        return self._version
+        
+    @property
+    def title(self):
+        return self._title
+        
+    @property
+    def department(self):
+        return self._department
+        
+    @property
+    def max_capacity(self):
+        return self._max_capacity
+        
+    @property
+    def credits(self):
+        return self._credits
+        
+    @property
+    def instructor(self):
+        return self._instructor
+        
+    @property
+    def students(self):
+        return self._students
+        
+    @property
+    def schedule(self):
+        return self._schedule
+    
+    def set_instructor(self, instructor):
+        if self._instructor:
+            self._instructor.remove_course(self)
+        
+        self._instructor = instructor
+        if instructor:
+            instructor.add_course(self)
+        self._version += 1
+    
+    # Check-and-take a seat as one step, so two sessions can't both see the
+    # last free seat
+    def add_student(self, student):
+        with self._lock:
+            if len(self._students) < self._max_capacity and student not in self._students:
+                self._students.append(student)
+                self._version += 1
+                return True
+            return False
+            
+    def remove_student(self, student):
+        with self._lock:
+            if student in self._students:
+                self._students.remove(student)
+                self._version += 1
+                return True
+            return False
+    
+    def has_capacity(self):
+        return len(self._students) < self._max_capacity
+    
+    def add_session(self, session):
+        self._schedule.append(session)
+        self._version += 1
+        
+    def remove_session(self, session):
+        if session in self._schedule:
+            self._schedule.remove(session)
+            self._version += 1
+    
+    def __str__(self):
+        instructor_name = self._instructor.name if self._instructor else "No instructor assigned"
+        return f"{self._id} - {self._title} ({instructor_name})"
+
+# Session class to represent course schedule
+class Session:
+    __slots__ = ("_day", "_start_time", "_end_time", "_location")
+    
+    def __init__(self, day, start_time, end_time, location):
+        self._day = _shared(day)
+        self._start_time = _shared(start_time)
+        self._end_time = _shared(end_time)
+        self._location = _shared(location)
+        
+    @property
+    def day(self):
+        return self._day
+        
+    @property
+    def start_time(self):
+        return self._start_time
+        
+    @property
+    def end_time(self):
+        return self._end_time
+        
+    @property
+    def location(self):
+        return self._location
+    
+    __getstate__ = _get_state
+    __setstate__ = _set_state
+    
+    def __str__(self):
+        return f"{self._day}, {self._start_time}-{self._end_time} at {self._location}"
+
+# Every University change runs under the instance's re-entrant lock.
+# Streamlit serves each session on its own thread and they all share the
+# singleton, so this keeps the entities and indexes consistent.
+def synchronized(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# University class to manage everything
+class University:
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(University, cls).__new__(cls)
+                cls._instance._initialized = False
+                cls._instance._lock = threading.RLock()
+        return cls._instance
+    
+    @synchronized
+    def __init__(self):
+        if self._initialized:
+            return
+            
+        self._students = {}  # id: Student object
+        self._instructors = {}  # id: Instructor object
+        self._courses = {}  # id: Course object
+        self._departments = set()
+        self._schedule_index = ScheduleIndex()
+        self._waitlists = WaitlistManager()
+        self._student_search = SearchIndex()
+        self._instructor_search = SearchIndex()
+        self._course_search = SearchIndex()
+        self._reports = ReportCube()
+        self._recommender = CourseRecommender(self)
+        self._listeners = [self._reports.handle, self._recommender.handle]
+        self._event_log = None
+        self._version = 0
+        self._saved_version = None
+        self._initialized = True
+    
+    # Listeners are called as listener(event, data) after every change
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+    
+    def _emit(self, event, **data):
+        self._version += 1
+        for listener in self._listeners:
+            listener(event, data)
+    
+    # Replaying a log applies a long run of events at once; the report cube
+    # and recommender are rebuilt once at the end instead of per event
+    @contextmanager
+    def replaying(self):
+        listeners, self._listeners = self._listeners, []
+        try:
+            yield
+        finally:
+            self._listeners = listeners
+            self._reports.rebuild(self)
+            self._recommender.rebuild(self)
+    
+    # Optimistic concurrency: a session passes back the version of the entity
+    # it showed to the user, and the change is refused if another session
+    # has modified the entity since
+    def _check_version(self, entity, expected_version):
+        if expected_version is not None and entity.version != expected_version:
+            raise StaleVersionError(f"{entity.id} was changed by another session")
+    
+    @property
+    def reports(self):
+        return self._reports
+    
+    @property
+    def event_log(self):
+        return self._event_log
+    
+    # Restores state from the log's latest snapshot plus the events after it,
+    # then records every further change. Only the first call attaches.
+    @synchronized
+    def attach_event_log(self, event_log):
+        if self._event_log is not None:
+            return 0
+        replayed = event_log.attach(self)
+        self._event_log = event_log
+        return replayed
+        
+    @synchronized
+    def add_student(self, student):
+        self._students[student.id] = student
+        self._student_search.add(student.id, student.id, student.name, student.email, student.major)
+        self._emit("student_added", student_id=student.id, name=student.name, email=student.email,
+                   major=student.major)
+        
+    @synchronized
+    def add_instructor(self, instructor):
+        self._instructors[instructor.id] = instructor
+        self._departments.add(instructor.department)
+        self._instructor_search.add(instructor.id, instructor.id, instructor.name, instructor.email,
+                                    instructor.department)
+        self._emit("instructor_added", instructor_id=instructor.id, name=instructor.name,
+                   email=instructor.email, department=instructor.department, rank=instructor.rank)
+        
+    @synchronized
+    def add_course(self, course):
+        self._courses[course.id] = course
+        self._departments.add(course.department)
+        self._schedule_index.add_course(course)
+        self._course_search.add(course.id, course.id, course.title, course.department)
+        self._emit("course_added", course_id=course.id, title=course.title, department=course.department,
+                   capacity=course.max_capacity, credits=course.credits)
+    
+    @synchronized
+    def remove_student(self, student_id):
+        student = self._students.get(student_id)
+        if student:
+            self._waitlists.leave_all(student_id)
+            for course in student.enrolled_courses.copy():
+                self.drop_student(student, course)
+            del self._students[student_id]
+            self._student_search.remove(student_id)
+            self._emit("student_removed", student_id=student_id)
+    
+    @synchronized
+    def remove_instructor(self, instructor_id):
+        instructor = self._instructors.get(instructor_id)
+        if instructor:
+            for course in instructor.courses.copy():
+                self.assign_instructor(course, None)
+            del self._instructors[instructor_id]
+            self._instructor_search.remove(instructor_id)
+            self._emit("instructor_removed", instructor_id=instructor_id)
+    
+    @synchronized
+    def remove_course(self, course_id, expected_version=None):
+        course = self._courses.get(course_id)
+        if course:
+            self._check_version(course, expected_version)
+            self._waitlists.discard(course_id)
+            for student in course.students.copy():
+                self.drop_student(student, course)
+            self.assign_instructor(course, None)
+            self._schedule_index.remove_course(course)
+            del self._courses[course_id]
+            self._course_search.remove(course_id)
+            self._emit("course_removed", course_id=course_id)
+    
+    # Scheduling, every change goes through the schedule index so that
+    # double-booked rooms, instructors and students are caught on insert
+    def session_conflicts(self, course, session):
+        return self._schedule_index.session_conflicts(course, session)
+    
+    def enrollment_conflicts(self, student, course):
+        return self._schedule_index.enrollment_conflicts(student, course)
+    
+    def free_rooms(self, day, start_time, end_time):
+        return self._schedule_index.free_rooms(day, start_time, end_time)
+    
+    def room_conflicts(self, day, start_time, end_time, location):
+        return self._schedule_index.room_conflicts(day, start_time, end_time, location)
+    
+    def get_rooms(self):
+        return self._schedule_index.rooms
+    
+    @synchronized
+    def schedule_session(self, course, session, allow_conflicts=False, expected_version=None):
+        self._check_version(course, expected_version)
+        if not allow_conflicts and self.session_conflicts(course, session):
+            return False
+        course.add_session(session)
+        if course.id in self._courses:
+            self._schedule_index.add_session(course, session)
+            self._emit("session_scheduled", course_id=course.id, day=session.day, start_time=session.start_time,
+                       end_time=session.end_time, location=session.location)
+        return True
+    
+    @synchronized
+    def unschedule_session(self, course, session, expected_version=None):
+        self._check_version(course, expected_version)
+        if session in course.schedule:
+            if course.id in self._courses:
+                self._schedule_index.remove_session(course, session)
+                self._emit("session_unscheduled", course_id=course.id, day=session.day,
+                           start_time=session.start_time, end_time=session.end_time, location=session.location)
+            course.remove_session(session)
+    
+    @synchronized
+    def assign_instructor(self, course, instructor, allow_conflicts=False, expected_version=None):
+        self._check_version(course, expected_version)
+        if (instructor and not allow_conflicts
+                and self._schedule_index.instructor_conflicts(instructor, course)):
+            return False
+        old_instructor = course.instructor
+        if old_instructor:
+            self._schedule_index.remove_teaching(old_instructor, course)
+        course.set_instructor(instructor)
+        if instructor and course.id in self._courses:
+            self._schedule_index.add_teaching(instructor, course)
+        if old_instructor is not instructor:
+            self._emit("instructor_assigned", course_id=course.id,
+                       old_instructor_id=old_instructor.id if old_instructor else None,
+                       instructor_id=instructor.id if instructor else None)
+        return True
+    
+    @synchronized
+    def enroll_student(self, student, course, allow_conflicts=False, expected_version=None):
+        self._check_version(student, expected_version)
+        if not allow_conflicts and self.enrollment_conflicts(student, course):
+            return False
+        if student.enroll_course(course):
+            self._schedule_index.add_enrollment(student, course)
+            self._waitlists.leave(student.id, course.id)
+            self._emit("enrolled", student_id=student.id, course_id=course.id)
+            return True
+        return False
+    
+    @synchronized
+    def drop_student(self, student, course, promote=True, expected_version=None):
+        self._check_version(student, expected_version)
+        grade = student.grades.get(course.id)
+        if student.drop_course(course):
+            self._schedule_index.remove_enrollment(student, course)
+            self._emit("dropped", student_id=student.id, course_id=course.id, grade=grade)
+            if promote:
+                self.promote_waitlist(course)
+            return True
+        return False
+    
+    @synchronized
+    def assign_grade(self, student, course, grade, expected_version=None):
+        self._check_version(student, expected_version)
+        old_grade = student.grades.get(course.id)
+        if student.assign_grade(course, grade):
+            self._emit("graded", student_id=student.id, course_id=course.id, old_grade=old_grade, grade=grade)
+            return True
+        return False
+    
+    # Waitlists
+    @property
+    def waitlists(self):
+        return self._waitlists
+    
+    @synchronized
+    def request_enrollment(self, student, course, seniority=0):
+        if course in student.enrolled_courses or self.enrollment_conflicts(student, course):
+            return REJECTED
+        if course.has_capacity() and self.enroll_student(student, course):
+            return ENROLLED
+        self.join_waitlist(student, course, seniority)
+        return WAITLISTED
+    
+    @synchronized
+    def join_waitlist(self, student, course, seniority=0, timestamp=None):
+        timestamp = self._waitlists.join(student, course, seniority, timestamp)
+        self._emit("waitlisted", student_id=student.id, course_id=course.id, seniority=seniority,
+                   timestamp=timestamp)
+    
+    @synchronized
+    def leave_waitlist(self, student, course):
+        if self._waitlists.leave(student.id, course.id):
+            self._emit("waitlist_left", student_id=student.id, course_id=course.id)
+            return True
+        return False
+    
+    # Fill freed seats from the waitlist, skipping students who have since
+    # left, enrolled, or picked up a clashing course
+    @synchronized
+    def promote_waitlist(self, course):
+        promoted = []
+        while course.has_capacity():
+            student_id = self._waitlists.pop(course.id)
+            if student_id is None:
+                break
+            student = self._students.get(student_id)
+            if student and self.enroll_student(student, course):
+                promoted.append(student)
+            elif student:
+                self._emit("waitlist_left", student_id=student_id, course_id=course.id)
+        return promoted
+    
+    # Replace every course's sessions with a generated timetable. Student
+    # clashes the solver could not avoid are kept rather than rejected.
+    @synchronized
+    def apply_timetable(self, result):
+        for course in self._courses.values():
+            for session in course.schedule.copy():
+                self.unschedule_session(course, session)
+        for placement in result.placements:
+            course = self._courses.get(placement.course_id)
+            if course:
+                session = Session(placement.day, placement.start_time, placement.end_time, placement.location)
+                self.schedule_session(course, session, allow_conflicts=True)
+        
+    def get_student(self, student_id):
+        return self._students.get(student_id)
+        
+    def get_instructor(self, instructor_id):
+        return self._instructors.get(instructor_id)
+        
+    def get_course(self, course_id):
+        return self._courses.get(course_id)
+    
+    def get_all_students(self):
+        return list(self._students.values())
+        
+    def get_all_instructors(self):
+        return list(self._instructors.values())
+        
+    def get_all_courses(self):
+        return list(self._courses.values())
+    
+    # Searchable, paginated listings. Matching ids on id, name, email,
+    # department or major are looked up by prefix first, then by substring.
+    @synchronized
+    def find_students(self, query="", page=1, page_size=20, where=None):
+        ids = self._student_search.search(query)
+        if where:
+            ids = [id for id in ids if where(self._students[id])]
+        result = paginate(ids, page, page_size)
+        return result._replace(items=[self._students[id] for id in result.items])
+    
+    @synchronized
+    def find_instructors(self, query="", page=1, page_size=20):
+        result = paginate(self._instructor_search.search(query), page, page_size)
+        return result._replace(items=[self._instructors[id] for id in result.items])
+    
+    @synchronized
+    def find_courses(self, query="", page=1, page_size=20):
+        result = paginate(self._course_search.search(query), page, page_size)
+        return result._replace(items=[self._courses[id] for id in result.items])
+    
+    def _rebuild_search(self):
+        self._student_search = SearchIndex()
+        self._instructor_search = SearchIndex()
+        self._course_search = SearchIndex()
+        for student in self._students.values():
+            self._student_search.add(student.id, student.id, student.name, student.email, student.major)
+        for instructor in self._instructors.values():
+            self._instructor_search.add(instructor.id, instructor.id, instructor.name, instructor.email,
+                                        instructor.department)
+        for course in self._courses.values():
+            self._course_search.add(course.id, course.id, course.title, course.department)
+    
+    # Courses similar students took, best first, as (course, score) pairs
+    @synchronized
+    def recommend_courses(self, student, limit=5, available_only=True):
+        exclude = [course.id for course in self._courses.values() if not course.has_capacity()] if available_only else ()
+        return [(self._courses[course_id], score)
+                for course_id, score in self._recommender.recommend(student, limit, exclude)]
+    
+    def get_departments(self):
+        return sorted(list(self._departments))
+    
+    # Entities reference each other (students <-> courses <-> instructors),
+    # and pickling that graph directly recurses once per link and overflows
+    # the stack on large rosters. Save flat records keyed by id instead and
+    # relink them on load.
+    def _dump_state(self):
+        return {
+            "format": 2,
+            "students": [
+                (s.id, s.name, s.email, s.major, s.grades, [c.id for c in s.enrolled_courses])
+                for s in self._students.values()
+            ],
+            "instructors": [
+                (i.id, i.name, i.email, i.department, i.rank, [c.id for c in i.courses])
+                for i in self._instructors.values()
+            ],
+            "courses": [
+                (c.id, c.title, c.department, c.max_capacity, c.credits,
+                 c.instructor.id if c.instructor else None,
+                 [(x.day, x.start_time, x.end_time, x.location) for x in c.schedule],
+                 [s.id for s in c.students])
+                for c in self._courses.values()
+            ],
+            "departments": self._departments,
+            "waitlists": self._waitlists
+        }
+    
+    @synchronized
+    def _load_state(self, data):
+        if data.get("format") != 2:
+            # Older files pickled the entity objects directly
+            self._students = data.get("students", {})
+            self._instructors = data.get("instructors", {})
+            self._courses = data.get("courses", {})
+        else:
+            self._students = {}
+            for id, name, email, major, grades, _ in data["students"]:
+                student = Student(id, name, email, major)
+                student._grades = grades
+                self._students[id] = student
+            self._instructors = {}
+            for id, name, email, department, rank, _ in data["instructors"]:
+                self._instructors[id] = Instructor(id, name, email, department, rank)
+            self._courses = {}
+            for id, title, department, capacity, credits, instructor_id, sessions, student_ids in data["courses"]:
+                course = Course(id, title, department, capacity, credits)
+                course._instructor = self._instructors.get(instructor_id)
+                course._schedule = [Session(*session) for session in sessions]
+                course._students = [self._students[student_id] for student_id in student_ids]
+                self._courses[id] = course
+            for id, _, _, _, _, course_ids in data["students"]:
+                self._students[id]._enrolled_courses = [self._courses[course_id] for course_id in course_ids]
+            for id, _, _, _, _, course_ids in data["instructors"]:
+                self._instructors[id]._courses = [self._courses[course_id] for course_id in course_ids]
+        self._departments = data.get("departments", set())
+        self._waitlists = data.get("waitlists") or WaitlistManager()
+        self._schedule_index.rebuild(self._courses.values())
+        self._rebuild_search()
+        self._reports.rebuild(self)
+        self._recommender.rebuild(self)
+    
+    # Flushes the event log, then writes the state to a temporary file and
+    # swaps it in, so a reader never sees a half-written file. The file is
+    # only rewritten when something changed since the last save.
+    @synchronized
+    def save_data(self, filename="university_data.pkl"):
+        if self._event_log:
+            self._event_log.flush()
+        if self._saved_version == (filename, self._version) and os.path.exists(filename):
+            return
+        with open(filename + ".tmp", 'wb') as file:
+            pickle.dump(self._dump_state(), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(filename + ".tmp", filename)
+        self._loaded_stamp = (filename, os.stat(filename).st_mtime_ns)
+        self._saved_version = (filename, self._version)
+    
+    # Loading rebuilds every index, so skip it when the file hasn't changed
+    # since this process last loaded or saved it
+    @synchronized
+    def load_data(self, filename="university_data.pkl"):
+        if os.path.exists(filename):
+            stamp = (filename, os.stat(filename).st_mtime_ns)
+            if stamp == getattr(self, "_loaded_stamp", None):
+                return
+            with open(filename, 'rb') as file:
+                self._load_state(pickle.load(file))
+            self._loaded_stamp = stamp
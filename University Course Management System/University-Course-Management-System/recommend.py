@@ -0,0 +1,152 @@
+import numpy as np
+
+# How strongly an enrollment counts as evidence of interest. Ungraded
+# enrollments count fully; courses a student did poorly in count less.
+GRADE_WEIGHTS = {'A': 1.0, 'B': 0.85, 'C': 0.7, 'D': 0.55, 'F': 0.4}
+
+
+def enrollment_weight(grade):
+    return GRADE_WEIGHTS.get(grade, 1.0) if grade else 1.0
+
+
+# Item-item recommender over the weighted student x course matrix X. The
+# model is the course co-occurrence matrix C = X^T X, kept dense since the
+# course count is small; its diagonal holds each course's squared norm, so
+# cosine similarity between two courses is C[i, j] / sqrt(C[i, i] C[j, j]).
+# C is built in one vectorized pass and then updated in place from
+# University events, touching only the rows of the changed student's
+# courses.
+class CourseRecommender:
+    def __init__(self, university=None):
+        self._university = university
+        self._index = {}  # course_id: row in C
+        self._course_ids = []  # row: course_id, None for a freed row
+        self._free = []
+        self._cooccurrence = np.zeros((0, 0), dtype=np.float64)
+        self._counts = np.zeros(0, dtype=np.int64)  # enrollments per course, for cold starts
+
+    def _course_row(self, course_id):
+        row = self._index.get(course_id)
+        if row is not None:
+            return row
+        if self._free:
+            row = self._free.pop()
+            self._course_ids[row] = course_id
+        else:
+            row = len(self._course_ids)
+            self._course_ids.append(course_id)
+            if row >= len(self._counts):
+                # Grow by doubling so adding courses one at a time stays cheap
+                size = max(2 * len(self._counts), 64)
+                grown = np.zeros((size, size), dtype=np.float64)
+                grown[:row, :row] = self._cooccurrence[:row, :row]
+                self._cooccurrence = grown
+                self._counts = np.concatenate([self._counts, np.zeros(size - len(self._counts), dtype=np.int64)])
+        self._index[course_id] = row
+        return row
+
+    # The vectorized job: every pair of courses taken by the same student,
+    # generated per chunk of students and scattered into C
+    def rebuild(self, university, chunk_size=20000):
+        self.__init__(university)
+        for course in university.get_all_courses():
+            self._course_row(course.id)
+        students = university.get_all_students()
+        for start in range(0, len(students), chunk_size):
+            rows, weights, sizes = [], [], []
+            for student in students[start:start + chunk_size]:
+                courses = student.enrolled_courses
+                sizes.append(len(courses))
+                for course in courses:
+                    rows.append(self._index[course.id])
+                    weights.append(enrollment_weight(student.grades.get(course.id)))
+            self._add_pairs(np.array(rows, dtype=np.int64), np.array(weights, dtype=np.float64),
+                            np.array(sizes, dtype=np.int64))
+
+    def _add_pairs(self, rows, weights, sizes):
+        if not len(rows):
+            return
+        np.add.at(self._counts, rows, 1)
+        # Entry e of a student with k courses pairs with all k entries of
+        # that student, its own included, which fills in the diagonal
+        starts = np.repeat(np.cumsum(sizes) - sizes, sizes)
+        repeats = np.repeat(sizes, sizes)
+        left = np.repeat(np.arange(len(rows)), repeats)
+        block_starts = np.repeat(np.cumsum(repeats) - repeats, repeats)
+        right = np.repeat(starts, repeats) + np.arange(len(left)) - block_starts
+        np.add.at(self._cooccurrence, (rows[left], rows[right]), weights[left] * weights[right])
+
+    # Add (sign=1) or remove (sign=-1) one enrollment of weight w, given the
+    # student's other enrollments as (row, weight) pairs
+    def _update(self, row, weight, others, sign):
+        self._cooccurrence[row, row] += sign * weight * weight
+        if others:
+            other_rows = np.array([other for other, _ in others], dtype=np.int64)
+            products = sign * weight * np.array([w for _, w in others], dtype=np.float64)
+            self._cooccurrence[row, other_rows] += products
+            self._cooccurrence[other_rows, row] += products
+
+    def _other_enrollments(self, student_id, course_id):
+        student = self._university.get_student(student_id) if self._university else None
+        if student is None:
+            return []
+        return [(self._index[course.id], enrollment_weight(student.grades.get(course.id)))
+                for course in student.enrolled_courses if course.id != course_id and course.id in self._index]
+
+    # University listener
+    def handle(self, event, data):
+        if event == "course_added":
+            self._course_row(data["course_id"])
+        elif event == "course_removed":
+            row = self._index.pop(data["course_id"], None)
+            if row is not None:
+                self._cooccurrence[row, :] = 0
+                self._cooccurrence[:, row] = 0
+                self._counts[row] = 0
+                self._course_ids[row] = None
+                self._free.append(row)
+        elif event == "enrolled":
+            row = self._index.get(data["course_id"])
+            if row is not None:
+                self._counts[row] += 1
+                self._update(row, 1.0, self._other_enrollments(data["student_id"], data["course_id"]), 1)
+        elif event == "dropped":
+            row = self._index.get(data["course_id"])
+            if row is not None:
+                self._counts[row] -= 1
+                self._update(row, enrollment_weight(data.get("grade")),
+                             self._other_enrollments(data["student_id"], data["course_id"]), -1)
+        elif event == "graded":
+            row = self._index.get(data["course_id"])
+            if row is not None:
+                others = self._other_enrollments(data["student_id"], data["course_id"])
+                self._update(row, enrollment_weight(data.get("old_grade")), others, -1)
+                self._update(row, enrollment_weight(data["grade"]), others, 1)
+
+    # Top courses for a student: each candidate scores the weighted sum of
+    # its cosine similarity to the student's courses. Students without
+    # enrollments get the most popular courses.
+    def recommend(self, student, limit=5, exclude=()):
+        n = len(self._course_ids)
+        if not n:
+            return []
+        taken = [(self._index[course.id], enrollment_weight(student.grades.get(course.id)))
+                 for course in student.enrolled_courses if course.id in self._index]
+        norms = np.sqrt(np.maximum(np.diagonal(self._cooccurrence)[:n], 0))
+        if taken:
+            rows = np.array([row for row, _ in taken], dtype=np.int64)
+            weights = np.array([weight for _, weight in taken], dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                similarity = self._cooccurrence[rows, :n] / (norms[rows, None] * norms[None, :])
+            scores = weights @ np.nan_to_num(similarity, nan=0.0, posinf=0.0)
+            scores[rows] = 0
+        else:
+            scores = self._counts[:n].astype(np.float64)
+        for course_id in exclude:
+            if course_id in self._index:
+                scores[self._index[course_id]] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._course_ids[row], float(scores[row])) for row in candidates]
@@ -0,0 +1,193 @@
+import csv
+import io
+
+GRADE_POINTS = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
+
+
+# Report counters kept up to date from University events, so every report
+# is built in time proportional to its number of rows instead of walking
+# the whole object graph. Each entry is a small dict of running totals.
+class ReportCube:
+    def __init__(self):
+        self.courses = {}  # course_id: enrolled, capacity, department, instructor
+        self.instructors = {}  # instructor_id: name, department, courses, students
+        self.students = {}  # student_id: name, major, courses, points, graded
+        self.departments = {}  # department: courses, enrolled, capacity
+        self.majors = {}  # major: students, enrolled, points, graded
+
+    def rebuild(self, university):
+        self.__init__()
+        for instructor in university.get_all_instructors():
+            self.handle("instructor_added", {"instructor_id": instructor.id, "name": instructor.name,
+                                             "department": instructor.department})
+        for student in university.get_all_students():
+            self.handle("student_added", {"student_id": student.id, "name": student.name,
+                                          "major": student.major})
+        for course in university.get_all_courses():
+            self.handle("course_added", {"course_id": course.id, "department": course.department,
+                                         "capacity": course.max_capacity})
+            if course.instructor:
+                self.handle("instructor_assigned", {"course_id": course.id, "old_instructor_id": None,
+                                                    "instructor_id": course.instructor.id})
+            for student in course.students:
+                self.handle("enrolled", {"student_id": student.id, "course_id": course.id})
+        for student in university.get_all_students():
+            for course_id, grade in student.grades.items():
+                self.handle("graded", {"student_id": student.id, "course_id": course_id,
+                                       "old_grade": None, "grade": grade})
+
+    def _grade(self, student_id, grade, sign):
+        if grade is None:
+            return
+        points = GRADE_POINTS.get(grade, 0) * sign
+        student = self.students[student_id]
+        student["points"] += points
+        student["graded"] += sign
+        major = self.majors[student["major"]]
+        major["points"] += points
+        major["graded"] += sign
+
+    def _enrollment(self, student_id, course_id, sign):
+        course = self.courses[course_id]
+        student = self.students[student_id]
+        course["enrolled"] += sign
+        self.departments[course["department"]]["enrolled"] += sign
+        if course["instructor"]:
+            self.instructors[course["instructor"]]["students"] += sign
+        student["courses"] += sign
+        self.majors[student["major"]]["enrolled"] += sign
+
+    # University listener
+    def handle(self, event, data):
+        if event == "student_added":
+            self.students[data["student_id"]] = {"name": data["name"], "major": data["major"],
+                                                 "courses": 0, "points": 0.0, "graded": 0}
+            major = self.majors.setdefault(data["major"], {"students": 0, "enrolled": 0,
+                                                           "points": 0.0, "graded": 0})
+            major["students"] += 1
+        elif event == "student_removed":
+            student = self.students.pop(data["student_id"])
+            self.majors[student["major"]]["students"] -= 1
+        elif event == "instructor_added":
+            self.instructors[data["instructor_id"]] = {"name": data["name"], "department": data["department"],
+                                                       "courses": 0, "students": 0}
+        elif event == "instructor_removed":
+            self.instructors.pop(data["instructor_id"], None)
+        elif event == "course_added":
+            self.courses[data["course_id"]] = {"enrolled": 0, "capacity": data["capacity"],
+                                               "department": data["department"], "instructor": None}
+            department = self.departments.setdefault(data["department"], {"courses": 0, "enrolled": 0,
+                                                                          "capacity": 0})
+            department["courses"] += 1
+            department["capacity"] += data["capacity"]
+        elif event == "course_removed":
+            course = self.courses.pop(data["course_id"])
+            department = self.departments[course["department"]]
+            department["courses"] -= 1
+            department["capacity"] -= course["capacity"]
+        elif event == "instructor_assigned":
+            course = self.courses.get(data["course_id"])
+            if course is None:
+                return
+            if course["instructor"]:
+                old = self.instructors[course["instructor"]]
+                old["courses"] -= 1
+                old["students"] -= course["enrolled"]
+            course["instructor"] = data["instructor_id"]
+            if data["instructor_id"]:
+                new = self.instructors[data["instructor_id"]]
+                new["courses"] += 1
+                new["students"] += course["enrolled"]
+        elif event == "enrolled":
+            self._enrollment(data["student_id"], data["course_id"], 1)
+        elif event == "dropped":
+            self._enrollment(data["student_id"], data["course_id"], -1)
+            self._grade(data["student_id"], data.get("grade"), -1)
+        elif event == "graded":
+            self._grade(data["student_id"], data.get("old_grade"), -1)
+            self._grade(data["student_id"], data["grade"], 1)
+
+    # Reports, as column dicts ready for st.dataframe or export
+    def course_enrollment(self):
+        ids = list(self.courses)
+        rows = [self.courses[id] for id in ids]
+        return {
+            "Course": ids,
+            "Enrolled": [row["enrolled"] for row in rows],
+            "Capacity": [row["capacity"] for row in rows],
+            "Fill Rate (%)": [round(row["enrolled"] / row["capacity"] * 100, 1) for row in rows]
+        }
+
+    def student_performance(self):
+        ids = list(self.students)
+        rows = [self.students[id] for id in ids]
+        return {
+            "Student ID": ids,
+            "Name": [row["name"] for row in rows],
+            "Major": [row["major"] for row in rows],
+            "Courses Enrolled": [row["courses"] for row in rows],
+            "GPA": [f"{row['points'] / row['graded'] if row['graded'] else 0.0:.2f}" for row in rows]
+        }
+
+    def teaching_load(self):
+        ids = list(self.instructors)
+        rows = [self.instructors[id] for id in ids]
+        return {
+            "Instructor ID": ids,
+            "Name": [row["name"] for row in rows],
+            "Department": [row["department"] for row in rows],
+            "Courses": [row["courses"] for row in rows],
+            "Total Students": [row["students"] for row in rows]
+        }
+
+    def department_summary(self):
+        names = sorted(name for name, row in self.departments.items() if row["courses"])
+        rows = [self.departments[name] for name in names]
+        return {
+            "Department": names,
+            "Courses": [row["courses"] for row in rows],
+            "Enrolled": [row["enrolled"] for row in rows],
+            "Fill Rate (%)": [round(row["enrolled"] / row["capacity"] * 100, 1) if row["capacity"] else 0.0
+                              for row in rows]
+        }
+
+    def major_summary(self):
+        names = sorted(name for name, row in self.majors.items() if row["students"])
+        rows = [self.majors[name] for name in names]
+        return {
+            "Major": names,
+            "Students": [row["students"] for row in rows],
+            "Enrollments": [row["enrolled"] for row in rows],
+            "Average GPA": [f"{row['points'] / row['graded'] if row['graded'] else 0.0:.2f}" for row in rows]
+        }
+
+
+# Stream a column dict as CSV, yielding encoded chunks of rows
+def iter_csv(columns, chunk_size=256 * 1024):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns.keys())
+    for row in zip(*columns.values()):
+        writer.writerow(row)
+        if buffer.tell() > chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def to_csv(columns):
+    return b"".join(iter_csv(columns))
+
+
+# Parquet export needs pyarrow, which ships with Streamlit
+def to_parquet(columns, row_group_size=100000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table(columns)
+    buffer = io.BytesIO()
+    with pq.ParquetWriter(buffer, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=row_group_size):
+            writer.write_batch(batch)
+    return buffer.getvalue()
@@ -0,0 +1,298 @@
+from collections import namedtuple
+from datetime import time
+from itertools import count
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# A clash between a new booking and an existing one
+Conflict = namedtuple("Conflict", ["kind", "resource", "day", "start", "end", "course_id"])
+
+
+def to_minutes(value):
+    # Sessions store times as "HH:MM" strings, the UI hands us datetime.time
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, int):
+        return value
+    hours, minutes = str(value).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(value):
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def describe_conflict(conflict):
+    labels = {"room": "Room", "instructor": "Instructor", "student": "Student"}
+    return (f"{labels.get(conflict.kind, conflict.kind)} {conflict.resource} is already booked on "
+            f"{conflict.day} {format_minutes(conflict.start)}-{format_minutes(conflict.end)} "
+            f"by {conflict.course_id}")
+
+
+# Node of an AVL tree ordered by (start, end, token) and augmented with the
+# largest end time in its subtree, so overlap queries can prune whole branches
+class _Node:
+    __slots__ = ("key", "start", "end", "payload", "max_end", "height", "left", "right")
+
+    def __init__(self, key, start, end, payload):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.payload = payload
+        self.max_end = end
+        self.height = 1
+        self.left = None
+        self.right = None
+
+
+def _height(node):
+    return node.height if node else 0
+
+
+def _update(node):
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_end = node.end
+    if node.left and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rebalance(node):
+    _update(node)
+    balance = _height(node.left) - _height(node.right)
+    if balance > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+# Balanced interval tree over half-open [start, end) intervals.
+# Insert and remove are O(log n), overlap queries are O(log n + k).
+class IntervalTree:
+    def __init__(self):
+        self._root = None
+        self._size = 0
+        self._tokens = count()
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, start, end, payload):
+        key = (start, end, next(self._tokens))
+        self._root = self._insert(self._root, _Node(key, start, end, payload))
+        self._size += 1
+        return key
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if new.key < node.key:
+            node.left = self._insert(node.left, new)
+        else:
+            node.right = self._insert(node.right, new)
+        return _rebalance(node)
+
+    def remove(self, key):
+        self._root, removed = self._remove(self._root, key)
+        if removed:
+            self._size -= 1
+        return removed
+
+    def _remove(self, node, key):
+        if node is None:
+            return None, False
+        if key < node.key:
+            node.left, removed = self._remove(node.left, key)
+        elif key > node.key:
+            node.right, removed = self._remove(node.right, key)
+        else:
+            if node.left is None:
+                return node.right, True
+            if node.right is None:
+                return node.left, True
+            successor = node.right
+            while successor.left:
+                successor = successor.left
+            node.key, node.start, node.end, node.payload = (
+                successor.key, successor.start, successor.end, successor.payload)
+            node.right, removed = self._remove(node.right, successor.key)
+        return _rebalance(node), removed
+
+    def overlapping(self, start, end):
+        result = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            if node.max_end <= start:
+                continue
+            if node.left:
+                stack.append(node.left)
+            if node.start < end:
+                if node.end > start:
+                    result.append(node.payload)
+                if node.right:
+                    stack.append(node.right)
+        return result
+
+    def overlaps(self, start, end):
+        node = self._root
+        while node:
+            if node.start < end and node.end > start:
+                return True
+            if node.left and node.left.max_end > start:
+                node = node.left
+            else:
+                node = node.right
+        return False
+
+
+# Booking index over rooms, instructors and students, one interval tree per
+# (kind, resource, day). It mirrors the Session objects held by each Course.
+class ScheduleIndex:
+    def __init__(self):
+        self._trees = {}
+        self._keys = {}  # (kind, resource, day, course_id, id(session)): tree key
+        self._rooms = set()
+
+    @property
+    def rooms(self):
+        return sorted(self._rooms)
+
+    def rebuild(self, courses):
+        self.__init__()
+        for course in courses:
+            self.add_course(course)
+
+    def _book(self, kind, resource, course, session):
+        day = session.day
+        start, end = to_minutes(session.start_time), to_minutes(session.end_time)
+        tree = self._trees.get((kind, resource, day))
+        if tree is None:
+            tree = self._trees[(kind, resource, day)] = IntervalTree()
+        key = tree.insert(start, end, (course.id, session))
+        self._keys[(kind, resource, day, course.id, id(session))] = key
+
+    def _unbook(self, kind, resource, course, session):
+        day = session.day
+        key = self._keys.pop((kind, resource, day, course.id, id(session)), None)
+        if key is not None:
+            tree = self._trees[(kind, resource, day)]
+            tree.remove(key)
+            if not len(tree):
+                del self._trees[(kind, resource, day)]
+
+    def _find(self, kind, resource, day, start, end, ignore_course=None):
+        tree = self._trees.get((kind, resource, day))
+        if tree is None:
+            return []
+        conflicts = []
+        for course_id, other in tree.overlapping(start, end):
+            if course_id != ignore_course:
+                conflicts.append(Conflict(kind, resource, day, to_minutes(other.start_time),
+                                          to_minutes(other.end_time), course_id))
+        return conflicts
+
+    def _resources(self, course, session):
+        resources = []
+        if session.location:
+            resources.append(("room", session.location))
+        if course.instructor:
+            resources.append(("instructor", course.instructor.id))
+        resources.extend(("student", student.id) for student in course.students)
+        return resources
+
+    # Conflict queries
+    def session_conflicts(self, course, session):
+        start, end = to_minutes(session.start_time), to_minutes(session.end_time)
+        conflicts = []
+        for kind, resource in self._resources(course, session):
+            conflicts.extend(self._find(kind, resource, session.day, start, end))
+        return conflicts
+
+    def room_conflicts(self, day, start, end, location):
+        return self._find("room", location, day, to_minutes(start), to_minutes(end))
+
+    def enrollment_conflicts(self, student, course):
+        conflicts = []
+        for session in course.schedule:
+            conflicts.extend(self._find("student", student.id, session.day,
+                                        to_minutes(session.start_time),
+                                        to_minutes(session.end_time), ignore_course=course.id))
+        return conflicts
+
+    def instructor_conflicts(self, instructor, course):
+        conflicts = []
+        for session in course.schedule:
+            conflicts.extend(self._find("instructor", instructor.id, session.day,
+                                        to_minutes(session.start_time),
+                                        to_minutes(session.end_time), ignore_course=course.id))
+        return conflicts
+
+    def free_rooms(self, day, start, end, rooms=None):
+        start, end = to_minutes(start), to_minutes(end)
+        candidates = self._rooms if rooms is None else rooms
+        free = []
+        for room in candidates:
+            tree = self._trees.get(("room", room, day))
+            if tree is None or not tree.overlaps(start, end):
+                free.append(room)
+        return sorted(free)
+
+    # Index maintenance
+    def add_session(self, course, session):
+        if session.location:
+            self._rooms.add(session.location)
+        for kind, resource in self._resources(course, session):
+            self._book(kind, resource, course, session)
+
+    def remove_session(self, course, session):
+        for kind, resource in self._resources(course, session):
+            self._unbook(kind, resource, course, session)
+
+    def add_course(self, course):
+        for session in course.schedule:
+            self.add_session(course, session)
+
+    def remove_course(self, course):
+        for session in course.schedule:
+            self.remove_session(course, session)
+
+    def add_enrollment(self, student, course):
+        for session in course.schedule:
+            self._book("student", student.id, course, session)
+
+    def remove_enrollment(self, student, course):
+        for session in course.schedule:
+            self._unbook("student", student.id, course, session)
+
+    def add_teaching(self, instructor, course):
+        for session in course.schedule:
+            self._book("instructor", instructor.id, course, session)
+
+    def remove_teaching(self, instructor, course):
+        for session in course.schedule:
+            self._unbook("instructor", instructor.id, course, session)
@@ -0,0 +1,117 @@
+from bisect import bisect_left
+from collections import namedtuple
+
+# One page of search results
+Page = namedtuple("Page", ["items", "total", "page", "pages"])
+
+
+def _terms(value):
+    # The whole value plus each word, so "smith" finds "John Smith"
+    text = str(value).lower()
+    words = text.replace("@", " ").replace(".", " ").split()
+    return {text, *words}
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Prefix and substring index over a few text fields per entity.
+# Prefix lookups bisect a sorted term list; substring lookups intersect
+# trigram posting sets and then verify the candidates. New terms are
+# buffered and merged into the sorted list on the next query, so bulk
+# inserts stay linear.
+class SearchIndex:
+    def __init__(self):
+        self._order = {}  # entity_id: insertion number, for stable listing
+        self._texts = {}  # entity_id: lowercase field values
+        self._entity_terms = {}  # entity_id: set of prefix terms
+        self._sorted = []  # (term, entity_id)
+        self._pending = []
+        self._stale = False
+        self._trigrams = {}  # trigram: set of entity ids
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def add(self, entity_id, *values):
+        self.remove(entity_id)
+        self._counter += 1
+        self._order[entity_id] = self._counter
+        texts = [str(value).lower() for value in values if value]
+        terms = set()
+        for text in texts:
+            terms.update(_terms(text))
+        self._texts[entity_id] = texts
+        self._entity_terms[entity_id] = terms
+        self._pending.extend((term, entity_id) for term in terms)
+        for text in texts:
+            for trigram in _trigrams(text):
+                self._trigrams.setdefault(trigram, set()).add(entity_id)
+
+    def remove(self, entity_id):
+        if self._order.pop(entity_id, None) is None:
+            return
+        del self._entity_terms[entity_id]
+        for text in self._texts.pop(entity_id):
+            for trigram in _trigrams(text):
+                postings = self._trigrams.get(trigram)
+                if postings:
+                    postings.discard(entity_id)
+                    if not postings:
+                        del self._trigrams[trigram]
+        self._stale = True
+
+    def _merge(self):
+        if self._pending or self._stale:
+            terms = self._sorted + self._pending
+            if self._stale:
+                # Drop terms of removed entities, including old terms of
+                # entities that were removed and added back
+                terms = [item for item in terms if item[0] in self._entity_terms.get(item[1], ())]
+            self._sorted = sorted(set(terms))
+            self._pending = []
+            self._stale = False
+
+    def prefix(self, query):
+        self._merge()
+        query = query.lower()
+        matches = []
+        seen = set()
+        for term, entity_id in self._sorted[bisect_left(self._sorted, (query,)):]:
+            if not term.startswith(query):
+                break
+            if entity_id not in seen:
+                seen.add(entity_id)
+                matches.append(entity_id)
+        return matches
+
+    def substring(self, query):
+        query = query.lower()
+        if len(query) < 3:
+            return [entity_id for entity_id, texts in self._texts.items()
+                    if any(query in text for text in texts)]
+        postings = [self._trigrams.get(trigram, set()) for trigram in _trigrams(query)]
+        candidates = set.intersection(*sorted(postings, key=len))
+        matches = [entity_id for entity_id in candidates
+                   if any(query in text for text in self._texts[entity_id])]
+        return sorted(matches, key=self._order.get)
+
+    # Prefix matches first, then the remaining substring matches. An empty
+    # query lists everything in insertion order.
+    def search(self, query=""):
+        query = query.strip()
+        if not query:
+            return list(self._order)
+        matches = self.prefix(query)
+        seen = set(matches)
+        matches.extend(entity_id for entity_id in self.substring(query) if entity_id not in seen)
+        return matches
+
+
+def paginate(items, page=1, page_size=20):
+    pages = max((len(items) + page_size - 1) // page_size, 1)
+    page = min(max(page, 1), pages)
+    start = (page - 1) * page_size
+    return Page(items[start:start + page_size], len(items), page, pages)
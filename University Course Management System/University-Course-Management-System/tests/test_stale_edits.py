@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from models import Course, Instructor, University  # noqa: E402
+
+STALE_MESSAGE = "This record was changed by another user."
+
+
+# A fresh University, shared with the app the way a second session would
+# share it, with the app's data files in a temporary directory
+@pytest.fixture
+def university(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    University._instance = None
+    st.cache_resource.clear()
+    university = University()
+    university.add_course(Course("CS101", "Intro to Programming", "CS", 30, 3))
+    university.add_instructor(Instructor("I1", "Ada Lovelace", "ada@uni.edu", "CS", "Professor"))
+    yield university
+    University._instance = None
+    st.cache_resource.clear()
+
+
+def courses_page():
+    app = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=30)
+    app.run()
+    app.sidebar.radio[0].set_value("Courses").run()
+    return app
+
+
+def delete_button(app):
+    return next(button for button in app.button if button.label == "Delete Course CS101")
+
+
+def test_delete_course_changed_by_another_session_is_refused(university):
+    app = courses_page()
+    # Another session edits the course after this one rendered it
+    course = university.get_course("CS101")
+    university.assign_instructor(course, university.get_instructor("I1"))
+
+    delete_button(app).click().run()
+
+    assert not app.exception
+    assert any(STALE_MESSAGE in warning.value for warning in app.warning)
+    assert university.get_course("CS101") is course
+
+
+def test_delete_course_without_concurrent_change(university):
+    app = courses_page()
+
+    delete_button(app).click().run()
+
+    assert not app.exception
+    assert university.get_course("CS101") is None
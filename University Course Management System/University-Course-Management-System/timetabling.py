@@ -0,0 +1,318 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from scheduling import format_minutes
+
+DEFAULT_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+DEFAULT_STARTS = ["08:00", "09:30", "11:00", "12:30", "14:00", "15:30", "17:00"]
+UNPLACED_PENALTY = 10000
+
+# One generated meeting of a course
+Placement = namedtuple("Placement", ["course_id", "day", "start_time", "end_time", "location"])
+TimetableResult = namedtuple("TimetableResult", ["placements", "cost", "clashes", "unplaced", "trace"])
+
+
+# Plain-data description of a timetabling problem. Everything is stored as
+# lists and dicts of ints so it can be shipped cheaply to worker processes.
+class TimetableProblem:
+    def __init__(self, courses, rooms, days=None, starts=None, duration=80):
+        # courses: list of (course_id, instructor_id, size, meetings, student_ids)
+        # rooms: dict of room name: capacity
+        self.days = days or DEFAULT_DAYS
+        self.starts = starts or DEFAULT_STARTS
+        self.duration = duration
+        self.slots = [(day, start) for day in self.days for start in self.starts]
+
+        self.course_ids = [course[0] for course in courses]
+        instructor_index = {}
+        self.instructors = []
+        self.sizes = []
+        self.events = []  # course index of every meeting
+        for index, (course_id, instructor_id, size, meetings, _) in enumerate(courses):
+            if instructor_id is None:
+                self.instructors.append(-1)
+            else:
+                self.instructors.append(instructor_index.setdefault(instructor_id, len(instructor_index)))
+            self.sizes.append(size)
+            self.events.extend([index] * meetings)
+
+        ordered = sorted(rooms.items(), key=lambda item: item[1])
+        self.room_names = [name for name, _ in ordered]
+        self.room_capacities = [capacity for _, capacity in ordered]
+
+        # Clash weights: number of students shared by each pair of courses
+        by_student = {}
+        for index, course in enumerate(courses):
+            for student_id in course[4]:
+                by_student.setdefault(student_id, []).append(index)
+        self.neighbors = [{} for _ in courses]
+        for indices in by_student.values():
+            for a in indices:
+                for b in indices:
+                    if a != b:
+                        self.neighbors[a][b] = self.neighbors[a].get(b, 0) + 1
+        self.neighbors = [list(weights.items()) for weights in self.neighbors]
+
+    @classmethod
+    def from_university(cls, university, rooms, meetings_per_course=2, **kwargs):
+        courses = []
+        for course in university.get_all_courses():
+            courses.append((
+                course.id,
+                course.instructor.id if course.instructor else None,
+                max(len(course.students), 1),
+                meetings_per_course,
+                [student.id for student in course.students],
+            ))
+        return cls(courses, rooms, **kwargs)
+
+
+# Mutable assignment of every event to a (slot, room) plus the bookkeeping
+# needed to evaluate a move in time proportional to the course's neighbours
+class _State:
+    def __init__(self, problem):
+        self.problem = problem
+        n_slots = len(problem.slots)
+        self.slot = [-1] * len(problem.events)
+        self.room = [-1] * len(problem.events)
+        self.room_busy = [set() for _ in range(n_slots)]
+        self.instructor_busy = [set() for _ in range(n_slots)]
+        self.course_count = [{} for _ in range(n_slots)]
+        self.clash = 0
+        self.unplaced = len(problem.events)
+
+    @property
+    def cost(self):
+        return self.clash + UNPLACED_PENALTY * self.unplaced
+
+    def clash_in(self, course, slot):
+        counts = self.course_count[slot]
+        return sum(weight * counts.get(other, 0) for other, weight in self.problem.neighbors[course])
+
+    def free_room(self, course, slot):
+        problem = self.problem
+        busy = self.room_busy[slot]
+        for room in range(bisect_left(problem.room_capacities, problem.sizes[course]), len(problem.room_names)):
+            if room not in busy:
+                return room
+        return -1
+
+    def feasible(self, course, slot):
+        instructor = self.problem.instructors[course]
+        if course in self.course_count[slot]:
+            return False
+        return instructor < 0 or instructor not in self.instructor_busy[slot]
+
+    def place(self, event, slot, room):
+        course = self.problem.events[event]
+        self.clash += self.clash_in(course, slot)
+        self.slot[event] = slot
+        self.room[event] = room
+        self.room_busy[slot].add(room)
+        if self.problem.instructors[course] >= 0:
+            self.instructor_busy[slot].add(self.problem.instructors[course])
+        self.course_count[slot][course] = 1
+        self.unplaced -= 1
+
+    def unplace(self, event):
+        course = self.problem.events[event]
+        slot = self.slot[event]
+        del self.course_count[slot][course]
+        self.room_busy[slot].discard(self.room[event])
+        if self.problem.instructors[course] >= 0:
+            self.instructor_busy[slot].discard(self.problem.instructors[course])
+        self.clash -= self.clash_in(course, slot)
+        self.slot[event] = -1
+        self.room[event] = -1
+        self.unplaced += 1
+
+    def load(self, slots, rooms):
+        for event, (slot, room) in enumerate(zip(slots, rooms)):
+            if slot >= 0:
+                self.place(event, slot, room)
+
+
+# Greedy construction: hardest events first, each into the feasible slot
+# that adds the fewest student clashes
+def _construct(state, rng):
+    problem = state.problem
+    degree = [sum(weight for _, weight in neighbors) for neighbors in problem.neighbors]
+    order = sorted(range(len(problem.events)),
+                   key=lambda event: (-problem.sizes[problem.events[event]],
+                                      -degree[problem.events[event]], rng.random()))
+    slots = list(range(len(problem.slots)))
+    for event in order:
+        course = problem.events[event]
+        rng.shuffle(slots)
+        best = None
+        for slot in slots:
+            if not state.feasible(course, slot):
+                continue
+            room = state.free_room(course, slot)
+            if room < 0:
+                continue
+            clash = state.clash_in(course, slot)
+            if best is None or clash < best[0]:
+                best = (clash, slot, room)
+                if clash == 0:
+                    break
+        if best:
+            state.place(event, best[1], best[2])
+
+
+# Set in every worker once any chain has found a timetable without
+# clashes, so the other chains stop too
+_found = None
+
+
+def _init_worker(found):
+    global _found
+    _found = found
+
+
+# Simulated annealing over single-event moves. Hard constraints (rooms,
+# capacities, instructors) are never violated; only clashes are traded.
+# Moves focus on events that currently clash and try a few candidate slots,
+# keeping the cheapest one. Stops early at cost 0, which cannot be improved.
+def _anneal(state, rng, time_budget, start_temperature=1.0, candidates=8):
+    problem = state.problem
+    n_events = len(problem.events)
+    n_slots = len(problem.slots)
+    started = time.perf_counter()
+    deadline = started + time_budget
+    best_cost = state.cost
+    best = (state.slot[:], state.room[:])
+    trace = [(0.0, best_cost)]
+    last_snapshot = 0.0
+    iteration = 0
+    temperature = start_temperature
+    while state.cost > 0:
+        iteration += 1
+        if iteration % 256 == 0:
+            now = time.perf_counter()
+            if now >= deadline or _found is not None and _found.is_set():
+                break
+            temperature = max(start_temperature * (deadline - now) / time_budget, 1e-3)
+            # Copying the assignment is the expensive part, so snapshot the
+            # best solution at most every 50ms
+            if state.cost < best_cost and now - last_snapshot > 0.05:
+                best_cost = state.cost
+                best = (state.slot[:], state.room[:])
+                trace.append((now - started, best_cost))
+                last_snapshot = now
+
+        event = rng.randrange(n_events)
+        course = problem.events[event]
+        old_slot = state.slot[event]
+        current = state.clash_in(course, old_slot) if old_slot >= 0 else None
+        if current == 0:
+            continue
+
+        choice = None
+        for _ in range(candidates):
+            slot = rng.randrange(n_slots)
+            if slot == old_slot or not state.feasible(course, slot):
+                continue
+            clash = state.clash_in(course, slot)
+            if choice is None or clash < choice[0]:
+                choice = (clash, slot)
+        if choice is None:
+            continue
+        room = state.free_room(course, choice[1])
+        if room < 0:
+            continue
+
+        if old_slot >= 0:
+            delta = choice[0] - current
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                continue
+            state.unplace(event)
+        state.place(event, choice[1], room)
+
+    if state.cost < best_cost:
+        best_cost = state.cost
+        best = (state.slot[:], state.room[:])
+        trace.append((time.perf_counter() - started, best_cost))
+    return best, trace
+
+
+# One search chain, run inside a worker process. The greedy start counts
+# against the chain's budget.
+def _search(problem, seed, time_budget, initial=None):
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    state = _State(problem)
+    if initial:
+        state.load(*initial)
+    else:
+        _construct(state, rng)
+    best, trace = _anneal(state, rng, max(time_budget - (time.perf_counter() - started), 0.0))
+    final = _State(problem)
+    final.load(*best)
+    return final.cost, best, trace
+
+
+def _result(problem, best, trace):
+    state = _State(problem)
+    state.load(*best)
+    placements = []
+    unplaced = []
+    for event, (slot, room) in enumerate(zip(*best)):
+        course_id = problem.course_ids[problem.events[event]]
+        if slot < 0:
+            unplaced.append(course_id)
+            continue
+        day, start = problem.slots[slot]
+        start_minutes = int(start[:2]) * 60 + int(start[3:])
+        placements.append(Placement(course_id, day, start, format_minutes(start_minutes + problem.duration),
+                                    problem.room_names[room]))
+    return TimetableResult(placements, state.cost, state.clash, unplaced, trace)
+
+
+# Solve with a portfolio of annealing chains spread over a process pool.
+# The budget is split into rounds; after each round every worker restarts
+# from the best timetable found so far with a different seed. Each round
+# gets an equal share of the time left, less the overhead the previous
+# round took beyond its share, so the total stays within the budget. The
+# search ends as soon as any chain reaches cost 0. The trace records
+# (elapsed seconds, best cost) so quality can be plotted over time.
+def generate_timetable(problem, time_budget=60.0, workers=None, rounds=4, seed=0):
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    deadline = started + time_budget
+    best_cost, best, trace = None, None, []
+    found = multiprocessing.Event()
+    overhead = 0.0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(found,)) as pool:
+        for round_number in range(rounds):
+            round_started = time.perf_counter()
+            offset = round_started - started
+            round_budget = max((deadline - round_started) / (rounds - round_number) - overhead, 0.0)
+            seeds = [seed + round_number * workers + worker for worker in range(workers)]
+            futures = [pool.submit(_search, problem, chain_seed, round_budget, best) for chain_seed in seeds]
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                if any(future.result()[0] == 0 for future in done):
+                    found.set()
+            # Compared in seed order, so ties resolve the same way every run
+            for future in futures:
+                cost, candidate, chain_trace = future.result()
+                if best_cost is None or cost < best_cost:
+                    best_cost, best = cost, candidate
+                    trace.extend((offset + elapsed, chain_cost) for elapsed, chain_cost in chain_trace
+                                 if not trace or chain_cost < trace[-1][1])
+            now = time.perf_counter()
+            trace.append((now - started, best_cost))
+            overhead = max(now - round_started - round_budget, 0.0)
+            if best_cost == 0:
+                break
+
+    return _result(problem, best, trace)
@@ -0,0 +1,131 @@
+import heapq
+from collections import namedtuple
+
+ENROLLED = "enrolled"
+WAITLISTED = "waitlisted"
+REJECTED = "rejected"
+
+# One enrollment request for the registration-day allocator. rank is the
+# student's preference order (0 = first choice).
+EnrollmentRequest = namedtuple("EnrollmentRequest", ["student_id", "course_id", "seniority", "timestamp", "rank"])
+AllocationResult = namedtuple("AllocationResult", ["enrolled", "waitlisted", "rejected"])
+
+
+# Seniors first, then students whose major matches the course's
+# department, then whoever asked first
+def enrollment_priority(student, course, seniority, timestamp):
+    return (-seniority, 0 if student.major == course.department else 1, timestamp)
+
+
+# Waitlist for a single course: a heap of (priority, sequence, student id).
+# Leaving the list is lazy; stale heap entries are skipped when popped and
+# the heap is compacted once they outnumber live ones.
+class Waitlist:
+    def __init__(self):
+        self._heap = []
+        self._active = {}  # student_id: heap entry
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._active)
+
+    def __contains__(self, student_id):
+        return student_id in self._active
+
+    def push(self, student_id, priority):
+        self.remove(student_id)
+        self._sequence += 1
+        entry = (priority, self._sequence, student_id)
+        self._active[student_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, student_id):
+        if self._active.pop(student_id, None) is None:
+            return False
+        if len(self._heap) > 2 * len(self._active) + 32:
+            self._heap = list(self._active.values())
+            heapq.heapify(self._heap)
+        return True
+
+    def pop(self):
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._active.get(entry[2]) is entry:
+                del self._active[entry[2]]
+                return entry[2]
+        return None
+
+    def students(self):
+        return [entry[2] for entry in sorted(self._active.values())]
+
+    def position(self, student_id):
+        entry = self._active.get(student_id)
+        if entry is None:
+            return None
+        return sum(1 for other in self._active.values() if other < entry) + 1
+
+
+# Per-course waitlists owned by the University
+class WaitlistManager:
+    def __init__(self):
+        self._lists = {}  # course_id: Waitlist
+        self._clock = 0
+
+    def get(self, course_id):
+        return self._lists.get(course_id) or Waitlist()
+
+    def join(self, student, course, seniority=0, timestamp=None):
+        if timestamp is None:
+            self._clock += 1
+            timestamp = self._clock
+        waitlist = self._lists.setdefault(course.id, Waitlist())
+        waitlist.push(student.id, enrollment_priority(student, course, seniority, timestamp))
+        return timestamp
+
+    def leave(self, student_id, course_id):
+        waitlist = self._lists.get(course_id)
+        return bool(waitlist and waitlist.remove(student_id))
+
+    def leave_all(self, student_id):
+        for waitlist in self._lists.values():
+            waitlist.remove(student_id)
+
+    def discard(self, course_id):
+        self._lists.pop(course_id, None)
+
+    def pop(self, course_id):
+        waitlist = self._lists.get(course_id)
+        return waitlist.pop() if waitlist else None
+
+    def sizes(self):
+        return {course_id: len(waitlist) for course_id, waitlist in self._lists.items() if len(waitlist)}
+
+
+# Registration-day allocation. Requests are served choice by choice: every
+# student's first choice is considered before anyone's second choice, and
+# within a choice round higher-priority requests go first. Requests that
+# find the course full are waitlisted with the same priority.
+def allocate(university, requests):
+    enrolled = waitlisted = rejected = 0
+    keyed = []
+    for request in requests:
+        student = university.get_student(request.student_id)
+        course = university.get_course(request.course_id)
+        if student is None or course is None:
+            rejected += 1
+            continue
+        priority = enrollment_priority(student, course, request.seniority, request.timestamp)
+        keyed.append((request.rank, priority, student, course, request))
+    keyed.sort(key=lambda item: (item[0], item[1]))
+
+    for _, _, student, course, request in keyed:
+        if course in student.enrolled_courses:
+            rejected += 1
+        elif university.enrollment_conflicts(student, course):
+            rejected += 1
+        elif course.has_capacity() and university.enroll_student(student, course, allow_conflicts=True):
+            enrolled += 1
+        else:
+            university.join_waitlist(student, course, request.seniority, request.timestamp)
+            waitlisted += 1
+    return AllocationResult(enrolled, waitlisted, rejected)